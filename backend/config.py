@@ -11,7 +11,61 @@ REASONER_CONFIG = {
     "name": "Pellet",
     "infer_property_values": True,
     "infer_data_property_values": True,
-    "debug": False
+    "debug": False,
+    # La API publica la ontología afirmada y ejecuta Pellet en segundo plano
+    "background": os.getenv("REASONER_BACKGROUND", "true").lower() in ("1", "true", "yes")
+}
+
+# Caché persistente de la ontología razonada (quadstore SQLite de owlready2).
+# Se identifica por el hash SHA-256 del archivo OWL: si el archivo no cambia,
+# el arranque omite el parseo RDF/XML y el razonador Pellet.
+ONTOLOGY_CACHE_CONFIG = {
+    "enabled": os.getenv("ONTOLOGY_CACHE_ENABLED", "false").lower() in ("1", "true", "yes"),
+    "dir": Path(os.getenv("ONTOLOGY_CACHE_DIR", str(ONTOLOGY_DIR / "cache")))
+}
+
+# Snapshot exportado para el modo pre-fork (serve.py). El maestro lo escribe
+# en "dir"; si "path" está definido, el proceso adjunta ese snapshot
+# (archivos mapeados en memoria) en lugar de materializar la ontología.
+SNAPSHOT_EXPORT_CONFIG = {
+    "dir": Path(os.getenv("SNAPSHOT_EXPORT_DIR", str(ONTOLOGY_DIR / "cache" / "snapshots"))),
+    "path": os.getenv("SNAPSHOT_EXPORT_PATH") or None
+}
+
+# Ejecución del trabajo de ontología (owlready2/rdflib) fuera del event loop.
+# "max_pending" limita las tareas en ejecución + en cola; al superarlo se
+# responde 503 con Retry-After. Los timeouts (segundos) son por grupo de
+# endpoints (nombre usado en @offload).
+EXECUTOR_CONFIG = {
+    "workers": int(os.getenv("ONTOLOGY_WORKERS", "4")),
+    "max_pending": int(os.getenv("ONTOLOGY_MAX_PENDING", "32")),
+    "default_timeout": float(os.getenv("ONTOLOGY_TIMEOUT", "30")),
+    "retry_after": int(os.getenv("ONTOLOGY_RETRY_AFTER", "2")),
+    "timeouts": {
+        "products": 10,
+        "search": 10,
+        "compare": 15,
+        "recommendations": 15,
+        "swrl": 15,
+        "validation": 30,
+        "market": 30,
+        "classification": 60,
+        "equivalences": 60
+    }
+}
+
+# Caché de respuestas de los endpoints analíticos de solo lectura
+# (@cached_response). Las entradas se invalidan al publicarse un nuevo
+# snapshot de la ontología; "ttl" (segundos) acota además su antigüedad.
+RESPONSE_CACHE_CONFIG = {
+    "enabled": os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+    "max_entries": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+    "ttl": float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+}
+
+# Recomendaciones: resultados puntuados por preferencias (LRU por versión)
+RECOMMENDATION_CONFIG = {
+    "cache_entries": int(os.getenv("RECOMMENDATION_CACHE_ENTRIES", "512"))
 }
 
 # Configuración Flask
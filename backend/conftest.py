@@ -0,0 +1,42 @@
+"""
+Fixtures compartidas de los tests del backend
+"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ontology.loader import OntologyLoader, get_active_loader, set_active_loader
+
+
+def _published_loader():
+    """Carga la ontología afirmada (sin Pellet) y la publica como activa."""
+    previous = get_active_loader()
+    loader = OntologyLoader()
+    loader.load()
+    loader.refresh_snapshot()
+    set_active_loader(loader)
+    yield loader
+    set_active_loader(previous)
+
+
+@pytest.fixture
+def loader():
+    """Loader activo propio del test (puede modificar la ontología)."""
+    yield from _published_loader()
+
+
+@pytest.fixture(scope="class")
+def class_loader():
+    """Loader activo compartido por los tests de una clase."""
+    yield from _published_loader()
+
+
+@pytest.fixture
+def restore_active_loader():
+    """Restaura el loader activo al terminar el test."""
+    previous = get_active_loader()
+    yield
+    set_active_loader(previous)
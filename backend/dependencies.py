@@ -15,6 +15,7 @@ from reasoning.product_classifier import ProductClassifier
 from services.product_service import ProductService
 from services.comparison_service import ComparisonService
 from services.equivalence_service import EquivalenceService
+from services.recommendation_service import RecommendationService
 from sparql.queries import SPARQLQueries
 from sparql.filters import SPARQLFilters
 from sparql.market_analysis import MarketAnalysis
@@ -52,6 +53,12 @@ def get_equivalence_service() -> EquivalenceService:
     return EquivalenceService()
 
 
+@lru_cache()
+def get_recommendation_service() -> RecommendationService:
+    """Dependency para RecommendationService (de larga vida)"""
+    return RecommendationService()
+
+
 # ==================== SPARQL ====================
 
 @lru_cache()
@@ -76,9 +83,8 @@ def get_market_analysis() -> MarketAnalysis:
 
 @lru_cache()
 def get_inference_engine() -> InferenceEngine:
-    """Dependency para InferenceEngine"""
-    onto = get_ontology_instance()
-    return InferenceEngine(onto)
+    """Dependency para InferenceEngine (sigue a la ontología activa)"""
+    return InferenceEngine()
 
 
 @lru_cache()
@@ -0,0 +1,189 @@
+"""
+Ejecución del trabajo de ontología fuera del event loop - SmartCompareMarket
+
+Los endpoints llaman a código síncrono de owlready2/rdflib. Si corre dentro
+del event loop, una petición lenta (/equivalences, /classification/stats)
+frena a todas las demás del worker. Con @offload el cuerpo del endpoint se
+ejecuta en un pool de hilos acotado:
+
+- "workers" hilos ejecutan tareas; como mucho "max_pending" tareas pueden
+  estar en ejecución o en cola. Si el pool está saturado se responde 503
+  con Retry-After en lugar de seguir encolando.
+- Cada grupo de endpoints tiene su timeout; al vencer se responde 503.
+- Las respuestas en streaming pasan el primer bloque por run (503 antes de
+  empezar) y los siguientes por run_waiting, que espera un cupo.
+
+Se usan hilos y no procesos porque los objetos de owlready2 (World,
+individuos) no se pueden serializar entre procesos.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from fastapi import HTTPException
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre intentos de tomar un cupo en run_waiting
+SLOT_POLL_INTERVAL = 0.01
+
+
+class OntologyExecutor:
+    """
+    Pool de hilos acotado con timeouts por endpoint y rechazo por saturación.
+
+    Uso:
+        result = await executor.run("market", market_analysis.get_market_summary)
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: int = 32,
+        default_timeout: float = 30.0,
+        retry_after: int = 2,
+        timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.default_timeout = default_timeout
+        self.retry_after = retry_after
+        self.timeouts = dict(timeouts or {})
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ontology")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def timeout_for(self, endpoint: str) -> float:
+        """Timeout (segundos) del grupo de endpoints."""
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def _saturated(self, endpoint: str) -> HTTPException:
+        with self._lock:
+            self._rejected += 1
+        logger.warning(f"Pool de ontología saturado; se rechaza '{endpoint}'")
+        return HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intente nuevamente en unos segundos",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    async def run(self, endpoint: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta func(*args, **kwargs) en el pool y espera el resultado.
+
+        Raises:
+            HTTPException: 503 con Retry-After si el pool está saturado o si
+                se agota el timeout del endpoint; las excepciones de func se
+                propagan sin cambios
+        """
+        if not self._slots.acquire(blocking=False):
+            raise self._saturated(endpoint)
+        return await self._submit(endpoint, func, *args, **kwargs)
+
+    async def run_waiting(self, endpoint: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Igual que run, pero si el pool está saturado espera un cupo en lugar
+        de responder 503. Es para los bloques siguientes de una respuesta en
+        streaming, que ya envió el estado 200.
+
+        Raises:
+            HTTPException: 503 si se agota el timeout del endpoint
+        """
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        return await self._submit(endpoint, func, *args, **kwargs)
+
+    async def _submit(self, endpoint: str, func: Callable, *args, **kwargs) -> Any:
+        """Envía la tarea al pool con el cupo ya tomado y espera el resultado."""
+        context = contextvars.copy_context()
+        try:
+            future = self._pool.submit(context.run, functools.partial(func, *args, **kwargs))
+        except RuntimeError:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+        # El cupo se libera cuando la tarea termina (aunque ya haya vencido
+        # el timeout), así el rechazo refleja el trabajo que sigue en curso
+        future.add_done_callback(self._release)
+
+        timeout = self.timeout_for(endpoint)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"Timeout de {timeout}s en '{endpoint}'")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Tiempo de espera agotado ({timeout}s)",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del pool (para /health)."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out
+            }
+
+    def shutdown(self):
+        """Detiene el pool (las tareas en curso terminan)."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def offload(endpoint: str):
+    """
+    Decorador para endpoints síncronos: el cuerpo se ejecuta en el pool.
+
+    FastAPI sigue viendo la firma original (parámetros y Depends).
+
+    Uso:
+        @router.get("/market/summary")
+        @offload("market")
+        def get_market_summary(...):
+            ...
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await get_executor().run(endpoint, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Singleton global
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> OntologyExecutor:
+    """Obtiene la instancia singleton del pool (configurada con EXECUTOR_CONFIG)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = OntologyExecutor(**config.EXECUTOR_CONFIG)
+    return _executor
@@ -11,6 +11,17 @@ from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 import config
+from ontology.reasoning_manager import get_reasoning_manager, start_background_reasoning
+from sparql.prepared import get_query_registry
+from executor import get_executor
+from response_cache import get_response_cache
+from services.recommendation_engine import get_recommendation_engine
+
+# Publicar la ontología antes de importar los routers (algunos instancian
+# servicios al importarse) y ejecutar Pellet en segundo plano. Los workers
+# de serve.py adjuntan el snapshot exportado por el maestro.
+if config.REASONER_CONFIG["background"] or config.SNAPSHOT_EXPORT_CONFIG["path"]:
+    start_background_reasoning()
 
 # Importar routers
 from routers import products, swrl, compare, search, validation, recommendations, equivalences, market, classify
@@ -117,11 +128,13 @@ def create_app() -> FastAPI:
                 "swrl_positive_reviews": "/api/v1/swrl/positive-reviews",
                 "swrl_negative_reviews": "/api/v1/swrl/negative-reviews",
                 "compare": "/api/v1/compare",
+                "compare_rank": "/api/v1/compare/rank",
                 "search": "/api/v1/search",
                 "validate_all": "/api/v1/validate/all",
                 "validate_product": "/api/v1/validate/product/{id}",
                 "recommendations": "/api/v1/recommendations",
                 "recommendations_quick": "/api/v1/recommendations/quick",
+                "recommendations_batch": "/api/v1/recommendations/batch",
                 "equivalences": "/api/v1/equivalences",
                 "market_analysis": "/api/v1/market/analysis"
             }
@@ -130,8 +143,16 @@ def create_app() -> FastAPI:
     # Health check
     @app.get("/health", tags=["Sistema"])
     async def health():
-        """Health check endpoint"""
-        return {"status": "healthy", "service": "SmartCompareMarket"}
+        """Health check endpoint (incluye el estado del razonamiento)"""
+        return {
+            "status": "healthy",
+            "service": "SmartCompareMarket",
+            "reasoning": get_reasoning_manager().status(),
+            "sparql_queries": get_query_registry().stats(),
+            "executor": get_executor().stats(),
+            "response_cache": get_response_cache().stats(),
+            "recommendation_cache": get_recommendation_engine().stats()
+        }
     
     return app
 
@@ -157,7 +178,9 @@ if __name__ == "__main__":
     print("   GET  /api/v1/swrl/best-price")
     print("   GET  /api/v1/swrl/gaming-laptops")
     print("   POST /api/v1/compare")
+    print("   POST /api/v1/compare/rank")
     print("   GET  /api/v1/search")
+    print("   POST /api/v1/recommendations/batch")
     print("\n[INFO] Presiona Ctrl+C para detener el servidor\n")
     print("=" * 70)
     
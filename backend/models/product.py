@@ -2,7 +2,7 @@
 Schemas de Productos
 Separados para mejor mantenibilidad
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -39,6 +39,8 @@ class ProductListResponse(BaseModel):
     success: bool = True
     count: int = Field(..., description="Número de productos retornados")
     data: List[Dict[str, Any]] = Field(default_factory=list, description="Lista de productos")
+    total: Optional[int] = Field(None, description="Total de productos que cumplen los filtros")
+    next_after: Optional[str] = Field(None, description="Valor de `after` para la página siguiente (None si no hay más)")
     
     model_config = ConfigDict(
         json_schema_extra={
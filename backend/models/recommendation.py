@@ -55,6 +55,7 @@ class RecommendationResponse(BaseModel):
     total_matches: int = Field(..., description="Total de productos que coinciden")
     recommendations: List[RecommendationItem] = Field(default_factory=list)
     preferences_used: UserPreferences = Field(..., description="Preferencias aplicadas")
+    next_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente (None si no hay más)")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -60,6 +60,8 @@ class ProductListResponse(BaseModel):
     success: bool = True
     count: int = Field(..., description="Número de productos retornados")
     data: List[Dict[str, Any]] = Field(default_factory=list, description="Lista de productos")
+    total: Optional[int] = Field(None, description="Total de productos que cumplen los filtros")
+    next_after: Optional[str] = Field(None, description="Valor de `after` para la página siguiente (None si no hay más)")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -98,6 +100,21 @@ class CompareRequest(BaseModel):
     )
 
 
+class RankRequest(BaseModel):
+    """Request para ubicar un producto frente a su categoría"""
+    product_id: str = Field(..., description="ID del producto a evaluar")
+    top_k: int = Field(5, ge=1, le=50, description="Alternativas mejores y peores a retornar")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "product_id": "iPhone15_Barato",
+                "top_k": 5
+            }
+        }
+    )
+
+
 class ProductDifference(BaseModel):
     """Diferencia entre dos valores de propiedades"""
     property_name: str
@@ -131,6 +148,31 @@ class ComparisonResponse(BaseModel):
     )
 
 
+class RankResponse(BaseModel):
+    """Posición de un producto dentro de su categoría"""
+    success: bool = True
+    ranking: Dict[str, Any] = Field(..., description="Score, percentil y alternativas")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "success": True,
+                "ranking": {
+                    "product_id": "iPhone15_Barato",
+                    "category": "Smartphone",
+                    "score": 78.4,
+                    "rank": 2,
+                    "total": 6,
+                    "percentile": 80.0,
+                    "breakdown": {"bateria": 61.8, "precio": 63.2},
+                    "better": [{"id": "Galaxy_S24", "name": "Galaxy S24", "price": 899.0, "score": 81.2, "breakdown": {}}],
+                    "worse": []
+                }
+            }
+        }
+    )
+
+
 # ==================== Búsqueda ====================
 
 class SearchResponse(BaseModel):
@@ -139,6 +181,7 @@ class SearchResponse(BaseModel):
     query: str = Field(..., description="Query de búsqueda ejecutada")
     count: int = Field(..., description="Número de resultados")
     results: List[Dict[str, Any]] = Field(default_factory=list, description="Productos encontrados")
+    plan: Optional[Dict[str, Any]] = Field(None, description="Plan ejecutado (solo con explain=true)")
     
     model_config = ConfigDict(
         json_schema_extra={
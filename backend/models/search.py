@@ -1,7 +1,7 @@
 """
 Schemas de Búsqueda
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -11,6 +11,7 @@ class SearchResponse(BaseModel):
     query: str = Field(..., description="Query de búsqueda ejecutada")
     count: int = Field(..., description="Número de resultados")
     results: List[Dict[str, Any]] = Field(default_factory=list, description="Productos encontrados")
+    plan: Optional[Dict[str, Any]] = Field(None, description="Plan ejecutado (solo con explain=true)")
     
     model_config = ConfigDict(
         json_schema_extra={
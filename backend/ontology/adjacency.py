@@ -0,0 +1,140 @@
+"""
+Índice de adyacencia - SmartCompareMarket
+
+Índice bidireccional por propiedad de objeto (sujeto -> objetos y
+objeto -> sujetos), construido en una sola pasada sobre el quadstore.
+Permite responder vecinos directos e inversos en O(grado) en lugar de
+recorrer todas las instancias de Producto.
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+import logging
+
+from owlready2 import SymmetricProperty
+
+logger = logging.getLogger(__name__)
+
+# prop -> sujeto -> objetos (dict usado como conjunto ordenado)
+_Edges = Dict[str, Dict[str, Dict[str, None]]]
+
+
+class AdjacencyIndex:
+    """
+    Índice de relaciones entre individuos por propiedad de objeto.
+
+    Los IDs son nombres de individuos. Se actualiza de forma incremental con
+    add()/discard() o se reconstruye completo con rebuild(). `version` se
+    incrementa con cada cambio, para invalidar resultados derivados.
+    """
+
+    def __init__(self, ontology=None):
+        self.ontology = ontology
+        self._forward: _Edges = {}
+        self._inverse: _Edges = {}
+        self.symmetric: Set[str] = set()
+        self.version = 0
+        if ontology is not None:
+            self.rebuild()
+
+    def rebuild(self):
+        """Reconstruye el índice leyendo todas las relaciones del quadstore."""
+        forward: _Edges = {}
+        inverse: _Edges = {}
+        symmetric = set()
+
+        for prop in self.ontology.object_properties():
+            prop_name = prop.python_name
+            if SymmetricProperty in prop.is_a:
+                symmetric.add(prop_name)
+            prop_forward = forward.setdefault(prop_name, {})
+            prop_inverse = inverse.setdefault(prop_name, {})
+            try:
+                for subject, obj in prop.get_relations():
+                    subject_id = getattr(subject, "name", None)
+                    object_id = getattr(obj, "name", None)
+                    if not subject_id or not object_id:
+                        continue
+                    prop_forward.setdefault(subject_id, {})[object_id] = None
+                    prop_inverse.setdefault(object_id, {})[subject_id] = None
+            except Exception as e:
+                logger.error(f"Error indexando relaciones de '{prop_name}': {e}")
+
+        self._forward, self._inverse, self.symmetric = forward, inverse, symmetric
+        self.version += 1
+        total = sum(len(objs) for edges in forward.values() for objs in edges.values())
+        logger.debug(f"Índice de adyacencia reconstruido: {total} relaciones")
+
+    @classmethod
+    def from_edges(cls, edges: Dict[str, Iterable[Tuple[str, str]]], symmetric: Iterable[str] = ()) -> "AdjacencyIndex":
+        """Índice a partir de relaciones ya extraídas (ej: un snapshot exportado)."""
+        index = cls()
+        for prop_name, pairs in edges.items():
+            index._forward.setdefault(prop_name, {})
+            index._inverse.setdefault(prop_name, {})
+            for subject_id, object_id in pairs:
+                index.add(prop_name, subject_id, object_id)
+        index.symmetric = set(symmetric)
+        return index
+
+    def properties(self) -> List[str]:
+        """Propiedades de objeto indexadas."""
+        return list(self._forward)
+
+    def add(self, prop_name: str, subject_id: str, object_id: str):
+        """Registra una relación sujeto --prop--> objeto."""
+        self._forward.setdefault(prop_name, {}).setdefault(subject_id, {})[object_id] = None
+        self._inverse.setdefault(prop_name, {}).setdefault(object_id, {})[subject_id] = None
+        self.version += 1
+
+    def discard(self, prop_name: str, subject_id: str, object_id: str):
+        """Elimina una relación si existe."""
+        self._forward.get(prop_name, {}).get(subject_id, {}).pop(object_id, None)
+        self._inverse.get(prop_name, {}).get(object_id, {}).pop(subject_id, None)
+        self.version += 1
+
+    def refresh_subject(self, individual, prop_names: Iterable[str]):
+        """Vuelve a leer del individuo sus relaciones salientes (actualización incremental)."""
+        subject_id = individual.name
+        for prop_name in prop_names:
+            for object_id in self.forward(prop_name, subject_id):
+                self.discard(prop_name, subject_id, object_id)
+            try:
+                values = getattr(individual, prop_name, None)
+            except Exception:
+                continue
+            if values is None:
+                continue
+            for obj in values if isinstance(values, list) else [values]:
+                object_id = getattr(obj, "name", None)
+                if object_id:
+                    self.add(prop_name, subject_id, object_id)
+
+    def forward(self, prop_name: str, subject_id: str) -> Tuple[str, ...]:
+        """Objetos relacionados con el sujeto (sujeto --prop--> ?)."""
+        return tuple(self._forward.get(prop_name, {}).get(subject_id, ()))
+
+    def inverse(self, prop_name: str, object_id: str) -> Tuple[str, ...]:
+        """Sujetos que apuntan al objeto (? --prop--> objeto)."""
+        return tuple(self._inverse.get(prop_name, {}).get(object_id, ()))
+
+    def neighbors(self, prop_name: str, individual_id: str) -> List[str]:
+        """Vecinos en ambas direcciones, sin duplicados ni el propio individuo."""
+        seen = dict.fromkeys(self.forward(prop_name, individual_id))
+        seen.update(dict.fromkeys(self.inverse(prop_name, individual_id)))
+        seen.pop(individual_id, None)
+        return list(seen)
+
+    def has_edge(self, prop_name: str, subject_id: str, object_id: str) -> bool:
+        """Indica si existe la relación (en cualquier sentido si es simétrica)."""
+        edges = self._forward.get(prop_name, {})
+        if object_id in edges.get(subject_id, ()):
+            return True
+        if prop_name in self.symmetric:
+            return subject_id in edges.get(object_id, ())
+        return False
+
+    def edges(self, prop_name: str) -> Iterable[Tuple[str, str]]:
+        """Todas las relaciones (sujeto, objeto) de una propiedad."""
+        for subject_id, objects in self._forward.get(prop_name, {}).items():
+            for object_id in objects:
+                yield subject_id, object_id
@@ -0,0 +1,166 @@
+"""
+Matriz columnar de especificaciones - SmartCompareMarket
+
+Materializa las especificaciones numéricas de los productos del snapshot
+como arreglos NumPy (precio, RAM, almacenamiento, pantalla, batería y
+calificación) más un código de categoría por producto. Se construye una
+sola vez por versión de la ontología y permite calcular estadísticas de
+mercado de forma vectorizada.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ontology.loader import get_snapshot
+from ontology.snapshot import PRODUCT_CATEGORIES, OntologySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Categorías reconocidas por el análisis de mercado
+MARKET_CATEGORIES = PRODUCT_CATEGORIES + ("Muebles", "Ropa", "Calzado")
+
+# Columna -> data property de la ontología
+SPEC_COLUMNS = {
+    "price": "tienePrecio",
+    "ram": "tieneRAM_GB",
+    "storage": "tieneAlmacenamiento_GB",
+    "screen": "tienePulgadas",
+    "battery": "bateriaCapacidad_mAh",
+    "rating": "tieneCalificacion",
+}
+
+
+class SpecMatrix:
+    """
+    Especificaciones de los productos en formato columnar.
+
+    Cada columna es un arreglo float con NaN donde el producto no tiene el
+    valor. La fila i corresponde a ids[i] / records[i].
+
+    Attributes:
+        ids: IDs de los productos en el orden del snapshot
+        records: Registros del snapshot en el mismo orden
+        category_codes: Índice en MARKET_CATEGORIES, o -1 si no tiene categoría
+        version: Versión de la ontología de la que proviene
+    """
+
+    def __init__(self, records: List, version: int = 0):
+        self.records = list(records)
+        self.ids = tuple(record.id for record in self.records)
+        self.size = len(self.records)
+        self.version = version
+        self._columns: Dict[str, np.ndarray] = {}
+        self._class_masks: Dict[str, np.ndarray] = {}
+
+        for column in SPEC_COLUMNS:
+            self.column(column)
+
+        codes = {category: code for code, category in enumerate(MARKET_CATEGORIES)}
+        self.category_codes = np.fromiter(
+            (self._category_code(record.types, codes) for record in self.records),
+            dtype=np.int16, count=self.size
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        records: Sequence,
+        ids: Sequence[str],
+        columns: Dict[str, np.ndarray],
+        category_codes: np.ndarray,
+        version: int = 0
+    ) -> "SpecMatrix":
+        """
+        Matriz a partir de columnas ya calculadas (ej: arreglos mapeados de
+        un snapshot exportado), sin recorrer los registros.
+        """
+        matrix = cls.__new__(cls)
+        matrix.records = records
+        matrix.ids = tuple(ids)
+        matrix.size = len(matrix.ids)
+        matrix.version = version
+        matrix._columns = dict(columns)
+        matrix._class_masks = {}
+        matrix.category_codes = category_codes
+        return matrix
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "SpecMatrix":
+        matrix = cls(snapshot.products(), snapshot.version)
+        logger.debug(f"Matriz de especificaciones v{snapshot.version}: {matrix.size} productos")
+        return matrix
+
+    @staticmethod
+    def _category_code(types, codes: Dict[str, int]) -> int:
+        # Primera clase del registro que sea una categoría de mercado
+        for t in types:
+            code = codes.get(t)
+            if code is not None:
+                return code
+        return -1
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Columna por nombre corto (price, ram, ...) o por data property.
+
+        Las propiedades no precargadas se materializan al primer uso.
+        """
+        prop_name = SPEC_COLUMNS.get(name, name)
+        values = self._columns.get(prop_name)
+        if values is None:
+            values = np.fromiter(
+                (record.specs.get(prop_name, np.nan) for record in self.records),
+                dtype=float, count=self.size
+            )
+            self._columns[prop_name] = values
+        return values
+
+    def positive(self, name: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Valores mayores que cero de una columna (opcionalmente filtrados)."""
+        values = self.column(name)
+        if mask is not None:
+            values = values[mask]
+        return values[values > 0]
+
+    def class_mask(self, class_name: str) -> np.ndarray:
+        """Filas cuyos tipos incluyen la clase."""
+        mask = self._class_masks.get(class_name)
+        if mask is None:
+            mask = np.fromiter(
+                (class_name in record.types for record in self.records),
+                dtype=bool, count=self.size
+            )
+            self._class_masks[class_name] = mask
+        return mask
+
+    def category_mask(self, category: str) -> np.ndarray:
+        """Filas cuya categoría de mercado es la indicada."""
+        if category in MARKET_CATEGORIES:
+            return self.category_codes == MARKET_CATEGORIES.index(category)
+        return np.zeros(self.size, dtype=bool)
+
+
+def value_counts(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valores únicos ordenados por frecuencia descendente.
+
+    Los empates conservan el orden de primera aparición (igual que
+    collections.Counter.most_common).
+
+    Returns:
+        (valores, conteos)
+    """
+    if values.size == 0:
+        return values, np.zeros(0, dtype=np.int64)
+    uniques, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first_index, -counts))
+    return uniques[order], counts[order]
+
+
+def get_spec_matrix(snapshot: Optional[OntologySnapshot] = None) -> SpecMatrix:
+    """Matriz de especificaciones de la versión vigente (construida una vez por versión)."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    return snapshot.derived("spec_matrix", SpecMatrix.from_snapshot)
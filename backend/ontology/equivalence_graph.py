@@ -0,0 +1,296 @@
+"""
+Grafo de equivalencias por especificaciones - SmartCompareMarket
+
+Precalcula, una vez por versión de la ontología, los pares de productos que
+EquivalenceService._calculate_equivalence_match consideraría equivalentes
+(score >= 70) sin comparar todos contra todos en Python:
+
+- Bloqueo por categoría: solo se comparan productos de la misma categoría
+  (la regla asigna score 0 a categorías distintas).
+- Dentro de cada bloque la regla se evalúa de forma vectorizada sobre
+  bloques de filas x columnas (RAM, almacenamiento, precio y pantalla),
+  una vez por combinación única de especificaciones.
+- Las aristas se guardan como grafo disperso en formato CSR
+  (indptr / indices / scores), con los vecinos en orden de catálogo.
+
+Cuando cambian pocos productos (refresh_individuals) el grafo se actualiza
+de forma incremental recalculando solo sus filas y columnas.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ontology.loader import get_snapshot
+from ontology.snapshot import OntologySnapshot, ProductRecord
+
+logger = logging.getLogger(__name__)
+
+# Score mínimo para considerar equivalentes a dos productos
+EQUIVALENCE_THRESHOLD = 70
+
+# Data properties que intervienen en la regla
+EQUIVALENCE_SPECS = ("tieneRAM_GB", "tieneAlmacenamiento_GB", "tienePrecio", "tienePulgadas")
+
+# Celdas (filas x columnas) evaluadas por bloque vectorizado
+BLOCK_CELLS = 2_000_000
+
+
+def _spec_value(record: ProductRecord, prop: str) -> float:
+    """Valor numérico de la propiedad (0 si falta, igual que properties.get(prop, 0))."""
+    value = record.properties.get(prop, 0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    return float(value)
+
+
+def match_scores(left: Dict[str, np.ndarray], right: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Scores de equivalencia (0-100) de cada fila de `left` contra cada fila
+    de `right`, suponiendo que todas son de la misma categoría.
+
+    Versión vectorizada de EquivalenceService._calculate_equivalence_match.
+
+    Returns:
+        Matriz int16 de forma (len(left), len(right))
+    """
+    def pair(prop):
+        a = left[prop][:, None]
+        b = right[prop][None, :]
+        return np.abs(a - b), (a != 0) & (b != 0), a, b
+
+    scores = np.full((len(left["tienePrecio"]), len(right["tienePrecio"])), 20, dtype=np.int16)
+
+    # RAM: 25 si es idéntica, 15 si difiere en hasta 2GB
+    ram_diff, both, _, _ = pair("tieneRAM_GB")
+    np.add(scores, 15, out=scores, where=both & (ram_diff <= 2))
+    np.add(scores, 10, out=scores, where=both & (ram_diff == 0))
+
+    # Almacenamiento: 25 si es idéntico, 15 si difiere en hasta 128GB
+    storage_diff, both, _, _ = pair("tieneAlmacenamiento_GB")
+    np.add(scores, 15, out=scores, where=both & (storage_diff <= 128))
+    np.add(scores, 10, out=scores, where=both & (storage_diff == 0))
+
+    # Precio: 15 si difiere en hasta 20%
+    price_diff, both, price1, price2 = pair("tienePrecio")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_diff_pct = price_diff / np.maximum(price1, price2) * 100
+    np.add(scores, 15, out=scores, where=both & (price_diff_pct <= 20))
+
+    # Pantalla: 15 si difiere en hasta 1 pulgada
+    screen_diff, both, _, _ = pair("tienePulgadas")
+    np.add(scores, 15, out=scores, where=both & (screen_diff <= 1))
+    return scores
+
+
+def component_labels(size: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Componente conexa (como grafo no dirigido) de cada nodo: el menor
+    índice de su componente.
+
+    Une raíces de forma vectorizada y comprime caminos por saltos de
+    puntero hasta que ninguna arista une componentes distintas.
+    """
+    labels = np.arange(size)
+    while True:
+        low = np.minimum(labels[src], labels[dst])
+        high = np.maximum(labels[src], labels[dst])
+        crossing = low != high
+        if not crossing.any():
+            return labels
+        np.minimum.at(labels, high[crossing], low[crossing])
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+class EquivalenceGraph:
+    """
+    Aristas producto -> producto equivalente por especificaciones.
+
+    Las filas siguen el orden de snapshot.products(). Las aristas salen
+    solo de productos con categoría y precio (igual que la detección
+    automática del servicio); el score es simétrico.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        categories: np.ndarray,
+        category_index: Dict[str, int],
+        specs: Dict[str, np.ndarray],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        version: int = 0
+    ):
+        self.ids = tuple(ids)
+        self.size = len(self.ids)
+        self.version = version
+        self.categories = categories
+        self.category_index = category_index
+        self.specs = specs
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+
+    @staticmethod
+    def _columns(records: Sequence[ProductRecord], category_codes: Dict[str, int]):
+        categories = np.fromiter(
+            (category_codes.setdefault(record.category, len(category_codes)) if record.category else -1
+             for record in records),
+            dtype=np.int32, count=len(records)
+        )
+        specs = {
+            prop: np.fromiter((_spec_value(record, prop) for record in records), dtype=float, count=len(records))
+            for prop in EQUIVALENCE_SPECS
+        }
+        return categories, specs
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "EquivalenceGraph":
+        records = snapshot.products()
+        category_index = {}
+        categories, specs = cls._columns(records, category_index)
+        graph = cls._build(
+            [record.id for record in records], categories, category_index, specs,
+            np.arange(len(records)), snapshot.version
+        )
+        logger.debug(f"Grafo de equivalencias v{snapshot.version}: {graph.size} productos, {graph.edge_count} aristas")
+        return graph
+
+    @classmethod
+    def _build(cls, ids, categories, category_index, specs, rows, version, kept=None):
+        """
+        Grafo con las aristas de `rows` recalculadas (en ambos sentidos) más
+        las aristas `kept` (src, dst, score) ya conocidas.
+        """
+        eligible = (categories >= 0) & (specs["tienePrecio"] != 0)
+        recompute = np.zeros(len(ids), dtype=bool)
+        recompute[rows] = True
+        parts = [kept] if kept is not None else []
+
+        for category in np.unique(categories[rows]):
+            if category < 0:
+                continue
+            members = np.flatnonzero(categories == category)
+            # Los productos con especificaciones idénticas tienen la misma
+            # fila de scores: la regla se evalúa sobre las combinaciones únicas
+            unique_specs, member_specs = np.unique(
+                np.column_stack([specs[prop][members] for prop in EQUIVALENCE_SPECS]),
+                axis=0, return_inverse=True
+            )
+            member_specs = member_specs.reshape(-1)
+            targets = {prop: unique_specs[:, i] for i, prop in enumerate(EQUIVALENCE_SPECS)}
+            block_rows = rows[categories[rows] == category]
+            block_specs = member_specs[np.searchsorted(members, block_rows)]
+            step = max(1, BLOCK_CELLS // len(members))
+            for start in range(0, len(block_rows), step):
+                block = block_rows[start:start + step]
+                sources, source_specs = np.unique(block_specs[start:start + step], return_inverse=True)
+                unique_scores = match_scores({prop: values[sources] for prop, values in targets.items()}, targets)
+                scores = unique_scores[source_specs.reshape(-1)][:, member_specs]
+                hit_rows, hit_cols = np.nonzero(scores >= EQUIVALENCE_THRESHOLD)
+                left, right = block[hit_rows], members[hit_cols]
+                hit_scores = scores[hit_rows, hit_cols]
+                # Salientes de las filas recalculadas
+                out = (left != right) & eligible[left]
+                parts.append((left[out], right[out], hit_scores[out]))
+                # Entrantes desde filas no recalculadas (el score es simétrico)
+                incoming = (left != right) & eligible[right] & ~recompute[right]
+                parts.append((right[incoming], left[incoming], hit_scores[incoming]))
+
+        if parts:
+            src = np.concatenate([p[0] for p in parts]).astype(np.int64)
+            dst = np.concatenate([p[1] for p in parts]).astype(np.int64)
+            scores = np.concatenate([p[2] for p in parts]).astype(np.int16)
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+            scores = np.zeros(0, dtype=np.int16)
+        # Orden estable (timsort): las aristas conservadas ya vienen ordenadas
+        order = np.argsort(src * len(ids) + dst, kind="stable")
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(ids)), out=indptr[1:])
+        return cls(ids, categories, category_index, specs, indptr, dst[order], scores[order], version)
+
+    @property
+    def edge_count(self) -> int:
+        return int(self.indices.size)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Aristas como arreglos (filas origen, filas destino, scores)."""
+        src = np.repeat(np.arange(self.size), np.diff(self.indptr))
+        return src, self.indices, self.scores
+
+    def neighbors(self, product_id: str) -> List[Tuple[str, int]]:
+        """(ID, score) de los equivalentes del producto, en orden de catálogo."""
+        row = self._rows.get(product_id)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return [(self.ids[col], int(score)) for col, score in zip(self.indices[start:end], self.scores[start:end])]
+
+    def updated(self, snapshot: OntologySnapshot, changed_ids: Iterable[str]) -> "EquivalenceGraph":
+        """
+        Copia del grafo con las filas y columnas de los productos dados
+        recalculadas según el snapshot (los productos nuevos van al final).
+        """
+        ids = snapshot.product_ids
+        if ids[:self.size] != self.ids:
+            return EquivalenceGraph.from_snapshot(snapshot)
+
+        rows = np.unique(np.array(
+            [self._rows[pid] for pid in changed_ids if pid in self._rows] + list(range(self.size, len(ids))),
+            dtype=np.int64
+        ))
+
+        new_records = [snapshot.get(ids[row]) for row in rows]
+        category_index = dict(self.category_index)
+        new_categories, new_specs = self._columns(new_records, category_index)
+        categories = np.concatenate([self.categories, np.full(len(ids) - self.size, -1, dtype=np.int32)])
+        categories[rows] = new_categories
+        specs = {}
+        for prop, values in self.specs.items():
+            values = np.concatenate([values, np.zeros(len(ids) - self.size)])
+            values[rows] = new_specs[prop]
+            specs[prop] = values
+
+        src, dst, scores = self.edges()
+        touched = np.zeros(len(ids), dtype=bool)
+        touched[rows] = True
+        keep = ~touched[src] & ~touched[dst]
+        return EquivalenceGraph._build(
+            ids, categories, category_index, specs, rows, snapshot.version,
+            (src[keep], dst[keep], scores[keep])
+        )
+
+    def components(self, extra_edges: Iterable[Tuple[str, str]] = ()) -> List[List[str]]:
+        """
+        Grupos (componentes conexas de 2 o más productos) del grafo más las
+        aristas adicionales dadas (ej: equivalencias explícitas).
+
+        Returns:
+            Listas de IDs en orden de catálogo, de mayor a menor tamaño
+        """
+        src, dst, _ = self.edges()
+        extra = [(self._rows[a], self._rows[b]) for a, b in extra_edges if a in self._rows and b in self._rows]
+        if extra:
+            extra_src, extra_dst = np.array(extra, dtype=np.int64).T
+            src, dst = np.concatenate([src, extra_src]), np.concatenate([dst, extra_dst])
+        labels = component_labels(self.size, src, dst)
+        order = np.argsort(labels, kind="stable")
+        roots, starts, counts = np.unique(labels[order], return_index=True, return_counts=True)
+        groups = [order[start:start + count] for start, count in zip(starts, counts) if count > 1]
+        groups.sort(key=len, reverse=True)
+        return [[self.ids[row] for row in group] for group in groups]
+
+
+def get_equivalence_graph(snapshot: Optional[OntologySnapshot] = None) -> EquivalenceGraph:
+    """Grafo de equivalencias de la versión vigente (construido una vez por snapshot)."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    return snapshot.derived("equivalence_graph", EquivalenceGraph.from_snapshot)
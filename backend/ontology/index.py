@@ -0,0 +1,82 @@
+"""
+Índice de individuos - SmartCompareMarket
+
+Índice hash ID -> individuo de owlready2, sin distinguir mayúsculas.
+Reemplaza los recorridos de onto.individuals() y las búsquedas
+search_one(iri="*ID") por consultas O(1).
+"""
+
+from typing import Dict, Iterable, Optional
+import logging
+
+from owlready2 import Thing
+
+logger = logging.getLogger(__name__)
+
+
+class IndividualIndex:
+    """
+    Índice de individuos por ID (nombre del individuo).
+
+    Se construye al cargar la ontología y se mantiene consistente con
+    add()/discard() o reconstruyéndolo con rebuild() cuando la ontología cambia.
+    """
+
+    def __init__(self, ontology=None):
+        self.ontology = ontology
+        self._by_id: Dict[str, Thing] = {}
+        self._by_lower: Dict[str, Thing] = {}
+        if ontology is not None:
+            self.rebuild()
+
+    def rebuild(self, individuals: Optional[Iterable[Thing]] = None):
+        """Reconstruye el índice completo en una sola pasada."""
+        if individuals is None:
+            individuals = self.ontology.individuals()
+
+        by_id = {}
+        by_lower = {}
+        for individual in individuals:
+            name = individual.name
+            if not name or name in by_id:
+                continue
+            by_id[name] = individual
+            by_lower.setdefault(name.lower(), individual)
+
+        # Publicar ambos diccionarios a la vez
+        self._by_id, self._by_lower = by_id, by_lower
+        logger.debug(f"Índice de individuos reconstruido: {len(by_id)} entradas")
+
+    def add(self, individual: Thing):
+        """Registra (o actualiza) un individuo en el índice."""
+        self._by_id[individual.name] = individual
+        self._by_lower[individual.name.lower()] = individual
+
+    def discard(self, individual_id: str):
+        """Elimina un individuo del índice si existe."""
+        individual = self._by_id.pop(individual_id, None)
+        if individual is None:
+            return
+        lower = individual_id.lower()
+        if self._by_lower.get(lower) is individual:
+            del self._by_lower[lower]
+            # Otro individuo puede compartir la misma forma en minúsculas
+            for name, other in self._by_id.items():
+                if name.lower() == lower:
+                    self._by_lower[lower] = other
+                    break
+
+    def get(self, individual_id: str) -> Optional[Thing]:
+        """Obtiene un individuo por ID (coincidencia exacta primero, luego sin mayúsculas)."""
+        if not individual_id:
+            return None
+        individual = self._by_id.get(individual_id)
+        if individual is None:
+            individual = self._by_lower.get(individual_id.lower())
+        return individual
+
+    def __contains__(self, individual_id: str) -> bool:
+        return self.get(individual_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
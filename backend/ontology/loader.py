@@ -1,5 +1,12 @@
 from owlready2 import *
+import atexit
+import hashlib
+import os
+import shutil
+import sqlite3
 import sys
+import tempfile
+import threading
 from pathlib import Path
 
 # Agregar el directorio padre al path para importar config
@@ -9,22 +16,80 @@ import config
 # Importar razonadores
 from owlready2 import sync_reasoner_pellet
 
+from ontology.adjacency import AdjacencyIndex
+from ontology.index import IndividualIndex
+from ontology.snapshot import build_snapshot, update_snapshot
+
+def ontology_hash(path=None):
+    """Hash SHA-256 del contenido del archivo OWL (clave de la caché)"""
+    path = path or config.ONTOLOGY_FILE
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_file_for(content_hash):
+    """Ruta del quadstore SQLite razonado para un hash de contenido"""
+    cache_dir = Path(config.ONTOLOGY_CACHE_CONFIG["dir"])
+    return cache_dir / f"{config.ONTOLOGY_FILE.stem}-{content_hash[:16]}.sqlite3"
+
+def _working_copy(cache_file):
+    """
+    Copia el quadstore cacheado a un archivo temporal propio del proceso.
+
+    owlready2 abre SQLite en modo exclusivo; trabajar sobre una copia permite
+    que varios workers arranquen desde la misma caché y que las
+    modificaciones en memoria no alteren el archivo cacheado.
+    """
+    fd, path = tempfile.mkstemp(prefix="scm-world-", suffix=".sqlite3")
+    os.close(fd)
+    shutil.copyfile(cache_file, path)
+    atexit.register(lambda: os.path.exists(path) and os.remove(path))
+    return path
+
 class OntologyLoader:
     """Carga y gestiona la ontología SmartCompareMarket con razonamiento SWRL"""
     
-    def __init__(self):
+    def __init__(self, use_cache=None):
         self.onto = None
         self.world = None
+        self.use_cache = config.ONTOLOGY_CACHE_CONFIG["enabled"] if use_cache is None else use_cache
+        self.content_hash = None
+        self.reasoned = False
+        self.from_cache = False
+        self.index = None
+        self.adjacency = None
+        self.snapshot = None
+        self.version = 0
+        # Directorio del snapshot exportado adjuntado (modo pre-fork)
+        self.attached_from = None
+        # Cambios registrados mientras se razona otro World (ver start_journal)
+        self._journal = None
+        self._successor = None
+        self._mutation_lock = threading.RLock()
         
-    def load(self):
-        """Carga la ontología desde el archivo OWL"""
+    def load(self, build_indexes=True):
+        """
+        Carga la ontología desde el archivo OWL
+
+        Args:
+            build_indexes: Si es False no se construye el índice de
+                adyacencia (ej: se adjuntará uno exportado)
+        """
         try:
-            # Crear world aislado
-            self.world = World()
-            
-            # Cargar ontología
-            onto_path = str(config.ONTOLOGY_FILE)
-            self.onto = self.world.get_ontology(f"file://{onto_path}").load()
+            self.onto = None
+            if self.use_cache:
+                self.content_hash = ontology_hash()
+                self._load_cached_world()
+
+            if self.onto is None:
+                # Crear world aislado
+                self.world = World()
+                
+                # Cargar ontología
+                onto_path = str(config.ONTOLOGY_FILE)
+                self.onto = self.world.get_ontology(f"file://{onto_path}").load()
             
             print(f"[OK] Ontologia cargada: {self.onto.name}")
             print(f"   - Clases: {len(list(self.onto.classes()))}")
@@ -32,20 +97,78 @@ class OntologyLoader:
             print(f"   - Object Properties: {len(list(self.onto.object_properties()))}")
             print(f"   - Data Properties: {len(list(self.onto.data_properties()))}")
 
+            # Índices ID -> individuo y de relaciones entre individuos
+            self.index = IndividualIndex(self.onto)
+            self.adjacency = AdjacencyIndex(self.onto) if build_indexes else None
+
             return self.onto
 
         except Exception as e:
             print(f"[ERROR] Error cargando ontologia: {e}")
             raise
     
+    def _load_cached_world(self):
+        """Abre el quadstore razonado cacheado si coincide con el hash del OWL"""
+        cache_file = cache_file_for(self.content_hash)
+        if not cache_file.exists():
+            print(f"[CACHE] Sin cache para hash {self.content_hash[:16]}, se cargara el OWL")
+            return
+
+        try:
+            world = World(filename=_working_copy(cache_file))
+            if config.ONTOLOGY_IRI not in world.ontologies:
+                raise ValueError(f"la cache no contiene {config.ONTOLOGY_IRI}")
+            self.world = world
+            self.onto = world.get_ontology(config.ONTOLOGY_IRI)
+            self.reasoned = True
+            self.from_cache = True
+            print(f"[CACHE] Ontologia razonada cargada desde {cache_file.name}")
+        except Exception as e:
+            print(f"[WARN] Cache de ontologia invalida ({e}), se descarta")
+            cache_file.unlink(missing_ok=True)
+
+    def save_cache(self):
+        """
+        Persiste el quadstore razonado como SQLite identificado por el hash del OWL.
+
+        Se escribe en un archivo temporal y se publica con un rename atómico,
+        de modo que otros procesos nunca leen una caché a medio escribir.
+        """
+        if self.content_hash is None:
+            self.content_hash = ontology_hash()
+        cache_file = cache_file_for(self.content_hash)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+
+        try:
+            self.world.save()
+            target = sqlite3.connect(str(tmp_file))
+            try:
+                self.world.graph.db.backup(target)
+            finally:
+                target.close()
+            os.replace(tmp_file, cache_file)
+            print(f"[CACHE] Ontologia razonada guardada en {cache_file.name}")
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar la cache de ontologia: {e}")
+            if tmp_file.exists():
+                tmp_file.unlink()
+
     def run_reasoner(self):
         """Ejecuta el razonador Pellet con soporte SWRL"""
+        if self.reasoned:
+            # Las inferencias ya están en el quadstore cacheado
+            print("[REASONER] Inferencias cargadas desde cache, se omite Pellet")
+            self.refresh_snapshot()
+            return
+
         try:
             print("[REASONER] Ejecutando razonador Pellet...")
 
             # Ejecutar razonador con inferencias
             with self.onto:
                 sync_reasoner_pellet(
+                    self.world,
                     infer_property_values=config.REASONER_CONFIG["infer_property_values"],
                     debug=config.REASONER_CONFIG["debug"]
                 )
@@ -56,10 +179,233 @@ class OntologyLoader:
             print("      2. EncontrarMejorPrecio (precio menor -> esMejorOpcionQue)")
             print("      3. ClasificarPositivas (cal >= 4 -> Resena_Positiva)")
             print("      4. ClasificarNegativas (cal <= 2 -> Resena_Negativa)")
+            self.reasoned = True
 
         except Exception as e:
             print(f"[ERROR] Error ejecutando razonador: {e}")
             raise
+
+        if self.use_cache:
+            self.save_cache()
+
+        # Materializar los individuos una sola vez tras el razonamiento
+        self.refresh_snapshot()
+
+    def refresh_snapshot(self):
+        """
+        Reconstruye el snapshot materializado y lo publica de forma atómica.
+
+        Debe llamarse solo cuando la ontología cambia (razonamiento,
+        importación de datos, etc.). Los lectores siguen usando el snapshot
+        anterior hasta que el nuevo está completo.
+        """
+        snapshot = build_snapshot(self.onto, version=self.version + 1)
+        if self.index is None:
+            self.index = IndividualIndex(self.onto)
+            self.adjacency = AdjacencyIndex(self.onto)
+        else:
+            self.index.rebuild()
+            self.adjacency.rebuild()
+        self.version = snapshot.version
+        self.snapshot = snapshot
+        print(f"[SNAPSHOT] Snapshot v{snapshot.version}: {len(snapshot)} individuos materializados")
+        return snapshot
+
+    def export_snapshot(self, directory=None):
+        """
+        Exporta el snapshot vigente y el índice de adyacencia a archivos
+        mapeables (ver ontology/snapshot_store.py).
+
+        Returns:
+            Ruta del directorio exportado
+        """
+        from ontology.snapshot_store import export_snapshot
+
+        if self.snapshot is None:
+            self.refresh_snapshot()
+        directory = directory or config.SNAPSHOT_EXPORT_CONFIG["dir"]
+        return export_snapshot(self.snapshot, directory, self.adjacency, self.content_hash or ontology_hash())
+
+    def attach_snapshot(self, path):
+        """
+        Publica un snapshot exportado por otro proceso en lugar de
+        materializar la ontología (arranque de workers en modo pre-fork).
+        """
+        from ontology.snapshot_store import attach_snapshot
+
+        snapshot, adjacency = attach_snapshot(path)
+        if adjacency is not None:
+            adjacency.ontology = self.onto
+            self.adjacency = adjacency
+        elif self.adjacency is None:
+            self.adjacency = AdjacencyIndex(self.onto)
+        if self.index is None:
+            self.index = IndividualIndex(self.onto)
+        self.version = snapshot.version
+        self.snapshot = snapshot
+        self.attached_from = str(path)
+        print(f"[SNAPSHOT] Snapshot v{snapshot.version} adjuntado: {len(snapshot)} individuos")
+        return snapshot
+
+    def add_relation(self, subject, prop_name, obj):
+        """
+        Agrega una relación de objeto a la ontología y a los índices.
+
+        Actualiza el índice de adyacencia de forma incremental; el snapshot
+        se reconstruye con notify_changed() cuando termina el lote de cambios.
+        """
+        with self._mutation_lock:
+            values = getattr(subject, prop_name)
+            if isinstance(values, list):
+                if obj not in values:
+                    values.append(obj)
+            else:
+                setattr(subject, prop_name, obj)
+            self.adjacency.add(prop_name, subject.name, obj.name)
+            self._record(("relation", subject.name, prop_name, obj.name))
+
+    def refresh_individuals(self, individual_ids):
+        """
+        Actualiza de forma incremental snapshot e índices para algunos individuos.
+
+        Se usa cuando cambian datos de pocos individuos (ej: precios): evita
+        re-ejecutar Pellet y re-materializar todo el catálogo.
+
+        Returns:
+            Diccionario con IDs actualizados, no encontrados y cambios
+        """
+        with self._mutation_lock:
+            result = self._refresh_individuals(individual_ids)
+            if result["updated"]:
+                self._record(("individuals", tuple(result["updated"])))
+            return result
+
+    def _refresh_individuals(self, individual_ids):
+        if self.snapshot is None:
+            self.refresh_snapshot()
+
+        individuals = []
+        not_found = []
+        for individual_id in individual_ids:
+            individual = self.index.get(individual_id)
+            if individual is None:
+                # Individuo nuevo: buscarlo en la ontología y registrarlo
+                individual = self.onto.search_one(iri=f"{self.onto.base_iri}{individual_id}")
+                if individual is None:
+                    not_found.append(individual_id)
+                    continue
+                self.index.add(individual)
+            if individual not in individuals:
+                individuals.append(individual)
+
+        if not individuals:
+            return {"updated": [], "not_found": not_found, "changes": {"types": {}, "relations": {}},
+                    "version": self.version}
+
+        object_props = [prop.python_name for prop in self.onto.object_properties()]
+        for individual in individuals:
+            self.adjacency.refresh_subject(individual, object_props)
+
+        snapshot, changes = update_snapshot(self.snapshot, self.onto, individuals, self.version + 1)
+
+        # Relaciones inferidas por reglas: las estructuras que se derivan del
+        # índice (matriz de relaciones, scoring, recomendaciones) las ven en
+        # el nuevo snapshot
+        for prop_name, pairs in changes["relations"].items():
+            for subject_id, object_id in pairs["removed"]:
+                self.adjacency.discard(prop_name, subject_id, object_id)
+            for subject_id, object_id in pairs["added"]:
+                self.adjacency.add(prop_name, subject_id, object_id)
+
+        self.version = snapshot.version
+        self.snapshot = snapshot
+        return {
+            "updated": [individual.name for individual in individuals],
+            "not_found": not_found,
+            "changes": changes,
+            "version": snapshot.version
+        }
+
+    def start_journal(self):
+        """
+        Empieza a registrar los cambios hechos con add_relation,
+        notify_changed y refresh_individuals, para reaplicarlos con hand_over en un loader
+        que se cargó del OWL en paralelo (razonamiento en segundo plano).
+        """
+        with self._mutation_lock:
+            self._journal = []
+
+    def hand_over(self, successor, publish):
+        """
+        Reaplica en successor los cambios registrados y lo publica.
+
+        Las mutaciones esperan mientras tanto; las que lleguen después a
+        este loader (requests que ya lo tenían) se reenvían a successor.
+
+        Args:
+            successor: Loader que reemplaza a este
+            publish: Función que publica successor (ej: set_active_loader)
+        """
+        with self._mutation_lock:
+            journal, self._journal = self._journal or [], None
+            self._replay(journal, successor)
+            publish(successor)
+            self._successor = successor
+        if journal:
+            print(f"[REASONER] {len(journal)} cambios reaplicados en la ontologia razonada")
+
+    def _record(self, entry):
+        if self._journal is not None:
+            self._journal.append(entry)
+        if self._successor is not None:
+            self._replay([entry], self._successor)
+
+    def _replay(self, journal, target):
+        """Copia al World de target los individuos y relaciones modificados."""
+        for entry in journal:
+            if entry[0] == "changed":
+                target.notify_changed()
+            elif entry[0] == "relation":
+                _, subject_id, prop_name, object_id = entry
+                subject = self._copy_individual(subject_id, target)
+                obj = self._copy_individual(object_id, target)
+                if subject is not None and obj is not None:
+                    target.add_relation(subject, prop_name, obj)
+            else:
+                individual_ids = [pid for pid in entry[1] if self._copy_individual(pid, target) is not None]
+                target.refresh_individuals(individual_ids)
+
+    def _copy_individual(self, individual_id, target):
+        """
+        Copia los valores de las propiedades de un individuo (y lo crea si
+        no existe) en el World de target.
+        """
+        source = self.index.get(individual_id)
+        if source is None:
+            return None
+        world = target.onto.world
+        individual = world[source.iri]
+        if individual is None:
+            classes = [world[cls.iri] for cls in source.is_a if hasattr(cls, "iri") and world[cls.iri] is not None]
+            if not classes:
+                return None
+            with target.onto:
+                individual = classes[0](source.name)
+                individual.is_a.extend(classes[1:])
+        for prop in source.get_properties():
+            target_prop = world[prop.iri]
+            if target_prop is None:
+                continue
+            values = [world[v.iri] if hasattr(v, "iri") else v for v in prop[source]]
+            target_prop[individual] = [v for v in values if v is not None]
+        return individual
+
+    def notify_changed(self):
+        """Notifica que la ontología fue modificada y reconstruye el snapshot."""
+        with self._mutation_lock:
+            snapshot = self.refresh_snapshot()
+            self._record(("changed",))
+            return snapshot
     
     def save_inferred(self, output_path=None):
         """Guarda la ontología con inferencias"""
@@ -69,14 +415,61 @@ class OntologyLoader:
         self.onto.save(file=str(output_path))
         print(f"[SAVE] Ontologia inferida guardada en: {output_path}")
 
-# Singleton global
+# Singleton global (se reemplaza de forma atómica al publicar un nuevo World)
 _ontology_loader = None
 
-def get_ontology():
-    """Obtiene la instancia singleton del loader"""
+def get_active_loader():
+    """Loader publicado actualmente, o None si aún no se cargó"""
+    return _ontology_loader
+
+def set_active_loader(loader):
+    """
+    Publica un loader completo (World, índices y snapshot) como activo.
+
+    La asignación de la referencia es atómica: las requests en curso siguen
+    usando el loader anterior y las nuevas ven el reemplazo completo.
+    """
+    global _ontology_loader
+    _ontology_loader = loader
+
+def get_loader():
+    """Obtiene la instancia singleton del loader (carga y razona la primera vez)"""
     global _ontology_loader
     if _ontology_loader is None:
         _ontology_loader = OntologyLoader()
         _ontology_loader.load()
         _ontology_loader.run_reasoner()
-    return _ontology_loader.onto
+    return _ontology_loader
+
+def get_ontology():
+    """Obtiene la ontología del loader singleton"""
+    return get_loader().onto
+
+def get_index(onto=None):
+    """
+    Obtiene el índice de individuos compartido.
+
+    Si se pasa una ontología distinta a la del singleton (ej: en tests),
+    se construye un índice propio para ella.
+    """
+    if onto is None:
+        return get_loader().index
+    if _ontology_loader is not None and _ontology_loader.onto is onto:
+        return _ontology_loader.index
+    return IndividualIndex(onto)
+
+def get_adjacency(onto=None):
+    """Obtiene el índice de adyacencia compartido (o uno propio para otra ontología)."""
+    if onto is None:
+        return get_loader().adjacency
+    if _ontology_loader is not None and _ontology_loader.onto is onto:
+        return _ontology_loader.adjacency
+    return AdjacencyIndex(onto)
+
+def get_snapshot():
+    """Obtiene el snapshot materializado vigente de la ontología"""
+    loader = get_loader()
+    if loader.snapshot is None:
+        # Razonador no disponible: materializar la ontología tal como se cargó
+        loader.refresh_snapshot()
+    return loader.snapshot
@@ -0,0 +1,245 @@
+"""
+Índices de rango numéricos - SmartCompareMarket
+
+Para cada data property numérica filtrable (precio, RAM, almacenamiento,
+calificación y pulgadas) guarda los productos ordenados por valor. Un
+predicado de rango se resuelve con dos búsquedas binarias y produce un
+bitset (arreglo booleano por producto); varios predicados se combinan con
+AND sobre los bitsets. Los órdenes por campo de sort_by también se
+precalculan, de modo que los resultados salen ya ordenados sin sorted().
+
+Se construyen una vez por versión de la ontología a partir de la matriz
+columnar de especificaciones.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+import numpy as np
+
+from ontology.columns import SpecMatrix, get_spec_matrix
+from ontology.loader import get_snapshot
+from ontology.snapshot import OntologySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Propiedades con índice de rango
+RANGE_PROPERTIES = (
+    "tienePrecio",
+    "tieneRAM_GB",
+    "tieneAlmacenamiento_GB",
+    "tieneCalificacion",
+    "tienePulgadas",
+)
+
+# Campos de sort_by -> (propiedad, valor usado cuando falta)
+SORT_FIELDS = {
+    "price": ("tienePrecio", float("inf")),
+    "rating": ("tieneCalificacion", 0.0),
+    "ram": ("tieneRAM_GB", 0.0),
+    "storage": ("tieneAlmacenamiento_GB", 0.0),
+}
+
+
+class RangePredicate(NamedTuple):
+    """
+    Predicado low <= valor <= high sobre una propiedad.
+
+    Attributes:
+        prop: Data property (ej: "tienePrecio")
+        low: Límite inferior inclusivo (None: sin límite)
+        high: Límite superior inclusivo (None: sin límite)
+        default: Valor asumido para productos sin la propiedad (None: se excluyen)
+    """
+    prop: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+    default: Optional[float] = None
+
+    def accepts(self, value: Optional[float]) -> bool:
+        """Evalúa el predicado sobre un valor suelto."""
+        if value is None:
+            value = self.default
+        if value is None:
+            return False
+        if self.low is not None and value < self.low:
+            return False
+        if self.high is not None and value > self.high:
+            return False
+        return True
+
+
+class RangeIndexes:
+    """
+    Índices de rango y órdenes precalculados sobre los productos del snapshot.
+
+    Las filas siguen el orden de snapshot.products(); los bitsets son
+    arreglos booleanos de tamaño igual al número de productos.
+    """
+
+    def __init__(self, matrix: SpecMatrix):
+        self.ids = matrix.ids
+        self.size = matrix.size
+        self.version = matrix.version
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+        self._values: Dict[str, np.ndarray] = {}
+        self._sorted_rows: Dict[str, np.ndarray] = {}
+        self._sorted_values: Dict[str, np.ndarray] = {}
+        self._sort_orders: Dict[Tuple[str, bool], np.ndarray] = {}
+
+        for prop in RANGE_PROPERTIES:
+            values = matrix.column(prop)
+            present = np.flatnonzero(~np.isnan(values))
+            order = present[np.argsort(values[present], kind="stable")]
+            self._values[prop] = values
+            self._sorted_rows[prop] = order
+            self._sorted_values[prop] = values[order]
+
+        for field, (prop, missing) in SORT_FIELDS.items():
+            keys = self.sort_keys(prop, missing)
+            self._sort_orders[(field, True)] = np.argsort(keys, kind="stable")
+            self._sort_orders[(field, False)] = np.argsort(-keys, kind="stable")
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "RangeIndexes":
+        indexes = cls(get_spec_matrix(snapshot))
+        logger.debug(f"Índices de rango v{snapshot.version}: {indexes.size} productos")
+        return indexes
+
+    def sort_keys(self, prop: str, missing: float) -> np.ndarray:
+        """Valores de la propiedad con los faltantes reemplazados."""
+        values = self._values.get(prop)
+        if values is None:
+            return np.full(self.size, missing)
+        return np.where(np.isnan(values), missing, values)
+
+    def all(self) -> np.ndarray:
+        """Bitset con todos los productos."""
+        return np.ones(self.size, dtype=bool)
+
+    def mask_of(self, product_ids: Iterable[str]) -> np.ndarray:
+        """Bitset de un conjunto de IDs (los desconocidos se ignoran)."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.rows_of(product_ids)] = True
+        return mask
+
+    def rows_of(self, product_ids: Iterable[str]) -> np.ndarray:
+        """Filas de los IDs dados, en el mismo orden (omite desconocidos)."""
+        rows = [self._rows[pid] for pid in product_ids if pid in self._rows]
+        return np.array(rows, dtype=np.int64)
+
+    def ids_of(self, rows: np.ndarray) -> List[str]:
+        """IDs de las filas dadas, en el mismo orden."""
+        return [self.ids[row] for row in rows]
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._rows
+
+    def count(self, predicate: RangePredicate) -> int:
+        """Cantidad de productos que cumplen el predicado (sin construir el bitset)."""
+        lo, hi = self._bounds(predicate)
+        count = max(hi - lo, 0)
+        if self._accepts_missing(predicate):
+            count += int(np.isnan(self._values[predicate.prop]).sum())
+        return count
+
+    def _bounds(self, predicate: RangePredicate) -> Tuple[int, int]:
+        values = self._sorted_values[predicate.prop]
+        lo = 0 if predicate.low is None else int(np.searchsorted(values, predicate.low, side="left"))
+        hi = len(values) if predicate.high is None else int(np.searchsorted(values, predicate.high, side="right"))
+        return lo, hi
+
+    @staticmethod
+    def _accepts_missing(predicate: RangePredicate) -> bool:
+        return predicate.default is not None and predicate.accepts(predicate.default)
+
+    def range(self, predicate: RangePredicate) -> np.ndarray:
+        """
+        Bitset de productos que cumplen el predicado.
+
+        Raises:
+            KeyError: Si la propiedad no tiene índice de rango
+        """
+        if predicate.prop not in self._sorted_values:
+            raise KeyError(f"Propiedad sin índice de rango: {predicate.prop}")
+        lo, hi = self._bounds(predicate)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self._sorted_rows[predicate.prop][lo:hi]] = True
+        if self._accepts_missing(predicate):
+            mask |= np.isnan(self._values[predicate.prop])
+        return mask
+
+    def rows_in(self, predicate: RangePredicate) -> np.ndarray:
+        """Filas (en orden de catálogo) que cumplen el predicado."""
+        return np.flatnonzero(self.range(predicate))
+
+    def filter_rows(self, rows: np.ndarray, predicate: RangePredicate) -> np.ndarray:
+        """Filtra un conjunto pequeño de filas evaluando el predicado solo sobre ellas."""
+        values = self._values[predicate.prop][rows]
+        keep = ~np.isnan(values)
+        if predicate.low is not None:
+            keep &= values >= predicate.low
+        if predicate.high is not None:
+            keep &= values <= predicate.high
+        if self._accepts_missing(predicate):
+            keep |= np.isnan(values)
+        return rows[keep]
+
+    def select(self, predicates: Iterable[RangePredicate], base: Optional[np.ndarray] = None) -> np.ndarray:
+        """Intersección (AND) de los predicados, opcionalmente sobre un bitset base."""
+        mask = self.all() if base is None else base.copy()
+        for predicate in predicates:
+            mask &= self.range(predicate)
+        return mask
+
+    def ordered(self, mask: np.ndarray, sort_by: str = "price", ascending: bool = True) -> np.ndarray:
+        """
+        Filas del bitset en el orden de sort_by (precalculado).
+
+        Los empates conservan el orden del catálogo; un sort_by desconocido
+        ordena por precio, igual que SPARQLFilters.sort_results.
+        """
+        field = sort_by if sort_by in SORT_FIELDS else "price"
+        order = self._sort_orders[(field, ascending)]
+        return order[mask[order]]
+
+    def position_after(
+        self,
+        rows: np.ndarray,
+        after_row: int,
+        sort_by: Optional[str] = None,
+        ascending: bool = True
+    ) -> int:
+        """
+        Posición en `rows` (ordenadas por ordered(), o por fila si sort_by es
+        None) donde empieza la página que sigue a `after_row`.
+
+        La clave es (valor de sort_by, fila), así que funciona aunque
+        after_row ya no cumpla los filtros.
+        """
+        if sort_by is None:
+            return int(np.count_nonzero(rows <= after_row))
+        field = sort_by if sort_by in SORT_FIELDS else "price"
+        keys = self.sort_keys(*SORT_FIELDS[field])
+        if not ascending:
+            keys = -keys
+        row_keys, after_key = keys[rows], keys[after_row]
+        return int(np.count_nonzero((row_keys < after_key) | ((row_keys == after_key) & (rows <= after_row))))
+
+    def row(self, product_id: str) -> Optional[int]:
+        """Fila de un ID (None si no es un producto del snapshot)."""
+        return self._rows.get(product_id)
+
+    def sort_rows(self, rows: np.ndarray, sort_by: str = "price", ascending: bool = True) -> np.ndarray:
+        """Ordena filas que ya tienen un orden propio (ej: relevancia), de forma estable."""
+        field = sort_by if sort_by in SORT_FIELDS else "price"
+        prop, missing = SORT_FIELDS[field]
+        keys = self.sort_keys(prop, missing)[rows]
+        return rows[np.argsort(keys if ascending else -keys, kind="stable")]
+
+
+def get_range_indexes(snapshot: Optional[OntologySnapshot] = None) -> RangeIndexes:
+    """Índices de rango de la versión vigente (construidos una vez por snapshot)."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    return snapshot.derived("range_indexes", RangeIndexes.from_snapshot)
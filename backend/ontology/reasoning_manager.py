@@ -0,0 +1,175 @@
+"""
+Gestor de razonamiento en segundo plano - SmartCompareMarket
+
+Publica de inmediato una ontología utilizable (caché razonada o solo
+axiomas afirmados) y ejecuta Pellet en un hilo de fondo sobre un World
+nuevo. Al terminar, reemplaza de forma atómica el loader activo (World,
+índices y snapshot), de modo que ninguna request espera al razonador.
+Los cambios aplicados a la ontología afirmada mientras Pellet razona se
+reaplican en el World razonado antes del reemplazo.
+
+Si Pellet falla se sigue sirviendo la ontología afirmada con el estado
+"degraded".
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+import logging
+
+import config
+from ontology.loader import OntologyLoader, get_active_loader, set_active_loader
+
+logger = logging.getLogger(__name__)
+
+STATE_LOADING = "loading"
+STATE_REASONING = "reasoning"
+STATE_READY = "ready"
+STATE_DEGRADED = "degraded"
+
+
+class ReasoningManager:
+    """
+    Coordina la carga inicial y el razonamiento en segundo plano.
+
+    Pellet se ejecuta en una JVM externa (subproceso), por lo que un hilo
+    basta para no bloquear el servidor mientras razona.
+    """
+
+    def __init__(self):
+        self.state = STATE_LOADING
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self, background: bool = True) -> OntologyLoader:
+        """
+        Carga y publica la ontología y lanza el razonamiento.
+
+        Si SNAPSHOT_EXPORT_CONFIG["path"] está definido (workers de
+        serve.py), adjunta ese snapshot y no razona.
+
+        Args:
+            background: Si es False, razona de forma síncrona antes de retornar
+
+        Returns:
+            Loader publicado inicialmente
+        """
+        with self._lock:
+            active = get_active_loader()
+            if active is not None and self.state != STATE_LOADING:
+                return active
+
+            self.state = STATE_LOADING
+            export_path = config.SNAPSHOT_EXPORT_CONFIG["path"]
+            if export_path:
+                # Worker en modo pre-fork: el maestro ya razonó y exportó
+                loader = OntologyLoader(use_cache=True)
+                loader.load(build_indexes=False)
+                loader.attach_snapshot(export_path)
+                set_active_loader(loader)
+                self.state = STATE_READY
+                return loader
+
+            loader = OntologyLoader()
+            loader.load()
+
+            if loader.reasoned:
+                # Caché razonada válida: no hace falta ejecutar Pellet
+                loader.run_reasoner()
+                set_active_loader(loader)
+                self.state = STATE_READY
+                return loader
+
+            # Servir la ontología afirmada mientras Pellet razona
+            loader.refresh_snapshot()
+            loader.start_journal()
+            set_active_loader(loader)
+            self.state = STATE_REASONING
+
+            if background:
+                self._thread = threading.Thread(
+                    target=self._reason, name="pellet-reasoner", daemon=True
+                )
+                self._thread.start()
+
+        if not background:
+            self._reason()
+        return loader
+
+    def _reason(self):
+        """Razona sobre un World nuevo y lo publica al terminar."""
+        started = time.perf_counter()
+        state = STATE_DEGRADED
+        try:
+            loader = OntologyLoader()
+            loader.load()
+
+            # Continuar la numeración de versiones del loader activo
+            active = get_active_loader()
+            if active is not None:
+                loader.version = active.version
+
+            loader.run_reasoner()
+            if active is not None:
+                # Cambios hechos sobre la ontología afirmada durante el razonamiento
+                active.hand_over(loader, set_active_loader)
+            else:
+                set_active_loader(loader)
+            self.last_error = None
+            state = STATE_READY
+            logger.info(f"Ontología razonada publicada (v{get_active_loader().version})")
+        except Exception as e:
+            # Se sigue sirviendo la ontología afirmada
+            self.last_error = str(e)
+            logger.error(f"Error en razonamiento de fondo: {e}")
+        finally:
+            self.last_duration = round(time.perf_counter() - started, 3)
+            self.finished_at = time.time()
+            self.state = state
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine el razonamiento en curso. Retorna True si terminó."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def status(self) -> Dict:
+        """Estado del razonamiento para /health."""
+        loader = get_active_loader()
+        state = self.state
+        if state == STATE_LOADING and loader is not None and loader.snapshot is not None:
+            # Ontología cargada de forma síncrona (scripts, tests)
+            state = STATE_READY
+
+        return {
+            "state": state,
+            "reasoned": bool(loader and loader.reasoned),
+            "from_cache": bool(loader and loader.from_cache),
+            "attached_snapshot": loader.attached_from if loader else None,
+            "ontology_version": loader.version if loader else 0,
+            "last_duration_seconds": self.last_duration,
+            "last_error": self.last_error,
+            "finished_at": self.finished_at
+        }
+
+
+# Singleton global
+_reasoning_manager = None
+
+
+def get_reasoning_manager() -> ReasoningManager:
+    """Obtiene la instancia singleton del gestor de razonamiento"""
+    global _reasoning_manager
+    if _reasoning_manager is None:
+        _reasoning_manager = ReasoningManager()
+    return _reasoning_manager
+
+
+def start_background_reasoning() -> OntologyLoader:
+    """Publica la ontología y lanza Pellet en segundo plano"""
+    return get_reasoning_manager().start(background=True)
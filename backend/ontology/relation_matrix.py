@@ -0,0 +1,173 @@
+"""
+Matrices de relaciones en bitsets - SmartCompareMarket
+
+Codifica cada propiedad de objeto entre productos como un bitset por
+producto: los IDs se mapean a enteros densos (orden de snapshot.product_ids)
+y la fila del sujeto guarda un bit por cada producto objeto, empaquetado
+con np.packbits. Solo los productos con relaciones salientes tienen fila.
+
+Las relaciones de N productos se obtienen así con una sola extracción
+vectorizada N x N por propiedad, en lugar de N² búsquedas en el quadstore
+(check_object_property / check_compatibility resuelven ambos IDs en cada
+llamada).
+
+Se construye una vez por versión de la ontología a partir del índice de
+adyacencia, y se reconstruye si el índice cambia después (add_relation no
+publica un snapshot nuevo).
+"""
+
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence
+import logging
+
+import numpy as np
+
+from ontology.adjacency import AdjacencyIndex
+from ontology.loader import get_adjacency, get_snapshot
+from ontology.snapshot import OntologySnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class RelationBits(NamedTuple):
+    """
+    Bitsets de una propiedad.
+
+    Attributes:
+        slots: Fila de bits de cada producto (-1 si no tiene relaciones salientes)
+        bits: Bitsets empaquetados (filas x ceil(productos / 8))
+    """
+    slots: np.ndarray
+    bits: np.ndarray
+
+
+class RelationMatrix:
+    """
+    Relaciones entre productos por propiedad de objeto, en bitsets.
+
+    Uso:
+        relations = get_relation_matrix()
+        rows = relations.rows_of(["iPhone15_Barato", "iPhone15_Caro"])
+        better = relations.gather("esMejorOpcionQue", rows)  # bool N x N
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        properties: Dict[str, RelationBits],
+        symmetric: Iterable[str] = (),
+        version: int = 0
+    ):
+        self.ids = tuple(ids)
+        self.size = len(self.ids)
+        self.properties = properties
+        self.symmetric = frozenset(symmetric)
+        self.version = version
+        # Índice de adyacencia (y su versión) del que se construyó
+        self.adjacency: Optional[AdjacencyIndex] = None
+        self.adjacency_version = 0
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+        self._by_lower = {pid.lower(): row for row, pid in enumerate(self.ids)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "RelationMatrix":
+        return cls.from_adjacency(snapshot.product_ids, get_adjacency(), snapshot.version)
+
+    @classmethod
+    def from_adjacency(cls, ids: Sequence[str], adjacency: AdjacencyIndex, version: int = 0) -> "RelationMatrix":
+        """Empaqueta las relaciones producto -> producto de cada propiedad."""
+        adjacency_version = adjacency.version
+        rows = {pid: row for row, pid in enumerate(ids)}
+        size = len(rows)
+        properties = {}
+        for prop_name in adjacency.properties():
+            pairs = [
+                (rows[subject_id], rows[object_id])
+                for subject_id, object_id in adjacency.edges(prop_name)
+                if subject_id in rows and object_id in rows
+            ]
+            if not pairs:
+                continue
+            src, dst = np.array(pairs, dtype=np.int64).T
+            subjects = np.unique(src)
+            slots = np.full(size, -1, dtype=np.int64)
+            slots[subjects] = np.arange(len(subjects))
+            bits = np.zeros((len(subjects), (size + 7) // 8), dtype=np.uint8)
+            np.bitwise_or.at(bits, (slots[src], dst >> 3), (0x80 >> (dst & 7)).astype(np.uint8))
+            properties[prop_name] = RelationBits(slots, bits)
+
+        matrix = cls(ids, properties, adjacency.symmetric, version)
+        matrix.adjacency = adjacency
+        matrix.adjacency_version = adjacency_version
+        logger.debug(f"Matriz de relaciones v{version}: {len(properties)} propiedades, {size} productos")
+        return matrix
+
+    def built_from(self, adjacency: AdjacencyIndex) -> bool:
+        """Indica si la matriz refleja el estado actual del índice de adyacencia."""
+        return self.adjacency is adjacency and self.adjacency_version == adjacency.version
+
+    def rows_of(self, product_ids: Sequence[str]) -> np.ndarray:
+        """
+        Enteros densos de los IDs (sin distinguir mayúsculas); -1 si el ID
+        no es un producto.
+        """
+        return np.array([
+            self._rows.get(pid, self._by_lower.get(pid.lower(), -1)) if pid else -1
+            for pid in product_ids
+        ], dtype=np.int64)
+
+    def gather(self, prop_name: str, rows: np.ndarray) -> np.ndarray:
+        """
+        Relaciones entre las filas pedidas: result[i, j] indica
+        rows[i] --prop--> rows[j] (en cualquier sentido si es simétrica).
+        Las filas -1 no tienen relaciones.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        result = np.zeros((len(rows), len(rows)), dtype=bool)
+        relation = self.properties.get(prop_name)
+        if relation is None or not len(rows):
+            return result
+
+        known = np.flatnonzero(rows >= 0)
+        columns = rows[known]
+        slots = relation.slots[columns]
+        subjects = known[slots >= 0]
+        if len(subjects):
+            packed = relation.bits[slots[slots >= 0]][:, columns >> 3]
+            values = (packed >> (7 - (columns & 7)).astype(np.uint8)) & 1
+            result[np.ix_(subjects, known)] = values.astype(bool)
+        if prop_name in self.symmetric:
+            result |= result.T
+        return result
+
+    def subjects_of(self, prop_name: str, row: int) -> np.ndarray:
+        """
+        Bitset (booleano por producto) de los sujetos de ? --prop--> ids[row]
+        (en cualquier sentido si es simétrica).
+        """
+        result = np.zeros(self.size, dtype=bool)
+        relation = self.properties.get(prop_name)
+        if relation is None:
+            return result
+
+        subjects = np.flatnonzero(relation.slots >= 0)
+        column = relation.bits[relation.slots[subjects], row >> 3]
+        result[subjects] = (column >> (7 - (row & 7))) & 1
+        slot = relation.slots[row]
+        if prop_name in self.symmetric and slot >= 0:
+            result |= np.unpackbits(relation.bits[slot])[:self.size].astype(bool)
+        return result
+
+
+def get_relation_matrix(snapshot: Optional[OntologySnapshot] = None) -> RelationMatrix:
+    """
+    Matriz de relaciones de la versión vigente (construida una vez por
+    snapshot y versión del índice de adyacencia).
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+    adjacency = get_adjacency()
+    return snapshot.derived(
+        "relation_matrix",
+        lambda snapshot: RelationMatrix.from_adjacency(snapshot.product_ids, adjacency, snapshot.version),
+        lambda matrix: matrix.built_from(adjacency)
+    )
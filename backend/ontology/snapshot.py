@@ -0,0 +1,539 @@
+"""
+Snapshot materializado de la ontología - SmartCompareMarket
+
+Construye, una sola vez tras el razonamiento, un registro inmutable por
+individuo (id, tipos, especificaciones numéricas y enlaces a otros
+individuos). Los servicios leen de este snapshot en lugar de recorrer
+owlready2 (get_properties / INDIRECT_is_a) en cada request.
+"""
+
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+import logging
+import threading
+
+from owlready2 import ObjectPropertyClass, rdf_type
+
+from utils.owl_helpers import get_individual_classes, get_individual_properties
+
+logger = logging.getLogger(__name__)
+
+# Categorías principales de producto (mismo orden que usan los servicios)
+PRODUCT_CATEGORIES = ("Laptop", "Smartphone", "Tablet", "Desktop")
+
+# Ontología donde owlready2 (y Pellet) guardan los hechos inferidos
+INFERENCES_ONTOLOGY_IRI = "http://inferrences/"
+
+
+@dataclass(frozen=True)
+class ProductRecord:
+    """
+    Registro inmutable de un individuo de la ontología.
+
+    Attributes:
+        id: Nombre del individuo (ej: "iPhone15_Barato")
+        types: Clases finales (razonador + reglas SWRL evaluadas en lote)
+        direct_types: Clases asignadas explícitamente (is_a)
+        reasoned_types: Clases directas e inferidas (razonador y reglas SWRL)
+        properties: Propiedades en el mismo formato que individual_to_dict
+        specs: Valores numéricos de las data properties
+        links: Propiedades de objeto -> IDs de individuos relacionados
+        category: Categoría principal (Laptop, Smartphone, Tablet, Desktop)
+    """
+    id: str
+    types: Tuple[str, ...]
+    direct_types: Tuple[str, ...]
+    reasoned_types: Tuple[str, ...]
+    properties: Mapping[str, Any]
+    specs: Mapping[str, float]
+    links: Mapping[str, Tuple[str, ...]]
+    category: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Nombre legible (tieneNombre) o el ID si no existe."""
+        name = self.properties.get("tieneNombre")
+        return name if isinstance(name, str) else self.id
+
+    def spec(self, prop_name: str, default: float = 0.0) -> float:
+        """Obtiene una especificación numérica con valor por defecto."""
+        return self.specs.get(prop_name, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte el registro al formato JSON de individual_to_dict.
+
+        Retorna copias nuevas para que los llamadores puedan modificarlas
+        (ej: inyectar imagenUrl) sin alterar el snapshot.
+        """
+        return {
+            "id": self.id,
+            "types": list(self.types),
+            "properties": {
+                key: list(value) if isinstance(value, tuple) else value
+                for key, value in self.properties.items()
+            }
+        }
+
+
+def _first_number(value: Any) -> Optional[float]:
+    """Primer valor numérico de una propiedad (escalar o lista)."""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    for v in values:
+        if isinstance(v, bool):
+            continue
+        if isinstance(v, (int, float)):
+            return float(v)
+    return None
+
+
+def build_record(individual, object_props: Optional[set] = None) -> ProductRecord:
+    """
+    Construye el registro inmutable de un individuo.
+
+    Los tipos inferidos por reglas SWRL se agregan después, en build_snapshot,
+    evaluando todas las reglas en lote.
+
+    Args:
+        individual: Individuo de owlready2
+        object_props: Nombres de propiedades de objeto (se calculan si es None)
+
+    Returns:
+        ProductRecord con los datos materializados
+    """
+    reasoned_types = get_individual_classes(individual)
+    properties = get_individual_properties(individual)
+    types = list(reasoned_types)
+
+    direct_types = tuple(
+        cls.name for cls in individual.is_a
+        if hasattr(cls, "name") and cls.name != "Thing"
+    )
+
+    if object_props is None:
+        object_props = {
+            prop.python_name for prop in individual.get_properties()
+            if isinstance(prop, ObjectPropertyClass)
+        }
+
+    specs = {}
+    links = {}
+    frozen_props = {}
+    for key, value in properties.items():
+        if key in object_props:
+            values = value if isinstance(value, list) else [value]
+            links[key] = tuple(values)
+        else:
+            number = _first_number(value)
+            if number is not None:
+                specs[key] = number
+        frozen_props[key] = tuple(value) if isinstance(value, list) else value
+
+    category = next((t for t in types if t in PRODUCT_CATEGORIES), None)
+
+    return ProductRecord(
+        id=individual.name,
+        types=tuple(types),
+        direct_types=direct_types,
+        reasoned_types=tuple(reasoned_types),
+        properties=MappingProxyType(frozen_props),
+        specs=MappingProxyType(specs),
+        links=MappingProxyType(links),
+        category=category
+    )
+
+
+class OntologySnapshot:
+    """
+    Vista materializada e inmutable de todos los individuos de la ontología.
+
+    Se construye completa y se publica de una sola vez (swap de referencia),
+    por lo que los lectores nunca observan un snapshot a medio construir.
+    """
+
+    def __init__(
+        self,
+        records: Dict[str, ProductRecord],
+        product_ids: Iterable[str],
+        class_names: Iterable[str] = (),
+        version: int = 0,
+        by_class: Optional[Mapping[str, Iterable[str]]] = None
+    ):
+        self.version = version
+        # records puede ser cualquier Mapping (ej: registros en un archivo mapeado)
+        self._records = records
+        self._by_lower = {rid.lower(): rid for rid in records}
+        self.product_ids = tuple(product_ids)
+        self.class_names = frozenset(class_names)
+
+        # Índice clase -> IDs (razonador y reglas; equivalente a Clase.instances())
+        if by_class is None:
+            by_class = {}
+            for rid, record in records.items():
+                for cls_name in record.reasoned_types:
+                    by_class.setdefault(cls_name, []).append(rid)
+        self._by_class = {cls_name: tuple(ids) for cls_name, ids in by_class.items()}
+        # Estructuras derivadas (columnas, índices) ligadas a esta versión
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, individual_id: str) -> bool:
+        return individual_id in self._records
+
+    def get(self, individual_id: str) -> Optional[ProductRecord]:
+        """Obtiene un registro por ID (sin distinguir mayúsculas)."""
+        if not individual_id:
+            return None
+        record = self._records.get(individual_id)
+        if record is None:
+            record_id = self._by_lower.get(individual_id.lower())
+            record = self._records.get(record_id) if record_id is not None else None
+        return record
+
+    def get_many(self, individual_ids: Iterable[str]) -> List[ProductRecord]:
+        """Obtiene varios registros conservando el orden y omitiendo faltantes."""
+        records = []
+        for individual_id in individual_ids:
+            record = self.get(individual_id)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def records(self) -> List[ProductRecord]:
+        """Todos los registros en el orden de la ontología."""
+        return list(self._records.values())
+
+    def record_ids(self) -> List[str]:
+        """IDs de todos los registros en el orden de la ontología (sin decodificarlos)."""
+        return list(self._records)
+
+    def products(self) -> List[ProductRecord]:
+        """Registros de las instancias de Producto."""
+        return [self._records[pid] for pid in self.product_ids]
+
+    def has_class(self, class_name: str) -> bool:
+        """Indica si la clase existe en la ontología."""
+        return class_name in self.class_names or class_name in self._by_class
+
+    def instances_of(self, class_name: str) -> List[ProductRecord]:
+        """Registros que pertenecen a la clase (directa o inferida por el razonador)."""
+        return [self._records[rid] for rid in self._by_class.get(class_name, ())]
+
+    def count_of(self, class_name: str) -> int:
+        """Cantidad de instancias de la clase (sin materializar la lista)."""
+        return len(self._by_class.get(class_name, ()))
+
+    def class_index(self) -> Dict[str, Tuple[str, ...]]:
+        """Índice clase -> IDs de instancias (para exportar el snapshot)."""
+        return dict(self._by_class)
+
+    def derived(
+        self,
+        key: str,
+        builder: Callable[["OntologySnapshot"], Any],
+        current: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Obtiene una estructura derivada del snapshot, construyéndola una sola vez.
+
+        Como el snapshot es inmutable, lo derivado queda válido mientras esta
+        versión esté publicada y se descarta junto con ella.
+
+        Args:
+            key: Nombre de la estructura (ej: "spec_matrix")
+            builder: Función que la construye a partir del snapshot
+            current: Indica si el valor guardado sigue vigente; si retorna
+                False se reconstruye (estructuras que dependen del índice de
+                adyacencia, que add_relation cambia sin publicar snapshot)
+        """
+        value = self._derived.get(key)
+        if value is None or (current is not None and not current(value)):
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None or (current is not None and not current(value)):
+                    value = builder(self)
+                    self._derived[key] = value
+        return value
+
+    def inherit_derived(self, previous: "OntologySnapshot", changed_ids: Iterable[str]):
+        """
+        Reutiliza las estructuras derivadas del snapshot anterior.
+
+        Solo se heredan las que saben actualizarse de forma incremental
+        (método updated(snapshot, changed_ids)); el resto se reconstruye
+        al primer uso.
+        """
+        changed_ids = list(changed_ids)
+        for key, value in list(previous._derived.items()):
+            updater = getattr(value, "updated", None)
+            if updater is None:
+                continue
+            try:
+                self._derived[key] = updater(self, changed_ids)
+            except Exception as e:
+                logger.error(f"Error actualizando '{key}' de forma incremental: {e}")
+
+    def record_map(self) -> Dict[str, ProductRecord]:
+        """Copia del mapa ID -> registro (para derivar un snapshot nuevo)."""
+        return dict(self._records)
+
+
+def apply_rule_inferences(records: Dict[str, ProductRecord], inferences) -> Dict[str, ProductRecord]:
+    """
+    Agrega a los registros los tipos inferidos por las reglas SWRL.
+
+    Los tipos existentes se conservan; las clases nuevas se agregan al final
+    de types y de reasoned_types (el índice clase -> IDs de instances_of se
+    construye con reasoned_types).
+    """
+    updated = dict(records)
+    for individual_id, classes in inferences.types.items():
+        record = updated.get(individual_id)
+        if record is None:
+            continue
+        new_types = [cls for cls in sorted(classes) if cls not in record.types]
+        new_reasoned = [cls for cls in sorted(classes) if cls not in record.reasoned_types]
+        if new_types or new_reasoned:
+            updated[individual_id] = replace(
+                record,
+                types=record.types + tuple(new_types),
+                reasoned_types=record.reasoned_types + tuple(new_reasoned)
+            )
+    return updated
+
+
+def _asserted_classes(onto, individual, class_names: set) -> set:
+    """
+    Clases de class_names afirmadas para el individuo: las que tienen el
+    triple rdf:type en alguna ontología distinta de la de inferencias.
+    """
+    inferences_onto = onto.world.get_ontology(INFERENCES_ONTOLOGY_IRI)
+    asserted = set()
+    for cls in individual.is_a:
+        name = getattr(cls, "name", None)
+        if name not in class_names:
+            continue
+        for ontology in onto.world.ontologies.values():
+            if ontology is not inferences_onto and ontology._has_obj_triple_spo(individual.storid, rdf_type, cls.storid):
+                asserted.add(name)
+                break
+    return asserted
+
+
+def write_rule_types(onto, individuals: Iterable, inferences, rule_classes: set, remove: bool = False):
+    """
+    Escribe en el World las clases derivadas de reglas, en la ontología de
+    inferencias de owlready2 (la misma que usa Pellet).
+
+    Args:
+        onto: Ontología de los individuos
+        individuals: Individuos de owlready2 a actualizar
+        inferences: Resultado de SWRLRuleEvaluator.evaluate
+        rule_classes: Clases cabeza de reglas
+        remove: Quitar también las clases inferidas que ya no se cumplen
+            (los datos del individuo cambiaron). Las afirmadas en la
+            ontología nunca se quitan.
+    """
+    classes = {name: getattr(onto, name, None) for name in rule_classes}
+    with onto.world.get_ontology(INFERENCES_ONTOLOGY_IRI):
+        for individual in individuals:
+            inferred = inferences.classes_for(individual.name)
+            stale = [
+                cls for name, cls in classes.items()
+                if remove and cls is not None and name not in inferred and cls in individual.is_a
+            ]
+            if stale:
+                asserted = _asserted_classes(onto, individual, rule_classes)
+                for cls in stale:
+                    if cls.name not in asserted:
+                        individual.is_a.remove(cls)
+            for name in sorted(inferred):
+                cls = classes.get(name)
+                if cls is not None and not isinstance(individual, cls):
+                    individual.is_a.append(cls)
+
+
+def write_rule_relations(onto, relation_changes: Dict[str, Dict[str, List[Tuple[str, str]]]]) -> List:
+    """
+    Aplica en el World las relaciones inferidas agregadas y quitadas (en la
+    ontología de inferencias).
+
+    Returns:
+        Individuos sujeto cuyas relaciones salientes cambiaron
+    """
+    subjects = {}
+    with onto.world.get_ontology(INFERENCES_ONTOLOGY_IRI):
+        for prop_name, pairs in relation_changes.items():
+            for kind in ("removed", "added"):
+                for subject_id, object_id in pairs[kind]:
+                    subject = onto.search_one(iri=f"{onto.base_iri}{subject_id}")
+                    obj = onto.search_one(iri=f"{onto.base_iri}{object_id}")
+                    if subject is None or obj is None:
+                        continue
+                    values = getattr(subject, prop_name)
+                    if not isinstance(values, list):
+                        setattr(subject, prop_name, obj if kind == "added" else None)
+                    elif kind == "added" and obj not in values:
+                        values.append(obj)
+                    elif kind == "removed" and obj in values:
+                        values.remove(obj)
+                    subjects[subject.name] = subject
+    return list(subjects.values())
+
+
+def _strip_classes(record: ProductRecord, classes: set) -> ProductRecord:
+    """Quita clases de los tipos de un registro (ej: clases derivadas de reglas)."""
+    if not classes.intersection(record.types) and not classes.intersection(record.reasoned_types):
+        return record
+    return replace(
+        record,
+        types=tuple(t for t in record.types if t not in classes),
+        reasoned_types=tuple(t for t in record.reasoned_types if t not in classes)
+    )
+
+
+def update_snapshot(
+    snapshot: OntologySnapshot,
+    onto,
+    individuals: List,
+    version: int
+) -> Tuple[OntologySnapshot, Dict[str, Any]]:
+    """
+    Deriva un snapshot nuevo re-materializando solo los individuos dados.
+
+    Los registros no afectados se comparten con el snapshot anterior. Las
+    reglas SWRL se evalúan únicamente para los afectados: sus clases
+    derivadas de reglas se recalculan y las relaciones inferidas en las que
+    participan se comparan con las de los datos anteriores. Ambos cambios
+    se escriben también en el World; los sujetos de relaciones que cambian
+    se re-materializan (links).
+
+    Args:
+        snapshot: Snapshot vigente
+        onto: Ontología (ya modificada)
+        individuals: Individuos de owlready2 cuyos datos cambiaron
+        version: Versión del nuevo snapshot
+
+    Returns:
+        (nuevo snapshot, cambios por individuo y por relación)
+    """
+    from reasoning.rule_evaluator import SWRLRuleEvaluator
+
+    evaluator = SWRLRuleEvaluator.from_ontology(onto)
+    rule_classes = evaluator.head_classes
+    object_props = {prop.python_name for prop in onto.object_properties()}
+
+    old_records = snapshot.record_map()
+    records = dict(old_records)
+    previous = {}
+    for individual in individuals:
+        previous[individual.name] = records.get(individual.name)
+        # Las clases derivadas de reglas se recalculan con los datos actuales
+        records[individual.name] = _strip_classes(
+            build_record(individual, object_props),
+            rule_classes - _asserted_classes(onto, individual, rule_classes)
+        )
+
+    changed_ids = list(previous)
+    inferences = evaluator.evaluate(records.values(), subset=changed_ids, relations=True)
+    records = apply_rule_inferences(records, inferences)
+    write_rule_types(onto, individuals, inferences, rule_classes, remove=True)
+
+    # Relaciones inferidas en las que participan los afectados, antes y después
+    old_relations = evaluator.evaluate(old_records.values(), subset=changed_ids, relations=True).relations
+    relation_changes: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+    for prop in set(old_relations) | set(inferences.relations):
+        old_pairs = old_relations.get(prop, set())
+        new_pairs = inferences.relations.get(prop, set())
+        added = sorted(new_pairs - old_pairs)
+        removed = sorted(old_pairs - new_pairs)
+        if added or removed:
+            relation_changes[prop] = {"added": added, "removed": removed}
+
+    for subject in write_rule_relations(onto, relation_changes):
+        record = records.get(subject.name)
+        if record is None:
+            continue
+        fresh = build_record(subject, object_props)
+        records[subject.name] = replace(record, properties=fresh.properties, links=fresh.links)
+        if subject.name not in previous:
+            changed_ids.append(subject.name)
+
+    # Nuevos productos se agregan al final conservando el orden existente
+    product_ids = list(snapshot.product_ids)
+    known = set(product_ids)
+    producto_class = getattr(onto, "Producto", None)
+    for individual in individuals:
+        if individual.name not in known and producto_class is not None and isinstance(individual, producto_class):
+            product_ids.append(individual.name)
+
+    type_changes = {}
+    for individual_id, old_record in previous.items():
+        old_types = set(old_record.types) if old_record else set()
+        new_types = set(records[individual_id].types)
+        type_changes[individual_id] = {
+            "added": sorted(new_types - old_types),
+            "removed": sorted(old_types - new_types)
+        }
+
+    updated = OntologySnapshot(records, product_ids, snapshot.class_names, version)
+    updated.inherit_derived(snapshot, changed_ids)
+    return updated, {"types": type_changes, "relations": relation_changes}
+
+
+def build_snapshot(onto, version: int = 0) -> OntologySnapshot:
+    """
+    Construye el snapshot recorriendo owlready2 una sola vez.
+
+    Args:
+        onto: Ontología cargada (idealmente ya razonada)
+        version: Versión de la ontología asociada al snapshot
+
+    Returns:
+        OntologySnapshot listo para publicarse
+    """
+    object_props = {prop.python_name for prop in onto.object_properties()}
+
+    records = {}
+    individuals = {}
+    for individual in onto.individuals():
+        if not individual.name or individual.name in records:
+            continue
+        try:
+            records[individual.name] = build_record(individual, object_props)
+            individuals[individual.name] = individual
+        except Exception as e:
+            logger.error(f"Error materializando '{individual.name}': {e}")
+
+    product_ids = {}
+    producto_class = getattr(onto, "Producto", None)
+    if producto_class is not None:
+        for product in producto_class.instances():
+            if product.name in records:
+                product_ids.setdefault(product.name, None)
+
+    class_names = [cls.name for cls in onto.classes() if hasattr(cls, "name")]
+
+    # Reglas SWRL de clase evaluadas en lote (sin depender de Pellet). Las de
+    # relaciones (cuadráticas) solo se evalúan en las actualizaciones
+    # incrementales, para los individuos afectados
+    from reasoning.rule_evaluator import SWRLRuleEvaluator
+    evaluator = SWRLRuleEvaluator.from_ontology(onto)
+    rule_classes = evaluator.head_classes
+    # Las clases cabeza inferidas se recalculan con los datos actuales (un
+    # snapshot anterior pudo escribirlas en el World); las afirmadas se conservan
+    records = {
+        rid: _strip_classes(record, rule_classes - _asserted_classes(onto, individuals[rid], rule_classes))
+        for rid, record in records.items()
+    }
+    inferences = evaluator.evaluate(records.values())
+    records = apply_rule_inferences(records, inferences)
+    write_rule_types(onto, individuals.values(), inferences, rule_classes, remove=True)
+
+    snapshot = OntologySnapshot(records, list(product_ids), class_names, version)
+    logger.info(f"Snapshot v{version} construido: {len(records)} individuos, {len(product_ids)} productos")
+    return snapshot
@@ -0,0 +1,280 @@
+"""
+Exportación del snapshot a archivos mapeados en memoria - SmartCompareMarket
+
+En modo pre-fork (serve.py) el proceso maestro carga y razona la ontología
+una sola vez y exporta el snapshot a un directorio:
+
+- manifest.json: versión, IDs de productos, clases, índice clase -> IDs
+  y relaciones del índice de adyacencia
+- records.bin + offsets.npy: cada registro serializado como JSON, uno
+  detrás de otro, con sus desplazamientos
+- specs.npy + category_codes.npy: columnas de la matriz de especificaciones
+  (una fila contigua por columna)
+
+Los workers abren estos archivos con mmap (np.load(mmap_mode="r")): las
+páginas las comparte el sistema operativo entre todos los procesos y un
+registro solo se decodifica la primera vez que se lee. Así el arranque de
+un worker no recorre owlready2 ni vuelve a evaluar las reglas SWRL.
+
+Límite: solo las columnas de la matriz de especificaciones se comparten
+(los índices de rango se calculan sobre ellas sin decodificar registros, y
+la adyacencia se rearma desde el manifiesto). El índice de texto y el JSON
+de listados se construyen en cada worker a partir de todos los registros,
+así que la primera búsqueda o listado decodifica el catálogo completo en
+ese proceso y su memoria no se comparte.
+"""
+
+from datetime import date, datetime, time
+import json
+import mmap
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ontology.adjacency import AdjacencyIndex
+from ontology.snapshot import OntologySnapshot, ProductRecord
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato en disco
+EXPORT_FORMAT = 2
+
+
+# Literales que JSON no representa: se guardan etiquetados
+_TEMPORAL_TYPES = {"$datetime": datetime, "$date": date, "$time": time}
+
+
+def _encode_value(value):
+    for tag, temporal_type in _TEMPORAL_TYPES.items():
+        # datetime es subclase de date: se prueba primero
+        if type(value) is temporal_type:
+            return {tag: value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and len(value) == 1:
+        tag, text = next(iter(value.items()))
+        temporal_type = _TEMPORAL_TYPES.get(tag)
+        if temporal_type is not None:
+            return temporal_type.fromisoformat(text)
+    return value
+
+
+def _record_to_json(record: ProductRecord) -> Dict[str, Any]:
+    return {
+        "id": record.id,
+        "types": list(record.types),
+        "direct_types": list(record.direct_types),
+        "reasoned_types": list(record.reasoned_types),
+        "properties": {
+            key: [_encode_value(v) for v in value] if isinstance(value, tuple) else _encode_value(value)
+            for key, value in record.properties.items()
+        },
+        "specs": dict(record.specs),
+        "links": {key: list(values) for key, values in record.links.items()},
+        "category": record.category,
+    }
+
+
+def _record_from_json(data: Dict[str, Any]) -> ProductRecord:
+    return ProductRecord(
+        id=data["id"],
+        types=tuple(data["types"]),
+        direct_types=tuple(data["direct_types"]),
+        reasoned_types=tuple(data["reasoned_types"]),
+        properties=MappingProxyType({
+            key: tuple(_decode_value(v) for v in value) if isinstance(value, list) else _decode_value(value)
+            for key, value in data["properties"].items()
+        }),
+        specs=MappingProxyType(data["specs"]),
+        links=MappingProxyType({key: tuple(values) for key, values in data["links"].items()}),
+        category=data["category"],
+    )
+
+
+class MappedRecords(Mapping):
+    """
+    Registros leídos bajo demanda desde records.bin (mapeado en memoria).
+
+    Cada registro se decodifica una vez por proceso, al primer acceso. Las
+    estructuras derivadas que recorren todos los productos (índice de texto,
+    JSON de listados) terminan decodificándolos todos en cada worker.
+    """
+
+    def __init__(self, ids: Sequence[str], data: mmap.mmap, offsets: np.ndarray):
+        self._rows = {record_id: row for row, record_id in enumerate(ids)}
+        self._data = data
+        self._offsets = offsets
+        self._decoded: Dict[str, ProductRecord] = {}
+
+    def __getitem__(self, record_id: str) -> ProductRecord:
+        record = self._decoded.get(record_id)
+        if record is None:
+            row = self._rows[record_id]
+            start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+            record = _record_from_json(json.loads(self._data[start:end]))
+            self._decoded[record_id] = record
+        return record
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._rows
+
+    @property
+    def decoded(self) -> int:
+        """Cantidad de registros ya decodificados en este proceso."""
+        return len(self._decoded)
+
+
+class _RecordSequence(Sequence):
+    """Registros de una lista de IDs, resueltos al acceder (para SpecMatrix.records)."""
+
+    def __init__(self, records: Mapping, ids: Sequence[str]):
+        self._records = records
+        self._ids = ids
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._records[record_id] for record_id in self._ids[position]]
+        return self._records[self._ids[int(position)]]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def export_snapshot(
+    snapshot: OntologySnapshot,
+    directory: Path,
+    adjacency: Optional[AdjacencyIndex] = None,
+    content_hash: Optional[str] = None
+) -> Path:
+    """
+    Exporta el snapshot (y el índice de adyacencia) para que otros procesos
+    lo abran con attach_snapshot.
+
+    Se escribe en un directorio temporal y se publica con un rename atómico.
+
+    Returns:
+        Ruta del directorio exportado
+    """
+    from ontology.columns import SPEC_COLUMNS, get_spec_matrix
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"snapshot-v{snapshot.version}" + (f"-{content_hash[:16]}" if content_hash else "")
+    target = directory / name
+    staging = Path(tempfile.mkdtemp(prefix=f".{name}.", dir=str(directory)))
+    os.chmod(staging, 0o755)
+
+    try:
+        records = snapshot.records()
+        record_ids = [record.id for record in records]
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        with open(staging / "records.bin", "wb") as f:
+            for row, record in enumerate(records):
+                data = json.dumps(_record_to_json(record), ensure_ascii=False).encode("utf-8")
+                f.write(data)
+                offsets[row + 1] = offsets[row] + len(data)
+        np.save(staging / "offsets.npy", offsets)
+
+        matrix = get_spec_matrix(snapshot)
+        spec_props = list(dict.fromkeys(SPEC_COLUMNS.values()))
+        # Una fila por columna: cada columna queda contigua en el archivo
+        specs = np.array([matrix.column(prop) for prop in spec_props], dtype=float).reshape(len(spec_props), matrix.size)
+        np.save(staging / "specs.npy", specs)
+        np.save(staging / "category_codes.npy", matrix.category_codes)
+
+        manifest = {
+            "format": EXPORT_FORMAT,
+            "version": snapshot.version,
+            "content_hash": content_hash,
+            "record_ids": record_ids,
+            "product_ids": list(snapshot.product_ids),
+            "class_names": sorted(snapshot.class_names),
+            "by_class": {cls_name: list(ids) for cls_name, ids in snapshot.class_index().items()},
+            "spec_columns": spec_props,
+        }
+        if adjacency is not None:
+            manifest["adjacency"] = {
+                "edges": {prop: [list(edge) for edge in adjacency.edges(prop)] for prop in adjacency.properties()},
+                "symmetric": sorted(adjacency.symmetric),
+            }
+        with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Snapshot v{snapshot.version} exportado en {target}")
+    return target
+
+
+def attach_snapshot(path: Path) -> Tuple[OntologySnapshot, Optional[AdjacencyIndex]]:
+    """
+    Abre un snapshot exportado sin copiar sus datos.
+
+    Los arreglos se mapean en modo solo lectura y los registros se
+    decodifican a medida que se leen. La matriz de especificaciones queda
+    registrada como estructura derivada del snapshot.
+
+    Raises:
+        ValueError: Si el directorio no contiene un snapshot compatible
+    """
+    from ontology.columns import SpecMatrix
+
+    path = Path(path)
+    with open(path / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != EXPORT_FORMAT:
+        raise ValueError(f"Formato de snapshot no soportado en {path}: {manifest.get('format')}")
+
+    offsets = np.load(path / "offsets.npy", mmap_mode="r")
+    with open(path / "records.bin", "rb") as f:
+        # mmap de longitud 0 no está permitido (catálogo vacío)
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+    records = MappedRecords(manifest["record_ids"], data, offsets)
+
+    snapshot = OntologySnapshot(
+        records,
+        manifest["product_ids"],
+        manifest["class_names"],
+        manifest["version"],
+        by_class=manifest["by_class"]
+    )
+
+    specs = np.load(path / "specs.npy", mmap_mode="r")
+    product_ids = snapshot.product_ids
+    matrix = SpecMatrix.from_arrays(
+        _RecordSequence(records, product_ids),
+        product_ids,
+        {prop: specs[position] for position, prop in enumerate(manifest["spec_columns"])},
+        np.load(path / "category_codes.npy", mmap_mode="r"),
+        snapshot.version
+    )
+    snapshot.derived("spec_matrix", lambda _: matrix)
+
+    adjacency = None
+    if "adjacency" in manifest:
+        adjacency = AdjacencyIndex.from_edges(
+            {prop: map(tuple, edges) for prop, edges in manifest["adjacency"]["edges"].items()},
+            manifest["adjacency"]["symmetric"]
+        )
+
+    logger.info(f"Snapshot v{snapshot.version} adjuntado desde {path}")
+    return snapshot, adjacency
@@ -0,0 +1,279 @@
+"""
+Índice invertido de texto completo - SmartCompareMarket
+
+Tokeniza nombre, marca, modelo de procesador, categoría y descripción de
+cada producto (minúsculas y sin acentos: "Reseña" -> "resena") y mantiene
+un índice término -> {producto: frecuencia ponderada}. Las búsquedas
+resuelven cada término de la consulta por prefijo sobre el vocabulario
+ordenado (bisect), exigen que todos los términos coincidan y ordenan los
+resultados con BM25.
+
+Se construye una vez por snapshot y, cuando solo cambian algunos productos,
+se actualiza de forma incremental (copy-on-write) sin reindexar el catálogo.
+"""
+
+from bisect import bisect_left, insort
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from ontology.loader import get_snapshot
+from ontology.snapshot import OntologySnapshot, ProductRecord
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada campo en la frecuencia del término
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "brand": 2.0,
+    "processor": 2.0,
+    "category": 1.0,
+    "description": 1.0,
+}
+
+# Factor aplicado cuando el término solo coincide por prefijo
+PREFIX_FACTOR = 0.8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin diacríticos ("Electrónica" -> "electronica")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Términos alfanuméricos del texto ya normalizado."""
+    return _TOKEN_RE.findall(fold(text))
+
+
+def _texts(value) -> List[str]:
+    """Valores de texto de una propiedad (escalar o lista)."""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [v for v in values if isinstance(v, str)]
+
+
+def document_fields(record: ProductRecord, snapshot: OntologySnapshot) -> Dict[str, List[str]]:
+    """Textos indexables de un producto, agrupados por campo."""
+    props = record.properties
+    brands = []
+    for brand_id in record.links.get("tieneMarca", ()):
+        brand = snapshot.get(brand_id)
+        brands.extend(_texts(brand.properties.get("tieneNombre")) if brand else [])
+        brands.append(brand_id.replace("Marca_", ""))
+    return {
+        "name": _texts(props.get("tieneNombre")),
+        "brand": brands,
+        "processor": _texts(props.get("procesadorModelo")),
+        "category": [record.category] if record.category else [],
+        "description": _texts(props.get("tieneDescripcion")),
+    }
+
+
+class TextIndex:
+    """
+    Índice invertido con ranking BM25 y búsqueda por prefijo.
+
+    Attributes:
+        k1, b: Parámetros de BM25
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_length: Dict[str, float] = {}
+        self._total_length = 0.0
+        # Términos cuyas listas pertenecen a esta instancia (None: todas)
+        self._owned: Optional[Set[str]] = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "TextIndex":
+        index = cls()
+        for record in snapshot.products():
+            index.add(record.id, document_fields(record, snapshot))
+        logger.debug(f"Índice de texto v{snapshot.version}: {len(index)} productos, {len(index._terms)} términos")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def _posting_for_write(self, term: str) -> Dict[str, float]:
+        posting = self._postings.get(term)
+        if posting is None:
+            posting = self._postings[term] = {}
+            insort(self._terms, term)
+        elif self._owned is not None and term not in self._owned:
+            # Copia la lista compartida con el índice anterior antes de modificarla
+            posting = self._postings[term] = dict(posting)
+        if self._owned is not None:
+            self._owned.add(term)
+        return posting
+
+    def add(self, doc_id: str, fields: Dict[str, Iterable[str]]):
+        """Indexa (o reindexa) un documento."""
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+
+        frequencies: Dict[str, float] = {}
+        for field_name, texts in fields.items():
+            weight = FIELD_WEIGHTS.get(field_name, 1.0)
+            for text in texts:
+                for term in tokenize(text):
+                    frequencies[term] = frequencies.get(term, 0.0) + weight
+
+        for term, frequency in frequencies.items():
+            self._posting_for_write(term)[doc_id] = frequency
+        length = sum(frequencies.values())
+        self._doc_terms[doc_id] = frequencies
+        self._doc_length[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: str):
+        """Elimina un documento del índice si existe."""
+        frequencies = self._doc_terms.pop(doc_id, None)
+        if frequencies is None:
+            return
+        self._total_length -= self._doc_length.pop(doc_id, 0.0)
+        for term in frequencies:
+            posting = self._posting_for_write(term)
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def updated(self, snapshot: OntologySnapshot, changed_ids: Iterable[str]) -> "TextIndex":
+        """
+        Copia del índice con los productos dados reindexados según el snapshot.
+
+        Las listas de términos no afectados se comparten con este índice, que
+        sigue siendo válido para los lectores del snapshot anterior.
+        """
+        clone = TextIndex()
+        clone._postings = dict(self._postings)
+        clone._terms = list(self._terms)
+        clone._doc_terms = dict(self._doc_terms)
+        clone._doc_length = dict(self._doc_length)
+        clone._total_length = self._total_length
+        clone._owned = set()
+
+        products = set(snapshot.product_ids)
+        for doc_id in changed_ids:
+            record = snapshot.get(doc_id)
+            if record is not None and record.id in products:
+                clone.add(record.id, document_fields(record, snapshot))
+            else:
+                clone.remove(doc_id)
+        return clone
+
+    def _expand(self, token: str) -> List[str]:
+        """Términos del vocabulario que empiezan por el token."""
+        terms = []
+        position = bisect_left(self._terms, token)
+        while position < len(self._terms) and self._terms[position].startswith(token):
+            terms.append(self._terms[position])
+            position += 1
+        return terms
+
+    def estimate(self, query: str) -> int:
+        """
+        Cota superior de resultados: la menor suma de frecuencias de
+        documento entre los tokens de la consulta (sin calcular puntajes).
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0
+        return min(
+            min(sum(len(self._postings[term]) for term in self._expand(token)), len(self._doc_terms))
+            for token in tokens
+        )
+
+    def _token_scores(
+        self,
+        token: str,
+        avg_length: float,
+        candidates: Optional[Set[str]] = None
+    ) -> Dict[str, float]:
+        """Puntaje BM25 de cada documento para un token (mejor término coincidente)."""
+        total_docs = len(self._doc_terms)
+        scores: Dict[str, float] = {}
+        for term in self._expand(token):
+            posting = self._postings[term]
+            df = len(posting)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            if term != token:
+                idf *= PREFIX_FACTOR
+            if candidates is not None and len(candidates) < df:
+                # Pocos candidatos: consultar la lista en lugar de recorrerla
+                entries = ((doc_id, posting[doc_id]) for doc_id in candidates if doc_id in posting)
+            else:
+                entries = posting.items()
+            for doc_id, tf in entries:
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_length[doc_id] / avg_length)
+                score = idf * tf * (self.k1 + 1) / (tf + norm)
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        candidates: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Busca productos que contengan todos los términos de la consulta.
+
+        Args:
+            query: Texto libre (cada término coincide por prefijo)
+            limit: Número máximo de resultados (None: todos)
+            candidates: Restringe la búsqueda a estos IDs (None: todo el índice)
+
+        Returns:
+            Lista de (id_producto, puntaje) ordenada por relevancia
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_terms:
+            return []
+
+        if candidates is not None:
+            candidates = set(candidates)
+            if not candidates:
+                return []
+
+        avg_length = self._total_length / len(self._doc_terms) or 1.0
+        per_token = sorted(
+            (self._token_scores(token, avg_length, candidates) for token in tokens), key=len
+        )
+
+        # Intersección empezando por el token más selectivo
+        totals = dict(per_token[0])
+        for scores in per_token[1:]:
+            totals = {doc_id: total + scores[doc_id] for doc_id, total in totals.items() if doc_id in scores}
+            if not totals:
+                return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def matching_ids(self, query: str) -> Set[str]:
+        """IDs que coinciden con la consulta (sin ordenar)."""
+        return {doc_id for doc_id, _ in self.search(query)}
+
+
+def get_text_index(snapshot: Optional[OntologySnapshot] = None) -> TextIndex:
+    """Índice de texto de la versión vigente (construido una vez por snapshot)."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    return snapshot.derived("text_index", TextIndex.from_snapshot)
@@ -12,6 +12,8 @@ from typing import List, Dict, Optional, Set
 from owlready2 import World, Ontology, Thing, ObjectProperty
 import logging
 
+from ontology.loader import get_ontology, get_index, get_adjacency
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -24,32 +26,55 @@ class InferenceEngine:
     y relaciones explícitas entre productos.
     """
     
-    def __init__(self, ontology: Ontology):
+    def __init__(self, ontology: Optional[Ontology] = None):
         """
         Inicializa el motor de inferencia.
         
         Args:
-            ontology: Ontología cargada con Owlready2 (ya razonada con HermiT)
+            ontology: Ontología cargada con Owlready2 (ya razonada con HermiT).
+                Si es None, el motor sigue a la ontología activa del loader,
+                incluso cuando se reemplaza tras el razonamiento en segundo plano.
         """
-        self.ontology = ontology
-        self.namespace = ontology.get_namespace("http://smartcompare.com/ontologia#")
+        self._ontology = ontology
+        
+        # Índices propios solo para una ontología fija; si no, los compartidos
+        self._index = get_index(ontology) if ontology is not None else None
+        self._adjacency = get_adjacency(ontology) if ontology is not None else None
         
-        # Obtener propiedades de la ontología
+        # Verificar propiedades de la ontología
         self._load_properties()
         
         logger.info("InferenceEngine inicializado correctamente")
     
+    @property
+    def ontology(self) -> Ontology:
+        """Ontología fija o la ontología activa del loader."""
+        return self._ontology if self._ontology is not None else get_ontology()
+    
+    @property
+    def index(self):
+        """Índice ID -> individuo de la ontología en uso."""
+        return self._index if self._index is not None else get_index()
+    
+    @property
+    def adjacency(self):
+        """Índice de adyacencia de la ontología en uso."""
+        return self._adjacency if self._adjacency is not None else get_adjacency()
+    
+    @property
+    def namespace(self):
+        return self.ontology.get_namespace("http://smartcompare.com/ontologia#")
+    
+    @property
+    def Producto(self):
+        return self.ontology.Producto
+    
     def _load_properties(self):
-        """Carga las propiedades de objeto relevantes de la ontología."""
+        """Verifica que la ontología tenga las propiedades de objeto relevantes."""
         try:
-            # Propiedades de compatibilidad y similitud
-            self.esCompatibleCon = self.ontology.esCompatibleCon
-            self.incompatibleCon = self.ontology.incompatibleCon
-            self.esSimilarA = self.ontology.esSimilarA
-            self.esMejorOpcionQue = self.ontology.esMejorOpcionQue
-            
-            # Clases principales
-            self.Producto = self.ontology.Producto
+            ontology = self.ontology
+            for name in ("esCompatibleCon", "incompatibleCon", "esSimilarA", "esMejorOpcionQue", "Producto"):
+                getattr(ontology, name)
             
             logger.debug("Propiedades cargadas correctamente")
         except AttributeError as e:
@@ -67,13 +92,8 @@ class InferenceEngine:
             Individuo del producto o None si no existe
         """
         try:
-            # Buscar el individuo en la ontología
-            product = self.ontology.search_one(iri=f"*{product_id}")
-            if product is None:
-                # Intentar con el namespace completo
-                product = self.ontology.search_one(
-                    iri=f"http://smartcompare.com/ontologia#{product_id}"
-                )
+            # Buscar el individuo en el índice (sin distinguir mayúsculas)
+            product = self.index.get(product_id)
             
             if product and isinstance(product, self.Producto):
                 return product
@@ -85,6 +105,50 @@ class InferenceEngine:
             logger.error(f"Error al buscar producto '{product_id}': {e}")
             return None
     
+    def _product_name(self, individual: Thing) -> str:
+        """Nombre legible (primer tieneNombre) de un individuo."""
+        names = getattr(individual, 'tieneNombre', None)
+        if isinstance(names, list):
+            return names[0] if names else 'Sin nombre'
+        return names or 'Sin nombre'
+    
+    def _products_only(self, individual_ids, exclude_id: str) -> List[str]:
+        """Filtra IDs dejando solo instancias de Producto distintas de exclude_id."""
+        result = []
+        for individual_id in individual_ids:
+            if individual_id == exclude_id:
+                continue
+            if isinstance(self.index.get(individual_id), self.Producto):
+                result.append(individual_id)
+        return result
+    
+    def _related_entries(self, individual_ids, relation: str) -> List[Dict]:
+        """Convierte IDs relacionados al formato de respuesta {id, name, relation}."""
+        entries = []
+        for individual_id in individual_ids:
+            individual = self.index.get(individual_id)
+            if individual is None:
+                continue
+            entries.append({
+                "id": individual_id,
+                "name": self._product_name(individual),
+                "relation": relation
+            })
+        return entries
+    
+    def _get_related_products(self, product: Thing, prop_name: str) -> List[Dict]:
+        """
+        Obtiene los productos relacionados por una propiedad simétrica.
+        
+        Usa el índice de adyacencia: vecinos directos más los productos que
+        apuntan a este (relación inversa), sin duplicados.
+        """
+        related = dict.fromkeys(self.adjacency.forward(prop_name, product.name))
+        related.update(dict.fromkeys(
+            self._products_only(self.adjacency.inverse(prop_name, product.name), product.name)
+        ))
+        return self._related_entries(related, prop_name)
+    
     def get_compatible_products(self, product_id: str) -> List[Dict]:
         """
         Obtiene todos los productos compatibles con el producto dado.
@@ -102,34 +166,8 @@ class InferenceEngine:
         if product is None:
             return []
         
-        compatible_products = []
-        
         try:
-            # Obtener productos compatibles (relación directa)
-            if hasattr(product, 'esCompatibleCon'):
-                for compatible in product.esCompatibleCon:
-                    compatible_products.append({
-                        "id": compatible.name,
-                        "name": getattr(compatible, 'tieneNombre', ['Sin nombre'])[0] if hasattr(compatible, 'tieneNombre') else 'Sin nombre',
-                        "relation": "esCompatibleCon"
-                    })
-            
-            # Como es simétrica, también buscar productos que tengan este como compatible
-            # (aunque Owlready2 debería manejar esto automáticamente)
-            all_products = list(self.ontology.Producto.instances())
-            for other_product in all_products:
-                if other_product.name == product_id:
-                    continue
-                
-                if hasattr(other_product, 'esCompatibleCon'):
-                    if product in other_product.esCompatibleCon:
-                        # Verificar que no esté ya en la lista
-                        if not any(p["id"] == other_product.name for p in compatible_products):
-                            compatible_products.append({
-                                "id": other_product.name,
-                                "name": getattr(other_product, 'tieneNombre', ['Sin nombre'])[0] if hasattr(other_product, 'tieneNombre') else 'Sin nombre',
-                                "relation": "esCompatibleCon"
-                            })
+            compatible_products = self._get_related_products(product, "esCompatibleCon")
             
             logger.info(f"Encontrados {len(compatible_products)} productos compatibles con '{product_id}'")
             return compatible_products
@@ -154,32 +192,8 @@ class InferenceEngine:
         if product is None:
             return []
         
-        incompatible_products = []
-        
         try:
-            # Obtener productos incompatibles (relación directa)
-            if hasattr(product, 'incompatibleCon'):
-                for incompatible in product.incompatibleCon:
-                    incompatible_products.append({
-                        "id": incompatible.name,
-                        "name": getattr(incompatible, 'tieneNombre', ['Sin nombre'])[0] if hasattr(incompatible, 'tieneNombre') else 'Sin nombre',
-                        "relation": "incompatibleCon"
-                    })
-            
-            # Buscar productos que tengan este como incompatible (simetría)
-            all_products = list(self.ontology.Producto.instances())
-            for other_product in all_products:
-                if other_product.name == product_id:
-                    continue
-                
-                if hasattr(other_product, 'incompatibleCon'):
-                    if product in other_product.incompatibleCon:
-                        if not any(p["id"] == other_product.name for p in incompatible_products):
-                            incompatible_products.append({
-                                "id": other_product.name,
-                                "name": getattr(other_product, 'tieneNombre', ['Sin nombre'])[0] if hasattr(other_product, 'tieneNombre') else 'Sin nombre',
-                                "relation": "incompatibleCon"
-                            })
+            incompatible_products = self._get_related_products(product, "incompatibleCon")
             
             logger.info(f"Encontrados {len(incompatible_products)} productos incompatibles con '{product_id}'")
             return incompatible_products
@@ -204,32 +218,8 @@ class InferenceEngine:
         if product is None:
             return []
         
-        similar_products = []
-        
         try:
-            # Obtener productos similares (relación directa)
-            if hasattr(product, 'esSimilarA'):
-                for similar in product.esSimilarA:
-                    similar_products.append({
-                        "id": similar.name,
-                        "name": getattr(similar, 'tieneNombre', ['Sin nombre'])[0] if hasattr(similar, 'tieneNombre') else 'Sin nombre',
-                        "relation": "esSimilarA"
-                    })
-            
-            # Buscar productos que tengan este como similar (simetría)
-            all_products = list(self.ontology.Producto.instances())
-            for other_product in all_products:
-                if other_product.name == product_id:
-                    continue
-                
-                if hasattr(other_product, 'esSimilarA'):
-                    if product in other_product.esSimilarA:
-                        if not any(p["id"] == other_product.name for p in similar_products):
-                            similar_products.append({
-                                "id": other_product.name,
-                                "name": getattr(other_product, 'tieneNombre', ['Sin nombre'])[0] if hasattr(other_product, 'tieneNombre') else 'Sin nombre',
-                                "relation": "esSimilarA"
-                            })
+            similar_products = self._get_related_products(product, "esSimilarA")
             
             logger.info(f"Encontrados {len(similar_products)} productos similares a '{product_id}'")
             return similar_products
@@ -262,16 +252,14 @@ class InferenceEngine:
         
         try:
             # Verificar si product1 esMejorOpcionQue product2
-            if hasattr(product1, 'esMejorOpcionQue'):
-                if product2 in product1.esMejorOpcionQue:
-                    logger.info(f"'{product1_id}' es mejor opción que '{product2_id}' (inferido por SWRL)")
-                    return True
+            if self.adjacency.has_edge("esMejorOpcionQue", product1.name, product2.name):
+                logger.info(f"'{product1_id}' es mejor opción que '{product2_id}' (inferido por SWRL)")
+                return True
             
             # Verificar si product2 esMejorOpcionQue product1
-            if hasattr(product2, 'esMejorOpcionQue'):
-                if product1 in product2.esMejorOpcionQue:
-                    logger.info(f"'{product2_id}' es mejor opción que '{product1_id}' (inferido por SWRL)")
-                    return False
+            if self.adjacency.has_edge("esMejorOpcionQue", product2.name, product1.name):
+                logger.info(f"'{product2_id}' es mejor opción que '{product1_id}' (inferido por SWRL)")
+                return False
             
             # No hay relación definida
             return None
@@ -305,22 +293,12 @@ class InferenceEngine:
         if product is None:
             return []
         
-        better_products = []
-        
         try:
-            # Buscar productos que tienen este producto como mejor opción
-            all_products = list(self.ontology.Producto.instances())
-            for other_product in all_products:
-                if other_product.name == product_id:
-                    continue
-                
-                if hasattr(other_product, 'esMejorOpcionQue'):
-                    if product in other_product.esMejorOpcionQue:
-                        better_products.append({
-                            "id": other_product.name,
-                            "name": getattr(other_product, 'tieneNombre', ['Sin nombre'])[0] if hasattr(other_product, 'tieneNombre') else 'Sin nombre',
-                            "relation": "esMejorOpcionQue"
-                        })
+            # Productos que tienen este producto como peor opción (relación inversa)
+            better_products = self._related_entries(
+                self._products_only(self.adjacency.inverse("esMejorOpcionQue", product.name), product.name),
+                "esMejorOpcionQue"
+            )
             
             return better_products
             
@@ -334,17 +312,12 @@ class InferenceEngine:
         if product is None:
             return []
         
-        worse_products = []
-        
         try:
-            # Obtener productos que este producto es mejor opción
-            if hasattr(product, 'esMejorOpcionQue'):
-                for worse in product.esMejorOpcionQue:
-                    worse_products.append({
-                        "id": worse.name,
-                        "name": getattr(worse, 'tieneNombre', ['Sin nombre'])[0] if hasattr(worse, 'tieneNombre') else 'Sin nombre',
-                        "relation": "esMejorOpcionQue"
-                    })
+            # Productos de los que este producto es mejor opción
+            worse_products = self._related_entries(
+                self.adjacency.forward("esMejorOpcionQue", product.name),
+                "esMejorOpcionQue"
+            )
             
             return worse_products
             
@@ -375,14 +348,10 @@ class InferenceEngine:
 
         try:
             # Verificar compatibilidad
-            is_compatible = False
-            if hasattr(product1, 'esCompatibleCon'):
-                is_compatible = product2 in product1.esCompatibleCon
+            is_compatible = self.adjacency.has_edge("esCompatibleCon", product1.name, product2.name)
 
             # Verificar incompatibilidad
-            is_incompatible = False
-            if hasattr(product1, 'incompatibleCon'):
-                is_incompatible = product2 in product1.incompatibleCon
+            is_incompatible = self.adjacency.has_edge("incompatibleCon", product1.name, product2.name)
 
             return {
                 "compatible": is_compatible,
@@ -417,16 +386,8 @@ class InferenceEngine:
             return False
 
         try:
-            # Verificar si el sujeto tiene la propiedad
-            if hasattr(subject, property_name):
-                property_values = getattr(subject, property_name)
-                # property_values puede ser una lista o un objeto individual
-                if isinstance(property_values, list):
-                    return obj in property_values
-                else:
-                    return obj == property_values
-
-            return False
+            # Consultar el índice de adyacencia (O(1))
+            return self.adjacency.has_edge(property_name, subject.name, obj.name)
 
         except Exception as e:
             logger.error(f"Error al verificar propiedad '{property_name}' entre '{subject_id}' y '{object_id}': {e}")
@@ -8,10 +8,10 @@ Fecha: Diciembre 2024
 
 from typing import List, Dict, Optional, Set, Tuple
 import logging
-from owlready2 import Thing
+import time
 
-from ontology.loader import get_ontology
-from utils.owl_helpers import individual_to_dict
+from ontology.loader import get_ontology, get_snapshot, get_loader
+from ontology.snapshot import ProductRecord
 
 logger = logging.getLogger(__name__)
 
@@ -50,8 +50,8 @@ class ProductClassifier:
             Diccionario con clasificación completa y explicaciones
         """
         try:
-            # Obtener el producto
-            product = self.onto.search_one(iri=f"*{product_id}")
+            # Obtener el producto desde el snapshot materializado
+            product = get_snapshot().get(product_id)
             if not product:
                 return {
                     "error": f"Producto '{product_id}' no encontrado",
@@ -59,9 +59,8 @@ class ProductClassifier:
                 }
             
             # Obtener datos del producto
-            product_dict = individual_to_dict(product)
-            props = product_dict.get("properties", {})
-            types = product_dict.get("types", [])
+            props = product.properties
+            types = list(product.types)
             
             # Analizar clasificaciones
             direct_classes = self._get_direct_classes(product)
@@ -108,31 +107,17 @@ class ProductClassifier:
                 "product_id": product_id
             }
     
-    def _get_direct_classes(self, product: Thing) -> List[str]:
+    def _get_direct_classes(self, product: ProductRecord) -> List[str]:
         """Obtiene las clases directamente asignadas al producto."""
-        direct = []
-        for cls in product.is_a:
-            if hasattr(cls, 'name') and cls.name != 'Thing':
-                direct.append(cls.name)
-        return direct
+        return list(product.direct_types)
     
-    def _get_inferred_classes(self, product: Thing) -> List[str]:
+    def _get_inferred_classes(self, product: ProductRecord) -> List[str]:
         """Obtiene las clases inferidas por el razonador (no directas)."""
-        try:
-            all_classes = set()
-            for cls in product.INDIRECT_is_a:
-                if hasattr(cls, 'name') and cls.name != 'Thing':
-                    all_classes.add(cls.name)
-            
-            # Remover las clases directas para obtener solo las inferidas
-            direct = set(self._get_direct_classes(product))
-            inferred = all_classes - direct
-            
-            return list(inferred)
-        except:
-            return []
+        # Remover las clases directas para obtener solo las inferidas
+        inferred = set(product.reasoned_types) - set(product.direct_types) - {"Thing"}
+        return list(inferred)
     
-    def _identify_swrl_classifications(self, product: Thing, props: Dict) -> List[Dict]:
+    def _identify_swrl_classifications(self, product: ProductRecord, props: Dict) -> List[Dict]:
         """
         Identifica qué reglas SWRL se aplicaron a este producto.
         
@@ -143,11 +128,8 @@ class ProductClassifier:
         """
         swrl_rules = []
         
-        # Obtener tipos del producto
-        product_types = set()
-        for cls in product.INDIRECT_is_a:
-            if hasattr(cls, 'name'):
-                product_types.add(cls.name)
+        # Obtener tipos del producto (según el razonador)
+        product_types = set(product.reasoned_types)
         
         # Regla 1: DetectarGamer
         if "Laptop" in product_types:
@@ -300,7 +282,7 @@ class ProductClassifier:
             Diccionario con clasificación de todos los productos
         """
         try:
-            all_products = list(self.onto.Producto.instances())
+            all_products = get_snapshot().products()
             
             classifications = []
             stats = {
@@ -311,12 +293,12 @@ class ProductClassifier:
             }
             
             for product in all_products:
-                classification = self.classify_product(product.name)
+                classification = self.classify_product(product.id)
                 
                 if "error" not in classification:
                     classifications.append({
-                        "id": product.name,
-                        "name": classification.get("product_name", product.name),
+                        "id": product.id,
+                        "name": classification.get("product_name", product.id),
                         "classes": classification["classification"]["all_classes"],
                         "swrl_rules": len(classification["classification"]["swrl_classes"])
                     })
@@ -346,6 +328,39 @@ class ProductClassifier:
             logger.error(f"Error al clasificar todos los productos: {e}")
             return {"error": str(e)}
     
+    def reclassify(self, product_ids: List[str]) -> Dict:
+        """
+        Reclasifica de forma incremental solo los productos indicados.
+        
+        Usar tras modificar datos de productos en la ontología (ej: precios).
+        Re-evalúa las reglas SWRL (LaptopGamer, Reseña_Positiva/Negativa) y
+        las relaciones esMejorOpcionQue con productos del mismo tieneNombre,
+        y actualiza snapshot e índices sin re-ejecutar Pellet. SmartphoneGamaAlta
+        y TabletPremium se recalculan en classify_product a partir del snapshot.
+        
+        Args:
+            product_ids: IDs de los productos modificados
+            
+        Returns:
+            Diccionario con productos reclasificados, cambios de clases y relaciones
+        """
+        try:
+            started = time.perf_counter()
+            result = get_loader().refresh_individuals(product_ids)
+            
+            return {
+                "reclassified": result["updated"],
+                "not_found": result["not_found"],
+                "class_changes": result["changes"]["types"],
+                "relation_changes": result["changes"]["relations"],
+                "ontology_version": result["version"],
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error al reclasificar productos {product_ids}: {e}")
+            return {"error": str(e)}
+    
     def get_products_by_class(self, class_name: str) -> Dict:
         """
         Obtiene todos los productos de una clase específica.
@@ -357,38 +372,29 @@ class ProductClassifier:
             Lista de productos que pertenecen a esa clase
         """
         try:
-            # Buscar la clase
-            target_class = None
-            for cls in self.onto.classes():
-                if cls.name == class_name:
-                    target_class = cls
-                    break
+            snapshot = get_snapshot()
             
-            if not target_class:
+            # Buscar la clase
+            if not snapshot.has_class(class_name):
                 return {
                     "error": f"Clase '{class_name}' no encontrada en la ontología",
-                    "available_classes": [c.name for c in self.onto.classes() if hasattr(c, 'name')][:20]
+                    "available_classes": [c.name for c in get_ontology().classes() if hasattr(c, 'name')][:20]
                 }
             
             # Obtener instancias
-            instances = list(target_class.instances())
+            instances = snapshot.instances_of(class_name)
             
             products = []
             for instance in instances:
-                product_dict = individual_to_dict(instance)
-                props = product_dict.get("properties", {})
-                
-                name = props.get("tieneNombre", instance.name)
-                if not isinstance(name, str):
-                    name = instance.name
+                props = instance.properties
                 
                 products.append({
-                    "id": instance.name,
-                    "name": name,
+                    "id": instance.id,
+                    "name": instance.name,
                     "price": props.get("tienePrecio", 0),
                     "ram_gb": props.get("tieneRAM_GB", 0),
                     "storage_gb": props.get("tieneAlmacenamiento_GB", 0),
-                    "all_classes": product_dict.get("types", [])
+                    "all_classes": list(instance.types)
                 })
             
             return {
@@ -0,0 +1,344 @@
+"""
+Evaluador vectorizado de reglas SWRL - SmartCompareMarket
+
+Lee las reglas swrl:Imp de la ontología (onto.rules()) y compila las que
+usan átomos de clase, átomos de data property y builtins de comparación
+swrlb a predicados NumPy sobre columnas de especificaciones. Todas las
+reglas se evalúan sobre todos los individuos en una sola pasada, sin
+ejecutar Pellet.
+
+Reglas soportadas:
+- Con una variable de individuo y cabeza de clase (DetectarGamer,
+  ClasificarPositivas, ClasificarNegativas)
+- Con dos variables de individuo y cabeza de propiedad de objeto
+  (EncontrarMejorPrecio, CompararRAM, DetectarEquivalentesTecnicos, ...).
+  Su costo es cuadrático en la cantidad de candidatos, por eso solo se
+  evalúan si se piden (relations=True), normalmente limitadas a los
+  individuos afectados por un cambio.
+
+Las reglas con propiedades de objeto o DifferentFrom en el cuerpo
+(DetectarIncompatibilidadSO, RecomendarPorHistorial) se dejan a Pellet.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import operator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Builtins swrlb soportados -> operador vectorizado
+BUILTIN_OPERATORS = {
+    "greaterThan": operator.gt,
+    "greaterThanOrEqual": operator.ge,
+    "lessThan": operator.lt,
+    "lessThanOrEqual": operator.le,
+    "equal": operator.eq,
+    "notEqual": operator.ne,
+}
+
+# Operando: ("binding", variable_individuo, data_property) o ("const", valor)
+Operand = Tuple[str, Any, Any]
+
+
+@dataclass
+class CompiledRule:
+    """
+    Regla SWRL compilada a una forma evaluable por columnas.
+
+    Attributes:
+        name: Etiqueta de la regla (ej: "DetectarGamer")
+        subjects: Variables de individuo en orden de aparición (1 o 2)
+        classes: Variable de individuo -> clases requeridas
+        bindings: Pares (variable_individuo, data_property) que deben existir
+        builtins: Comparaciones (operador, operando_izq, operando_der)
+        head_class: Clase inferida para subjects[0] (reglas unarias)
+        head_property: (propiedad, variable_sujeto, variable_objeto)
+    """
+    name: str
+    subjects: Tuple[str, ...]
+    classes: Dict[str, List[str]] = field(default_factory=dict)
+    bindings: List[Tuple[str, str]] = field(default_factory=list)
+    builtins: List[Tuple[str, Operand, Operand]] = field(default_factory=list)
+    head_class: Optional[str] = None
+    head_property: Optional[Tuple[str, str, str]] = None
+
+
+@dataclass
+class RuleInferences:
+    """Resultado de evaluar las reglas: tipos y relaciones inferidas."""
+    types: Dict[str, Set[str]] = field(default_factory=dict)
+    relations: Dict[str, Set[Tuple[str, str]]] = field(default_factory=dict)
+    fired: Dict[str, int] = field(default_factory=dict)
+
+    def classes_for(self, individual_id: str) -> Set[str]:
+        return self.types.get(individual_id, set())
+
+
+def _var_name(arg) -> Optional[str]:
+    """Nombre de una variable SWRL, o None si el argumento es una constante."""
+    if type(arg).__name__ == "Variable":
+        return arg.name
+    return None
+
+
+def compile_rule(rule) -> Optional[CompiledRule]:
+    """
+    Compila una regla de owlready2 (Imp) si está dentro del subconjunto soportado.
+
+    Returns:
+        CompiledRule o None si la regla usa átomos no soportados
+    """
+    label = rule.label[0] if rule.label else str(rule)
+    subjects: List[str] = []
+    classes: Dict[str, List[str]] = {}
+    bindings: List[Tuple[str, str]] = []
+    value_vars: Dict[str, Tuple[str, str]] = {}
+    builtins: List[Tuple[str, Operand, Operand]] = []
+
+    def add_subject(var):
+        if var not in subjects:
+            subjects.append(var)
+
+    for atom in rule.body:
+        kind = type(atom).__name__
+        if kind == "ClassAtom":
+            var = _var_name(atom.arguments[0])
+            cls = getattr(atom.class_predicate, "name", None)
+            if var is None or cls is None:
+                return None
+            add_subject(var)
+            classes.setdefault(var, []).append(cls)
+        elif kind == "DatavaluedPropertyAtom":
+            subject, value = atom.arguments
+            var = _var_name(subject)
+            if var is None:
+                return None
+            add_subject(var)
+            binding = (var, atom.property_predicate.python_name)
+            bindings.append(binding)
+            value_var = _var_name(value)
+            if value_var is None:
+                # Valor literal en el átomo: equivale a un builtin equal
+                builtins.append(("equal", ("binding",) + binding, ("const", value, None)))
+            elif value_var in value_vars:
+                # Variable compartida entre dos átomos: los valores deben coincidir
+                builtins.append(("equal", ("binding",) + value_vars[value_var], ("binding",) + binding))
+            else:
+                value_vars[value_var] = binding
+        elif kind == "BuiltinAtom":
+            if atom.builtin not in BUILTIN_OPERATORS or len(atom.arguments) != 2:
+                return None
+            operands = []
+            for arg in atom.arguments:
+                var = _var_name(arg)
+                if var is None:
+                    operands.append(("const", arg, None))
+                elif var in value_vars:
+                    operands.append(("binding",) + value_vars[var])
+                else:
+                    return None
+            builtins.append((atom.builtin, operands[0], operands[1]))
+        else:
+            # Propiedades de objeto, DifferentFrom, etc.: no soportado
+            return None
+
+    if not subjects or len(subjects) > 2 or len(rule.head) != 1:
+        return None
+
+    compiled = CompiledRule(label, tuple(subjects), classes, bindings, builtins)
+    head = rule.head[0]
+    head_kind = type(head).__name__
+    if head_kind == "ClassAtom" and len(subjects) == 1:
+        if _var_name(head.arguments[0]) != subjects[0]:
+            return None
+        compiled.head_class = head.class_predicate.name
+    elif head_kind == "IndividualPropertyAtom" and len(subjects) == 2:
+        head_vars = tuple(_var_name(arg) for arg in head.arguments)
+        if set(head_vars) != set(subjects):
+            return None
+        compiled.head_property = (head.property_predicate.python_name,) + head_vars
+    else:
+        return None
+    return compiled
+
+
+def compile_rules(onto) -> List[CompiledRule]:
+    """Compila todas las reglas soportadas de la ontología."""
+    compiled = []
+    for rule in onto.rules():
+        try:
+            result = compile_rule(rule)
+        except Exception as e:
+            logger.warning(f"No se pudo compilar la regla {rule}: {e}")
+            result = None
+        if result is not None:
+            compiled.append(result)
+        else:
+            logger.debug(f"Regla no soportada por el evaluador vectorizado: {rule}")
+    return compiled
+
+
+class RuleColumns:
+    """
+    Columnas por individuo para evaluar reglas: pertenencia a clases y
+    valores de data properties (numéricos con NaN o texto con None).
+    """
+
+    def __init__(self, records: Iterable):
+        self.records = list(records)
+        self.ids = [record.id for record in self.records]
+        self.size = len(self.ids)
+        self._classes: Dict[str, np.ndarray] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def class_mask(self, class_name: str) -> np.ndarray:
+        mask = self._classes.get(class_name)
+        if mask is None:
+            # Solo clases del razonador: las reglas no se encadenan entre sí
+            mask = np.fromiter(
+                (class_name in record.reasoned_types for record in self.records),
+                dtype=bool, count=self.size
+            )
+            self._classes[class_name] = mask
+        return mask
+
+    def column(self, prop_name: str) -> np.ndarray:
+        column = self._columns.get(prop_name)
+        if column is None:
+            values = [self._first_value(record.properties.get(prop_name)) for record in self.records]
+            if all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                column = np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+            else:
+                column = np.array(values, dtype=object)
+            self._columns[prop_name] = column
+        return column
+
+    @staticmethod
+    def _first_value(value):
+        if isinstance(value, (list, tuple)):
+            return value[0] if value else None
+        return value
+
+    def present(self, prop_name: str) -> np.ndarray:
+        column = self.column(prop_name)
+        if column.dtype == object:
+            return np.array([v is not None for v in column], dtype=bool)
+        return ~np.isnan(column)
+
+
+class SWRLRuleEvaluator:
+    """
+    Evalúa en lote las reglas SWRL compiladas sobre registros del snapshot.
+
+    Cada variable de individuo se restringe primero a los candidatos que
+    cumplen sus átomos de clase y data property; las reglas de dos
+    variables se evalúan con broadcasting solo sobre esos candidatos.
+    """
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.rules = rules
+
+    @classmethod
+    def from_ontology(cls, onto) -> "SWRLRuleEvaluator":
+        return cls(compile_rules(onto))
+
+    @property
+    def head_classes(self) -> Set[str]:
+        """Clases que solo se derivan de reglas (cabezas de reglas unarias)."""
+        return {rule.head_class for rule in self.rules if rule.head_class}
+
+    def evaluate(
+        self,
+        records: Iterable,
+        subset: Optional[Iterable[str]] = None,
+        relations: bool = False
+    ) -> RuleInferences:
+        """
+        Evalúa las reglas de clase y, si se piden, las de relaciones.
+
+        Args:
+            records: Registros (ProductRecord) de todos los individuos
+            subset: IDs afectados; si se indica, solo se infieren tipos para
+                ellos y relaciones donde participan (evaluación incremental)
+            relations: Evaluar también las reglas de dos variables. Sin
+                subset generan O(N²) pares
+
+        Returns:
+            RuleInferences con tipos y relaciones inferidas
+        """
+        columns = RuleColumns(records)
+        focus = None
+        if subset is not None:
+            wanted = set(subset)
+            focus = np.fromiter((rid in wanted for rid in columns.ids), dtype=bool, count=columns.size)
+
+        inferences = RuleInferences()
+        for rule in self.rules:
+            if rule.head_property is not None and not relations:
+                continue
+            try:
+                fired = self._evaluate_rule(rule, columns, focus, inferences)
+                inferences.fired[rule.name] = fired
+            except Exception as e:
+                logger.error(f"Error evaluando regla '{rule.name}': {e}")
+        return inferences
+
+    def _subject_mask(self, rule: CompiledRule, var: str, columns: RuleColumns) -> np.ndarray:
+        """Candidatos para una variable: clases requeridas y data properties presentes."""
+        mask = np.ones(columns.size, dtype=bool)
+        for cls in rule.classes.get(var, ()):
+            mask &= columns.class_mask(cls)
+        for binding_var, prop in rule.bindings:
+            if binding_var == var:
+                mask &= columns.present(prop)
+        return mask
+
+    @staticmethod
+    def _operand_values(operand: Operand, columns: RuleColumns, rows: Dict[str, np.ndarray], shape: Dict[str, Tuple]):
+        if operand[0] == "const":
+            return operand[1]
+        _, var, prop = operand
+        return columns.column(prop)[rows[var]].reshape(shape[var])
+
+    def _evaluate_rule(self, rule: CompiledRule, columns: RuleColumns, focus, inferences: RuleInferences) -> int:
+        masks = {var: self._subject_mask(rule, var, columns) for var in rule.subjects}
+        rows = {var: np.flatnonzero(mask) for var, mask in masks.items()}
+
+        if len(rule.subjects) == 1:
+            var = rule.subjects[0]
+            if focus is not None:
+                rows[var] = rows[var][focus[rows[var]]]
+            shape = {var: (-1,)}
+            result = np.ones(len(rows[var]), dtype=bool)
+        else:
+            var1, var2 = rule.subjects
+            shape = {var1: (-1, 1), var2: (1, -1)}
+            result = np.ones((len(rows[var1]), len(rows[var2])), dtype=bool)
+            # No se infieren relaciones de un individuo consigo mismo
+            result &= rows[var1][:, None] != rows[var2][None, :]
+            if focus is not None:
+                result &= focus[rows[var1]][:, None] | focus[rows[var2]][None, :]
+
+        for op_name, left, right in rule.builtins:
+            op = BUILTIN_OPERATORS[op_name]
+            left_values = self._operand_values(left, columns, rows, shape)
+            right_values = self._operand_values(right, columns, rows, shape)
+            with np.errstate(invalid="ignore"):
+                result &= np.asarray(op(left_values, right_values), dtype=bool)
+
+        if rule.head_class is not None:
+            matched = rows[rule.subjects[0]][result]
+            for row in matched:
+                inferences.types.setdefault(columns.ids[row], set()).add(rule.head_class)
+            return len(matched)
+
+        prop_name, subject_var, object_var = rule.head_property
+        first, second = np.nonzero(result)
+        by_var = {rule.subjects[0]: rows[rule.subjects[0]][first], rule.subjects[1]: rows[rule.subjects[1]][second]}
+        pairs = inferences.relations.setdefault(prop_name, set())
+        for s_row, o_row in zip(by_var[subject_var], by_var[object_var]):
+            pairs.add((columns.ids[s_row], columns.ids[o_row]))
+        return len(first)
@@ -3,8 +3,7 @@ from pathlib import Path
 
 # Agregar el directorio padre al path para importar módulos
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-from ontology.loader import get_ontology
-from utils.owl_helpers import individual_to_dict
+from ontology.loader import get_ontology, get_snapshot
 
 class SWRLEngine:
     """Motor para consultar resultados de reglas SWRL"""
@@ -17,51 +16,36 @@ class SWRLEngine:
         laptops = []
         laptop_ids_found = set()
         
+        snapshot = get_snapshot()
+        
         # Primero buscar instancias directas de LaptopGamer (si la regla SWRL se ejecutó)
-        gaming_class = None
-        for cls in self.onto.classes():
-            if cls.name == "LaptopGamer":
-                gaming_class = cls
-                break
-        
-        if gaming_class:
-            for laptop in list(gaming_class.instances()):
-                laptop_dict = individual_to_dict(laptop)
-                laptops.append(laptop_dict)
-                laptop_ids_found.add(laptop.name)
+        for laptop in snapshot.instances_of("LaptopGamer"):
+            laptops.append(laptop.to_dict())
+            laptop_ids_found.add(laptop.id)
         
         # Buscar todas las laptops y verificar si tienen RAM >= 16GB
-        laptop_class = None
-        for cls in self.onto.classes():
-            if cls.name == "Laptop":
-                laptop_class = cls
-                break
-        
-        if laptop_class:
-            for laptop in list(laptop_class.instances()):
-                # Evitar duplicados
-                if laptop.name in laptop_ids_found:
-                    continue
-                
-                props = individual_to_dict(laptop).get("properties", {})
-                ram = props.get("tieneRAM_GB")
-                
-                # Manejar RAM que puede venir como lista o valor único
-                ram_value = None
-                if isinstance(ram, list):
-                    # Si es lista, tomar el valor numérico más relevante (el que no sea almacenamiento)
-                    for r in ram:
-                        if isinstance(r, (int, float)) and r <= 64:  # RAM típicamente <= 64GB
-                            ram_value = r
-                            break
-                elif isinstance(ram, (int, float)):
-                    ram_value = ram
-                
-                # Verificar si tiene RAM >= 16GB
-                if ram_value and ram_value >= 16:
-                    laptop_dict = individual_to_dict(laptop)
-                    laptops.append(laptop_dict)
-                    laptop_ids_found.add(laptop.name)
+        for laptop in snapshot.instances_of("Laptop"):
+            # Evitar duplicados
+            if laptop.id in laptop_ids_found:
+                continue
+            
+            ram = laptop.properties.get("tieneRAM_GB")
+            
+            # Manejar RAM que puede venir como lista o valor único
+            ram_value = None
+            if isinstance(ram, (list, tuple)):
+                # Si es lista, tomar el valor numérico más relevante (el que no sea almacenamiento)
+                for r in ram:
+                    if isinstance(r, (int, float)) and r <= 64:  # RAM típicamente <= 64GB
+                        ram_value = r
+                        break
+            elif isinstance(ram, (int, float)):
+                ram_value = ram
+            
+            # Verificar si tiene RAM >= 16GB
+            if ram_value and ram_value >= 16:
+                laptops.append(laptop.to_dict())
+                laptop_ids_found.add(laptop.id)
         
         return laptops
     
@@ -69,139 +53,89 @@ class SWRLEngine:
         """Obtiene productos con relación esMejorOpcionQue inferida por SWRL"""
         results = []
         
+        snapshot = get_snapshot()
+        
         # Buscar productos con mismo nombre y diferentes precios
         productos_por_nombre = {}
         
         # Primero agrupar productos por nombre
-        for ind in list(self.onto.individuals()):
-            try:
-                props = individual_to_dict(ind).get("properties", {})
-                nombre = props.get("tieneNombre")
-                precio = props.get("tienePrecio")
-                
-                if nombre and precio is not None:
-                    if nombre not in productos_por_nombre:
-                        productos_por_nombre[nombre] = []
-                    productos_por_nombre[nombre].append({
-                        "individuo": ind,
-                        "precio": precio
-                    })
-            except:
-                continue
+        for record in snapshot.records():
+            nombre = record.properties.get("tieneNombre")
+            precio = record.properties.get("tienePrecio")
+            
+            if isinstance(nombre, str) and precio is not None:
+                if nombre not in productos_por_nombre:
+                    productos_por_nombre[nombre] = []
+                productos_por_nombre[nombre].append({
+                    "individuo": record,
+                    "precio": precio
+                })
         
         # Buscar productos con mismo nombre y diferentes precios
         for nombre, productos in productos_por_nombre.items():
             if len(productos) >= 2:
-                # Ordenar por precio
-                productos.sort(key=lambda x: x["precio"])
-                
-                # El más barato es mejor opción que los demás
-                mejor = productos[0]["individuo"]
-                mejores_que = [p["individuo"] for p in productos[1:]]
-                
-                # Verificar si la relación ya existe o inferirla
                 try:
-                    better_than_attr = getattr(mejor, "esMejorOpcionQue", None)
-                    if better_than_attr:
-                        if not isinstance(better_than_attr, list):
-                            better_than_attr = [better_than_attr]
-                        mejores_que.extend(better_than_attr)
+                    # Ordenar por precio
+                    productos.sort(key=lambda x: x["precio"])
+                    
+                    # El más barato es mejor opción que los demás
+                    mejor = productos[0]["individuo"]
+                    mejores_que = [p["individuo"] for p in productos[1:]]
+                    
+                    # Verificar si la relación ya existe o inferirla
+                    mejores_que.extend(snapshot.get_many(mejor.links.get("esMejorOpcionQue", ())))
                     
                     # Agregar resultado
                     results.append({
-                        "producto": individual_to_dict(mejor),
-                        "mejor_que": [individual_to_dict(p) for p in mejores_que],
+                        "producto": mejor.to_dict(),
+                        "mejor_que": [p.to_dict() for p in mejores_que],
                         "razon": f"Mismo nombre '{nombre}' pero menor precio"
                     })
-                except:
+                except TypeError:
                     continue
         
         # También buscar relaciones explícitas
-        for ind in list(self.onto.individuals()):
-            try:
-                better_than = getattr(ind, "esMejorOpcionQue", None)
-                if better_than:
-                    if not isinstance(better_than, list):
-                        better_than = [better_than]
-                    
-                    if len(better_than) > 0:
-                        # Verificar que no esté ya en results
-                        ind_id = ind.name
-                        ya_existe = any(r["producto"]["id"] == ind_id for r in results)
-                        if not ya_existe:
-                            results.append({
-                                "producto": individual_to_dict(ind),
-                                "mejor_que": [individual_to_dict(p) for p in better_than]
-                            })
-            except:
-                continue
+        for record in snapshot.records():
+            better_than = snapshot.get_many(record.links.get("esMejorOpcionQue", ()))
+            if len(better_than) > 0:
+                # Verificar que no esté ya en results
+                ya_existe = any(r["producto"]["id"] == record.id for r in results)
+                if not ya_existe:
+                    results.append({
+                        "producto": record.to_dict(),
+                        "mejor_que": [p.to_dict() for p in better_than]
+                    })
         
         return results
     
     def get_positive_reviews(self):
         """Obtiene reseñas clasificadas como Positivas (cal >= 4)"""
-        # Buscar la clase Reseña_Positiva de forma más robusta
-        positive_class = None
-        for cls in self.onto.classes():
-            if cls.name == "Reseña_Positiva":
-                positive_class = cls
-                break
-        
-        reviews = []
+        snapshot = get_snapshot()
         
         # Buscar instancias directas de la clase
-        if positive_class:
-            for review in list(positive_class.instances()):
-                reviews.append(individual_to_dict(review))
+        reviews = [review.to_dict() for review in snapshot.instances_of("Reseña_Positiva")]
         
         # Si no hay instancias, buscar reseñas con calificación >= 4
         if len(reviews) == 0:
-            # Buscar clase Reseña
-            review_class = None
-            for cls in self.onto.classes():
-                if cls.name == "Reseña":
-                    review_class = cls
-                    break
-            
-            if review_class:
-                for review in list(review_class.instances()):
-                    props = individual_to_dict(review).get("properties", {})
-                    calificacion = props.get("tieneCalificacion")
-                    if calificacion and isinstance(calificacion, (int, float)) and calificacion >= 4:
-                        reviews.append(individual_to_dict(review))
+            for review in snapshot.instances_of("Reseña"):
+                calificacion = review.properties.get("tieneCalificacion")
+                if calificacion and isinstance(calificacion, (int, float)) and calificacion >= 4:
+                    reviews.append(review.to_dict())
         
         return reviews
     
     def get_negative_reviews(self):
         """Obtiene reseñas clasificadas como Negativas (cal <= 2)"""
-        # Buscar la clase Reseña_Negativa de forma más robusta
-        negative_class = None
-        for cls in self.onto.classes():
-            if cls.name == "Reseña_Negativa":
-                negative_class = cls
-                break
-        
-        reviews = []
+        snapshot = get_snapshot()
         
         # Buscar instancias directas de la clase
-        if negative_class:
-            for review in list(negative_class.instances()):
-                reviews.append(individual_to_dict(review))
+        reviews = [review.to_dict() for review in snapshot.instances_of("Reseña_Negativa")]
         
         # Si no hay instancias, buscar reseñas con calificación <= 2
         if len(reviews) == 0:
-            # Buscar clase Reseña
-            review_class = None
-            for cls in self.onto.classes():
-                if cls.name == "Reseña":
-                    review_class = cls
-                    break
-            
-            if review_class:
-                for review in list(review_class.instances()):
-                    props = individual_to_dict(review).get("properties", {})
-                    calificacion = props.get("tieneCalificacion")
-                    if calificacion and isinstance(calificacion, (int, float)) and calificacion <= 2:
-                        reviews.append(individual_to_dict(review))
+            for review in snapshot.instances_of("Reseña"):
+                calificacion = review.properties.get("tieneCalificacion")
+                if calificacion and isinstance(calificacion, (int, float)) and calificacion <= 2:
+                    reviews.append(review.to_dict())
         
         return reviews
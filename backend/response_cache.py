@@ -0,0 +1,259 @@
+"""
+Caché de respuestas versionada - SmartCompareMarket
+
+Los endpoints analíticos de solo lectura (/market/*, /classification/stats,
+/equivalences, /validate/summary, /swrl/*) solo cambian cuando cambia la
+ontología, pero los dashboards los consultan cada pocos segundos. Con
+@cached_response el cuerpo JSON se guarda una vez por:
+
+    (grupo y endpoint, parámetros normalizados, versión de la ontología,
+     versión del índice de adyacencia)
+
+- Los parámetros se toman ya validados por FastAPI (defaults aplicados,
+  tipos convertidos), así "?limit=05" y "?limit=5" comparten entrada.
+- Al publicarse un snapshot nuevo (razonamiento, recarga o mutación) o
+  cambiar las relaciones (add_relation, que no publica snapshot) se
+  descartan todas las entradas; además hay desalojo LRU y TTL.
+- Cada respuesta lleva ETag; con If-None-Match coincidente se responde 304
+  sin cuerpo.
+"""
+
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+import weakref
+import logging
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.params import Depends
+from fastapi.responses import JSONResponse
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    """Cuerpo JSON ya serializado de una respuesta 200."""
+    body: bytes
+    etag: str
+    version: int
+    created: float
+
+
+class ResponseCache:
+    """
+    Caché LRU/TTL de respuestas ligada al snapshot vigente de la ontología.
+
+    Uso:
+        cache = ResponseCache(max_entries=256, ttl=300)
+        entry = cache.get(key, snapshot) or cache.put(key, snapshot, body)
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._snapshot_ref = None
+        self._relations = 0
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._invalidations = 0
+
+    def _sync(self, snapshot, relations: int):
+        """
+        Descarta las entradas si se publicó otro snapshot o cambió la versión
+        del índice de adyacencia (llamar con el lock).
+        """
+        current = self._snapshot_ref() if self._snapshot_ref is not None else None
+        if current is snapshot and self._relations == relations:
+            return
+        if self._entries:
+            self._invalidations += 1
+            logger.info(f"Caché de respuestas invalidada (ontología v{snapshot.version}, relaciones r{relations})")
+        self._entries.clear()
+        self._snapshot_ref = weakref.ref(snapshot)
+        self._relations = relations
+
+    def get(self, key: Hashable, snapshot, relations: int = 0) -> Optional[CachedResponse]:
+        """
+        Entrada vigente para la clave (None si falta o venció).
+
+        relations es la versión del índice de adyacencia del loader activo.
+        """
+        with self._lock:
+            self._sync(snapshot, relations)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: Hashable, snapshot, body: bytes, store: bool = True, relations: int = 0) -> CachedResponse:
+        """
+        Guarda el cuerpo calculado con `snapshot` y la versión `relations`
+        del índice de adyacencia.
+
+        Con store=False solo arma la entrada (ETag incluido) sin guardarla.
+        """
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        etag = f'"v{snapshot.version}-r{relations}-{digest}"'
+        entry = CachedResponse(body, etag, snapshot.version, time.monotonic())
+        if not store:
+            return entry
+        with self._lock:
+            self._sync(snapshot, relations)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def invalidate(self):
+        """Descarta todas las entradas."""
+        with self._lock:
+            self._entries.clear()
+            self._snapshot_ref = None
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de la caché (para /health)."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "not_modified": self._not_modified,
+                "invalidations": self._invalidations
+            }
+
+
+def _current_state():
+    """
+    (snapshot publicado, versión del índice de adyacencia); snapshot None
+    si la ontología todavía no se cargó.
+    """
+    from ontology.loader import get_active_loader
+
+    loader = get_active_loader()
+    if loader is None:
+        return None, 0
+    adjacency = loader.adjacency
+    return loader.snapshot, adjacency.version if adjacency is not None else 0
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _cached(entry: CachedResponse, status: str, if_none_match: Optional[str]) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "no-cache",
+        "X-Cache": status,
+        "X-Ontology-Version": str(entry.version)
+    }
+    if _etag_matches(if_none_match, entry.etag):
+        get_response_cache().record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def cached_response(endpoint: str):
+    """
+    Decorador para endpoints GET de solo lectura: guarda la respuesta 200
+    serializada y la reutiliza mientras no cambie la ontología.
+
+    Va entre @router.get y @offload; los errores (HTTPException) no se
+    guardan.
+
+    Uso:
+        @router.get("/market/summary")
+        @cached_response("market")
+        @offload("market")
+        def get_market_summary(...):
+            ...
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        key_params = [
+            name for name, param in signature.parameters.items()
+            if not isinstance(param.default, Depends)
+        ]
+
+        @functools.wraps(func)
+        async def wrapper(*args, _cache_request: Request, **kwargs):
+            cache = get_response_cache()
+            snapshot, relations = _current_state()
+            if not cache.enabled or snapshot is None:
+                result = func(*args, **kwargs)
+                return await result if inspect.isawaitable(result) else result
+
+            key = (
+                endpoint, func.__name__, tuple((name, repr(kwargs.get(name))) for name in key_params),
+                snapshot.version, relations
+            )
+            if_none_match = _cache_request.headers.get("if-none-match")
+            entry = cache.get(key, snapshot, relations)
+            if entry is not None:
+                return _cached(entry, "HIT", if_none_match)
+
+            result = func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            if isinstance(result, Response):
+                return result
+            body = JSONResponse(jsonable_encoder(result)).body
+            # Si mientras tanto se publicó otra versión o cambiaron las
+            # relaciones, no se guarda
+            current, current_relations = _current_state()
+            entry = cache.put(
+                key, snapshot, body, store=current is snapshot and current_relations == relations, relations=relations
+            )
+            return _cached(entry, "MISS", if_none_match)
+
+        # FastAPI inyecta la Request en el parámetro agregado
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        ])
+        return wrapper
+    return decorator
+
+
+# Singleton global
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Obtiene la instancia singleton de la caché (configurada con RESPONSE_CACHE_CONFIG)"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(**config.RESPONSE_CACHE_CONFIG)
+    return _response_cache
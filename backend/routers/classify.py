@@ -11,6 +11,8 @@ from typing import Optional
 
 from reasoning.product_classifier import ProductClassifier
 from dependencies import get_product_classifier
+from executor import offload
+from response_cache import cached_response
 
 router = APIRouter(
     prefix="/api/v1",
@@ -19,7 +21,8 @@ router = APIRouter(
 
 
 @router.get("/classify/{product_id}")
-async def classify_product(
+@offload("classification")
+def classify_product(
     product_id: str,
     classifier: ProductClassifier = Depends(get_product_classifier)
 ):
@@ -106,7 +109,8 @@ async def classify_product(
 
 
 @router.get("/classify")
-async def classify_all_products(
+@offload("classification")
+def classify_all_products(
     classifier: ProductClassifier = Depends(get_product_classifier)
 ):
     """
@@ -173,7 +177,8 @@ async def classify_all_products(
 
 
 @router.get("/class/{class_name}/products")
-async def get_products_by_class(
+@offload("classification")
+def get_products_by_class(
     class_name: str,
     classifier: ProductClassifier = Depends(get_product_classifier)
 ):
@@ -245,7 +250,9 @@ async def get_products_by_class(
 
 
 @router.get("/classification/stats")
-async def get_classification_statistics(
+@cached_response("classification")
+@offload("classification")
+def get_classification_statistics(
     classifier: ProductClassifier = Depends(get_product_classifier)
 ):
     """
@@ -9,8 +9,9 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from models.schemas import CompareRequest, ComparisonResponse
+from models.schemas import CompareRequest, ComparisonResponse, RankRequest, RankResponse
 from services.comparison_service import ComparisonService
+from executor import offload
 
 router = APIRouter()
 comparison_service = ComparisonService()
@@ -78,7 +79,8 @@ comparison_service = ComparisonService()
         }
     }
 )
-async def compare_products(request: CompareRequest):
+@offload("compare")
+def compare_products(request: CompareRequest):
     """
     Compara productos usando el motor de comparación inteligente
     """
@@ -105,3 +107,49 @@ async def compare_products(request: CompareRequest):
             status_code=500,
             detail=f"Error al comparar productos: {str(e)}"
         )
+
+
+@router.post(
+    '/compare/rank',
+    response_model=RankResponse,
+    summary="Ubicar producto en su categoría",
+    description="""
+    Puntúa todos los productos de la categoría del producto con los mismos
+    pesos de /compare y responde "¿es una buena compra?":
+    
+    - **percentile**: porcentaje de productos de la categoría que supera
+    - **rank**: posición (1 = mejor score)
+    - **better**: los top_k mejores productos que lo superan
+    - **worse**: los top_k que quedan inmediatamente por debajo
+    - **breakdown**: porcentaje obtenido en cada factor
+    
+    ## Ejemplo de uso:
+    
+    ```json
+    {
+      "product_id": "iPhone15_Barato",
+      "top_k": 5
+    }
+    ```
+    """
+)
+@offload("compare")
+def rank_product(request: RankRequest):
+    """
+    Ubica un producto frente a todos los de su categoría
+    """
+    try:
+        result = comparison_service.rank_product(request.product_id, request.top_k)
+        
+        return RankResponse(
+            success=True,
+            ranking=result
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al ubicar producto: {str(e)}"
+        )
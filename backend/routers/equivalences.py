@@ -12,6 +12,8 @@ from pydantic import BaseModel
 
 from services.equivalence_service import EquivalenceService
 from dependencies import get_equivalence_service
+from executor import offload
+from response_cache import cached_response
 
 router = APIRouter(
     prefix="/api/v1",
@@ -26,7 +28,8 @@ class EquivalenceComparisonRequest(BaseModel):
 
 
 @router.get("/equivalences/{product_id}")
-async def get_product_equivalents(
+@offload("equivalences")
+def get_product_equivalents(
     product_id: str,
     equivalence_service: EquivalenceService = Depends(get_equivalence_service)
 ) -> Dict:
@@ -78,7 +81,8 @@ async def get_product_equivalents(
 
 
 @router.post("/equivalences/compare")
-async def compare_product_equivalence(
+@offload("equivalences")
+def compare_product_equivalence(
     request: EquivalenceComparisonRequest,
     equivalence_service: EquivalenceService = Depends(get_equivalence_service)
 ) -> Dict:
@@ -140,7 +144,9 @@ async def compare_product_equivalence(
 
 
 @router.get("/equivalences")
-async def get_all_equivalence_groups(
+@cached_response("equivalences")
+@offload("equivalences")
+def get_all_equivalence_groups(
     equivalence_service: EquivalenceService = Depends(get_equivalence_service)
 ) -> Dict:
     """
@@ -161,50 +167,11 @@ async def get_all_equivalence_groups(
     - `products_with_equivalents`: Productos que tienen equivalentes
     - `products_without_equivalents`: Productos únicos
     - `top_equivalence_groups`: Grupos con más equivalentes
+    - `components`: Componentes conexas de productos equivalentes (las 10 mayores)
     """
     try:
-        # Obtener todos los productos
-        all_products = list(equivalence_service.onto.Producto.instances())
-        
-        equivalence_groups = {}
-        products_with_equivalents = 0
-        
-        for product in all_products:
-            product_id = product.name
-            
-            # Buscar equivalentes
-            result = equivalence_service.find_equivalent_products(product_id)
-            
-            if "error" not in result and result["total_equivalents"] > 0:
-                products_with_equivalents += 1
-                equivalence_groups[product_id] = {
-                    "product_id": product_id,
-                    "product_name": result.get("product_name", "Sin nombre"),
-                    "total_equivalents": result["total_equivalents"],
-                    "equivalents": [e["id"] for e in result["equivalents"]]
-                }
-        
-        # Ordenar grupos por número de equivalentes
-        sorted_groups = sorted(
-            equivalence_groups.values(),
-            key=lambda x: x["total_equivalents"],
-            reverse=True
-        )
-        
-        return {
-            "total_products": len(all_products),
-            "products_with_equivalents": products_with_equivalents,
-            "products_without_equivalents": len(all_products) - products_with_equivalents,
-            "equivalence_percentage": round(products_with_equivalents / len(all_products) * 100, 2) if all_products else 0,
-            "top_equivalence_groups": sorted_groups[:10],  # Top 10
-            "summary": {
-                "message": f"{products_with_equivalents} de {len(all_products)} productos tienen equivalentes",
-                "avg_equivalents_per_product": round(
-                    sum(g["total_equivalents"] for g in equivalence_groups.values()) / len(equivalence_groups),
-                    2
-                ) if equivalence_groups else 0
-            }
-        }
+        # Precalculado una vez por versión de la ontología
+        return equivalence_service.get_equivalence_summary()
         
     except Exception as e:
         raise HTTPException(
@@ -11,6 +11,8 @@ from typing import Optional
 
 from sparql.market_analysis import MarketAnalysis
 from dependencies import get_market_analysis
+from executor import offload
+from response_cache import cached_response
 
 router = APIRouter(
     prefix="/api/v1/market",
@@ -19,7 +21,9 @@ router = APIRouter(
 
 
 @router.get("/stats/prices")
-async def get_price_statistics(
+@cached_response("market")
+@offload("market")
+def get_price_statistics(
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
     """
@@ -76,7 +80,9 @@ async def get_price_statistics(
 
 
 @router.get("/stats/categories")
-async def get_category_distribution(
+@cached_response("market")
+@offload("market")
+def get_category_distribution(
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
     """
@@ -115,7 +121,9 @@ async def get_category_distribution(
 
 
 @router.get("/stats/specs")
-async def get_specs_analysis(
+@cached_response("market")
+@offload("market")
+def get_specs_analysis(
     category: Optional[str] = Query(None, description="Filtrar por categoría específica (ej: Laptop, Smartphone)"),
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
@@ -180,8 +188,11 @@ async def get_specs_analysis(
 
 
 @router.get("/best-value")
-async def get_best_value_products(
+@cached_response("market")
+@offload("market")
+def get_best_value_products(
     limit: int = Query(10, ge=1, le=50, description="Número máximo de productos a retornar"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
     """
@@ -194,11 +205,13 @@ async def get_best_value_products(
     
     **Parámetros:**
     - `limit`: Número máximo de productos (default: 10, max: 50)
+    - `cursor`: Para pedir la página siguiente
     
     **Retorna:**
     - `total_analyzed`: Total de productos analizados
     - `best_value_products`: Lista ordenada por value_score
     - `algorithm`: Fórmula utilizada
+    - `next_cursor`: Solo si hay más productos
     
     **Ejemplo de uso:**
     ```
@@ -229,7 +242,7 @@ async def get_best_value_products(
     ```
     """
     try:
-        result = market_analysis.get_best_value_products(limit)
+        result = market_analysis.get_best_value_products(limit, cursor)
         
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -238,6 +251,8 @@ async def get_best_value_products(
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -246,7 +261,9 @@ async def get_best_value_products(
 
 
 @router.get("/trends")
-async def get_market_trends(
+@cached_response("market")
+@offload("market")
+def get_market_trends(
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
     """
@@ -303,7 +320,9 @@ async def get_market_trends(
 
 
 @router.get("/compare-categories")
-async def compare_categories(
+@cached_response("market")
+@offload("market")
+def compare_categories(
     category1: str = Query(..., description="Primera categoría a comparar"),
     category2: str = Query(..., description="Segunda categoría a comparar"),
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
@@ -370,7 +389,9 @@ async def compare_categories(
 
 
 @router.get("/summary")
-async def get_market_summary(
+@cached_response("market")
+@offload("market")
+def get_market_summary(
     market_analysis: MarketAnalysis = Depends(get_market_analysis)
 ):
     """
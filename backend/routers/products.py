@@ -2,7 +2,8 @@
 Router de Productos - FastAPI con Dependency Injection
 """
 from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Iterator, Optional
 import sys
 from pathlib import Path
 
@@ -10,11 +11,22 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from dependencies import get_product_service, get_inference_engine
 from services.product_service import ProductService
+from ontology.range_index import RangePredicate
 from reasoning.inference_engine import InferenceEngine
 from models import ProductListResponse, ProductResponse, SingleProductResponse, ErrorResponse
+from executor import offload
 
 router = APIRouter()
 
+# Formatos de /products/export
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+# Productos por bloque enviado en la exportación
+EXPORT_CHUNK_SIZE = 64
+
 
 @router.get(
     '/products',
@@ -27,14 +39,22 @@ router = APIRouter()
     - `category`: Filtrar por categoría (Electrónica, Hogar, Moda, Smartphone, Laptop)
     - `min_price`: Precio mínimo
     - `max_price`: Precio máximo
+    - `sort_by`: Ordenar por 'price', 'rating', 'ram' o 'storage'
+    - `sort_order`: 'asc' o 'desc'
+    
+    **Paginación (keyset):**
+    - `limit`: Productos por página (sin limit se devuelven todos)
+    - `after`: `next_after` de la página anterior
     
     **Ejemplo:**
     ```
     GET /api/products?category=Smartphone&min_price=500&max_price=1000
+    GET /api/products?sort_by=price&limit=10&after=Laptop_HP_Pavilion
     ```
     """
 )
-async def get_products(
+@offload("products")
+def get_products(
     category: Optional[str] = Query(
         None,
         description="Categoría del producto",
@@ -52,43 +72,58 @@ async def get_products(
         description="Precio máximo",
         example=2000.0
     ),
+    sort_by: Optional[str] = Query(
+        None,
+        description="Campo para ordenar (price, rating, ram, storage)",
+        example="price"
+    ),
+    sort_order: Optional[str] = Query(
+        "asc",
+        description="Orden (asc, desc)",
+        example="asc"
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=500,
+        description="Productos por página"
+    ),
+    after: Optional[str] = Query(
+        None,
+        description="ID del último producto de la página anterior (next_after)"
+    ),
     service: ProductService = Depends(get_product_service)
 ):
     """
     Obtiene lista de productos con filtros opcionales
     """
     try:
-        # Filtrar por categoría
-        if category:
-            products = service.get_products_by_category(category)
-        else:
-            products = service.get_all_products()
-        
-        # Filtrar por precio
+        # Categoría y rango de precio resueltos con los índices de rango
+        predicates = []
         if min_price is not None or max_price is not None:
-            filtered = []
-            for product in products:
-                price = product.get("properties", {}).get("tienePrecio")
-                
-                if price is None:
-                    continue
-                
-                if min_price is not None and price < min_price:
-                    continue
-                
-                if max_price is not None and price > max_price:
-                    continue
-                
-                filtered.append(product)
-            
-            products = filtered
+            predicates.append(RangePredicate("tienePrecio", min_price, max_price))
+        
+        # Solo se materializan los productos de la página
+        product_ids, total, next_after = service.query_page_ids(
+            category=category,
+            predicates=predicates,
+            sort_by=sort_by,
+            ascending=(sort_order == "asc"),
+            after=after,
+            limit=limit
+        )
+        products = service.get_products_by_ids(product_ids)
         
         return ProductListResponse(
             success=True,
             count=len(products),
-            data=products
+            data=products,
+            total=total,
+            next_after=next_after
         )
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -96,6 +131,88 @@ async def get_products(
         )
 
 
+@router.get(
+    '/products/export',
+    summary="Exportar productos (streaming)",
+    description="""
+    Exporta el catálogo (con los mismos filtros y orden que /products) sin
+    armar la respuesta completa en memoria: cada producto se escribe a
+    medida que se envía, a partir de su JSON precalculado.
+    
+    **Formatos:**
+    - `ndjson`: un producto JSON por línea (application/x-ndjson)
+    - `json`: arreglo JSON
+    
+    **Ejemplo:**
+    ```
+    GET /api/products/export?format=ndjson&category=Laptop
+    ```
+    """
+)
+@offload("products")
+def export_products(
+    format: str = Query("ndjson", description="Formato (ndjson, json)"),
+    category: Optional[str] = Query(None, description="Categoría del producto"),
+    min_price: Optional[float] = Query(None, ge=0, description="Precio mínimo"),
+    max_price: Optional[float] = Query(None, ge=0, description="Precio máximo"),
+    sort_by: Optional[str] = Query(None, description="Campo para ordenar (price, rating, ram, storage)"),
+    sort_order: Optional[str] = Query("asc", description="Orden (asc, desc)"),
+    service: ProductService = Depends(get_product_service)
+):
+    """
+    Exporta productos en streaming (NDJSON o arreglo JSON)
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato no soportado: {format}. Use: {', '.join(EXPORT_MEDIA_TYPES)}"
+        )
+    
+    try:
+        predicates = []
+        if min_price is not None or max_price is not None:
+            predicates.append(RangePredicate("tienePrecio", min_price, max_price))
+        
+        product_ids = service.query_product_ids(
+            category=category,
+            predicates=predicates,
+            sort_by=sort_by,
+            ascending=(sort_order == "asc")
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al exportar productos: {str(e)}"
+        )
+    
+    # Generador síncrono: Starlette lo consume en el threadpool, sin
+    # bloquear el event loop mientras se escriben los bloques
+    return StreamingResponse(
+        _export_chunks(service.iter_encoded_products(product_ids), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"X-Total-Count": str(len(product_ids))}
+    )
+
+
+def _export_chunks(encoded_products, format: str) -> Iterator[bytes]:
+    """Une los productos serializados en bloques de EXPORT_CHUNK_SIZE."""
+    if format == "json":
+        yield b"["
+    chunk = []
+    for position, data in enumerate(encoded_products):
+        if format == "json":
+            chunk.append(b"," + data if position else data)
+        else:
+            chunk.append(data + b"\n")
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+    if format == "json":
+        yield b"]"
+
+
 @router.get(
     '/products/{product_id}',
     response_model=SingleProductResponse | ErrorResponse,
@@ -167,7 +284,8 @@ async def get_product(
     ```
     """
 )
-async def get_product_relationships(
+@offload("products")
+def get_product_relationships(
     product_id: str,
     engine: InferenceEngine = Depends(get_inference_engine)
 ):
@@ -1,18 +1,29 @@
 """
 Router de Recomendaciones - Sistema personalizado de sugerencias
 """
-from fastapi import APIRouter, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import json
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from dependencies import get_recommendation_service
 from services.recommendation_service import RecommendationService
 from models.recommendation import UserPreferences, RecommendationResponse
+from executor import get_executor, offload
 
 router = APIRouter()
 
+# Perfiles por bloque enviado en la respuesta por lotes
+BATCH_STREAM_CHUNK_SIZE = 64
+
+_PROFILE_LIST = TypeAdapter(List[UserPreferences])
+
 
 @router.post(
     '/recommendations',
@@ -39,13 +50,18 @@ router = APIRouter()
     ```
     """,
 )
-async def get_recommendations(
+@offload("recommendations")
+def get_recommendations(
     preferences: UserPreferences,
-    limit: int = Query(5, ge=1, le=20, description="Número de recomendaciones")
+    limit: int = Query(5, ge=1, le=20, description="Número de recomendaciones"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    service: RecommendationService = Depends(get_recommendation_service)
 ):
     """Genera recomendaciones basadas en preferencias"""
-    service = RecommendationService()
-    return service.get_recommendations(preferences, limit)
+    try:
+        return service.get_recommendations(preferences, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get(
@@ -62,14 +78,17 @@ async def get_recommendations(
     ```
     """,
 )
-async def get_quick_recommendations(
+@offload("recommendations")
+def get_quick_recommendations(
     budget: Optional[float] = Query(None, description="Presupuesto máximo"),
     min_budget: Optional[float] = Query(None, description="Presupuesto mínimo"),
     preferred_category: Optional[str] = Query(None, description="Categoría (Laptop, Smartphone, etc.)"),
     min_ram: Optional[int] = Query(None, description="RAM mínima (GB)"),
     min_storage: Optional[int] = Query(None, description="Almacenamiento mínimo (GB)"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="Calificación mínima"),
-    limit: int = Query(5, ge=1, le=20)
+    limit: int = Query(5, ge=1, le=20),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    service: RecommendationService = Depends(get_recommendation_service)
 ):
     """Recomendaciones usando query params"""
     preferences = UserPreferences(
@@ -81,8 +100,10 @@ async def get_quick_recommendations(
         min_rating=min_rating
     )
     
-    service = RecommendationService()
-    return service.get_recommendations(preferences, limit)
+    try:
+        return service.get_recommendations(preferences, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get(
@@ -97,7 +118,11 @@ async def get_quick_recommendations(
     - Inferencias SWRL positivas
     """,
 )
-async def get_best_deals(limit: int = Query(5, ge=1, le=20)):
+@offload("recommendations")
+def get_best_deals(
+    limit: int = Query(5, ge=1, le=20),
+    service: RecommendationService = Depends(get_recommendation_service)
+):
     """Mejores ofertas generales"""
     # Preferencias por defecto para ofertas
     default_prefs = UserPreferences(
@@ -105,10 +130,97 @@ async def get_best_deals(limit: int = Query(5, ge=1, le=20)):
         budget=2000  # Límite razonable
     )
     
-    service = RecommendationService()
     result = service.get_recommendations(default_prefs, limit)
     
     return {
         **result,
         "message": "Mejores ofertas basadas en calificación y precio"
     }
+
+
+@router.post(
+    '/recommendations/batch',
+    summary="Recomendaciones por lotes",
+    description="""
+    Recomendaciones para muchos perfiles de usuario a la vez (jobs nocturnos,
+    campañas). Los perfiles se agrupan por categoría y rango de presupuesto
+    y cada pool de candidatos se puntúa una sola vez por grupo.
+    
+    **Entrada:** lista JSON de preferencias, o NDJSON (una preferencia por
+    línea) con `Content-Type: application/x-ndjson`.
+    
+    **Salida:** NDJSON, una línea por perfil en el orden de entrada con
+    `index`, `total_matches`, `recommendations` y `preferences_used`.
+    Cada línea coincide con la primera página de `POST /recommendations`.
+    """,
+)
+async def get_batch_recommendations(
+    request: Request,
+    limit: int = Query(5, ge=1, le=20, description="Recomendaciones por perfil"),
+    service: RecommendationService = Depends(get_recommendation_service)
+):
+    """Recomendaciones por lotes (respuesta NDJSON)"""
+    body = await request.body()
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    executor = get_executor()
+    try:
+        profiles = await executor.run("recommendations", _parse_profiles, body, ndjson)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # El scoring también corre en el pool acotado, un bloque por tarea. El
+    # primero se calcula antes de responder: si el pool está saturado se
+    # responde 503 con Retry-After en lugar de empezar el stream
+    results = service.iter_batch_recommendations(profiles, limit)
+    first = await executor.run("recommendations", _next_chunk, results)
+    
+    return StreamingResponse(
+        _batch_chunks(first, results),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Count": str(len(profiles))}
+    )
+
+
+def _parse_profiles(body: bytes, ndjson: bool) -> List[UserPreferences]:
+    """
+    Valida los perfiles del cuerpo (lista JSON o NDJSON).
+    
+    Raises:
+        ValueError: Si el cuerpo o alguna línea no son preferencias válidas
+    """
+    if not ndjson:
+        try:
+            return _PROFILE_LIST.validate_json(body)
+        except ValidationError as e:
+            raise ValueError(f"Perfiles inválidos: {e.errors(include_url=False)}")
+    
+    profiles = []
+    for number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            profiles.append(UserPreferences.model_validate_json(line))
+        except ValidationError as e:
+            raise ValueError(f"Línea {number}: perfil inválido: {e.errors(include_url=False)}")
+    return profiles
+
+
+async def _batch_chunks(first: bytes, results: Iterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Envía los bloques NDJSON; los siguientes al primero esperan un cupo del
+    pool (la respuesta ya empezó con 200 y no puede pasar a 503).
+    """
+    chunk = first
+    while chunk:
+        yield chunk
+        chunk = await get_executor().run_waiting("recommendations", _next_chunk, results)
+
+
+def _next_chunk(results: Iterator[Dict[str, Any]]) -> bytes:
+    """Calcula y serializa los siguientes BATCH_STREAM_CHUNK_SIZE perfiles (b"" al terminar)."""
+    lines = []
+    for result in islice(results, BATCH_STREAM_CHUNK_SIZE):
+        result["recommendations"] = [item.model_dump() for item in result["recommendations"]]
+        result["preferences_used"] = result["preferences_used"].model_dump()
+        lines.append(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+    return b"".join(lines)
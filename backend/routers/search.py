@@ -12,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from models.schemas import SearchResponse
 from sparql.queries import SPARQLQueries
 from sparql.filters import SPARQLFilters
+from executor import offload
 
 router = APIRouter()
 sparql_queries = SPARQLQueries()
@@ -27,7 +28,8 @@ sparql_filters = SPARQLFilters()
     
     ## Parámetros de búsqueda:
     
-    - `q`: Texto a buscar en nombres de productos
+    - `q`: Texto a buscar en nombre, marca, procesador, categoría y descripción
+      (sin distinguir acentos, por prefijo; resultados ordenados por relevancia)
     - `category`: Filtrar por categoría
     - `min_price`: Precio mínimo
     - `max_price`: Precio máximo
@@ -51,10 +53,11 @@ sparql_filters = SPARQLFilters()
     - Relaciones entre entidades
     """
 )
-async def search_products(
+@offload("search")
+def search_products(
     q: Optional[str] = Query(
         None,
-        description="Texto a buscar en nombres",
+        description="Texto a buscar (nombre, marca, procesador, descripción)",
         example="laptop gaming"
     ),
     category: Optional[str] = Query(
@@ -89,6 +92,10 @@ async def search_products(
         "asc",
         description="Orden (asc, desc)",
         example="asc"
+    ),
+    explain: bool = Query(
+        False,
+        description="Incluir el plan ejecutado (orden de filtros, estimaciones y tiempos)"
     )
 ):
     """
@@ -96,27 +103,23 @@ async def search_products(
     """
     try:
         # Construir búsqueda
-        results = sparql_queries.search_products(
+        results, plan = sparql_queries.search_products_with_plan(
             text_query=q,
             category=category,
             min_price=min_price,
             max_price=max_price,
-            min_ram=min_ram
+            min_ram=min_ram,
+            sort_by=sort_by,
+            ascending=(sort_order == "asc"),
+            explain=explain
         )
         
-        # Aplicar ordenamiento si se especificó
-        if sort_by and results:
-            results = sparql_filters.sort_results(
-                results,
-                sort_by=sort_by,
-                ascending=(sort_order == "asc")
-            )
-        
         return SearchResponse(
             success=True,
             query=q or "all",
             count=len(results),
-            results=results
+            results=results,
+            plan=plan
         )
         
     except Exception as e:
@@ -143,7 +146,8 @@ async def search_products(
     Retorna productos como fundas, cargadores, accesorios compatibles.
     """
 )
-async def search_compatible_products(
+@offload("search")
+def search_compatible_products(
     product_id: str
 ):
     """
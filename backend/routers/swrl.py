@@ -10,6 +10,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from reasoning.swrl_engine import SWRLEngine
 from models.schemas import SWRLResultResponse
+from executor import offload
+from response_cache import cached_response
 
 router = APIRouter()
 swrl_engine = SWRLEngine()
@@ -29,7 +31,9 @@ swrl_engine = SWRLEngine()
     **Ejemplo:** iPhone15_Barato es mejor opción que iPhone15_Caro
     """
 )
-async def get_best_price_products():
+@cached_response("swrl")
+@offload("swrl")
+def get_best_price_products():
     """
     Regla SWRL: EncontrarMejorPrecio
     """
@@ -64,7 +68,9 @@ async def get_best_price_products():
     **Ejemplo:** Laptop_Dell_XPS con 16GB RAM → LaptopGamer
     """
 )
-async def get_gaming_laptops():
+@cached_response("swrl")
+@offload("swrl")
+def get_gaming_laptops():
     """
     Regla SWRL: DetectarGamer
     """
@@ -97,7 +103,9 @@ async def get_gaming_laptops():
     
     """
 )
-async def get_positive_reviews():
+@cached_response("swrl")
+@offload("swrl")
+def get_positive_reviews():
     """
     Regla SWRL: ClasificarPositivas
     """
@@ -129,7 +137,9 @@ async def get_positive_reviews():
     - Tiene calificación ≤ 2
     """
 )
-async def get_negative_reviews():
+@cached_response("swrl")
+@offload("swrl")
+def get_negative_reviews():
     """
     Regla SWRL: ClasificarNegativas
     """
@@ -10,6 +10,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from dependencies import get_product_service
 from services.validation_service import ValidationService
 from models.common import ErrorResponse
+from executor import offload
+from response_cache import cached_response
 
 router = APIRouter()
 
@@ -47,7 +49,8 @@ router = APIRouter()
         }
     }
 )
-async def validate_product(product_id: str):
+@offload("validation")
+def validate_product(product_id: str):
     """Valida consistencia de un producto"""
     validation_service = ValidationService()
     return validation_service.validate_product(product_id)
@@ -70,7 +73,8 @@ async def validate_product(product_id: str):
     - Detección de errores en masa
     """,
 )
-async def validate_all_products():
+@offload("validation")
+def validate_all_products():
     """Valida todos los productos"""
     validation_service = ValidationService()
     return validation_service.validate_all_products()
@@ -84,7 +88,9 @@ async def validate_all_products():
     Más rápido que /validation/all para dashboards.
     """,
 )
-async def validation_summary():
+@cached_response("validation")
+@offload("validation")
+def validation_summary():
     """Resumen rápido de validación"""
     validation_service = ValidationService()
     full_validation = validation_service.validate_all_products()
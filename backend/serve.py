@@ -0,0 +1,88 @@
+"""
+SmartCompareMarket - Servidor multi-proceso (pre-fork)
+
+El proceso maestro carga la ontología y ejecuta Pellet una sola vez, guarda
+el quadstore razonado en la caché y exporta el snapshot a archivos
+mapeables (ontology/snapshot_store.py). Luego lanza N workers de uvicorn:
+cada uno abre la caché razonada (sin Pellet) y adjunta el snapshot
+exportado en lugar de materializar el catálogo.
+
+Límites: cada worker igual abre el World SQLite de la caché y construye su
+IndividualIndex (reasoning_manager.start), y el índice de texto y el JSON
+de listados se arman por worker decodificando todos los registros en la
+primera búsqueda o listado. Solo las columnas de especificaciones quedan
+compartidas entre procesos.
+
+Uso:
+    python serve.py --workers 4
+    python serve.py --workers 4 --port 8000 --export-dir /tmp/scm-snapshots
+"""
+import argparse
+import gc
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+
+
+def prepare_snapshot(export_dir=None):
+    """
+    Carga y razona la ontología en el maestro y exporta el snapshot.
+
+    Returns:
+        Ruta del snapshot exportado
+    """
+    from ontology.loader import get_active_loader, set_active_loader
+    from ontology.reasoning_manager import get_reasoning_manager
+
+    # Los workers parten de la caché razonada que deja el maestro
+    config.ONTOLOGY_CACHE_CONFIG["enabled"] = True
+    manager = get_reasoning_manager()
+    manager.start(background=False)
+    status = manager.status()
+    if not status["reasoned"]:
+        print(f"[WARN] Pellet no disponible ({status['last_error']}); se exporta la ontologia afirmada")
+
+    loader = get_active_loader()
+    path = loader.export_snapshot(export_dir)
+
+    # El maestro no atiende requests: liberar el World antes de lanzar workers
+    set_active_loader(None)
+    del loader
+    gc.collect()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartCompareMarket (pre-fork)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--host", default=config.FLASK_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=config.FLASK_CONFIG["port"])
+    parser.add_argument("--export-dir", default=str(config.SNAPSHOT_EXPORT_CONFIG["dir"]))
+    args = parser.parse_args()
+
+    path = prepare_snapshot(Path(args.export_dir))
+    print(f"[PREFORK] Snapshot exportado en {path}")
+
+    # Configuración heredada por los workers (procesos nuevos de uvicorn)
+    os.environ["SNAPSHOT_EXPORT_PATH"] = str(path)
+    os.environ["ONTOLOGY_CACHE_ENABLED"] = "true"
+    os.environ["REASONER_BACKGROUND"] = "false"
+
+    import uvicorn
+
+    print(f"[PREFORK] Lanzando {args.workers} workers en http://{args.host}:{args.port}")
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=str(Path(__file__).resolve().parent)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,15 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from ontology.loader import get_ontology
+from ontology.loader import get_active_loader, get_ontology
+from ontology.relation_matrix import get_relation_matrix
 from reasoning.inference_engine import InferenceEngine
 from services.product_service import ProductService
-from utils.owl_helpers import individual_to_dict
+from services.scoring_engine import get_scoring_engine, numeric_value
 
 
 class ComparisonService:
@@ -20,14 +23,16 @@ class ComparisonService:
     
     Utiliza:
     - InferenceEngine para relaciones SWRL
+    - RelationMatrix (bitsets) para relaciones entre todos los pares
     - ProductService para datos de productos
     - Scoring basado en múltiples factores
     """
     
     def __init__(self):
         self.onto = get_ontology()
-        self.inference_engine = InferenceEngine(self.onto)
+        self.inference_engine = InferenceEngine()
         self.product_service = ProductService()
+        self.scoring_engine = get_scoring_engine()
     
     def compare_products(self, product_ids: List[str]) -> Dict[str, Any]:
         """
@@ -50,11 +55,15 @@ class ComparisonService:
                 raise ValueError(f"Producto '{product_id}' no encontrado")
             products_data.append(product)
         
-        # Calcular scoring para cada producto
+        # Calcular scoring de todo el conjunto (vectorizado)
+        product_scores, breakdown = self.scoring_engine.score_products(
+            products_data, product_ids, breakdown=True
+        )
         scores = {}
-        for i, product in enumerate(products_data):
-            score = self._calculate_score(product, product_ids[i], product_ids)
-            scores[product_ids[i]] = score
+        score_breakdown = {}
+        for i, product_id in enumerate(product_ids):
+            scores[product_id] = product_scores[i]
+            score_breakdown[product_id] = breakdown[i]
         
         # Determinar ganador
         winner_id = max(scores, key=scores.get)
@@ -83,28 +92,32 @@ class ComparisonService:
             "winner": winner_id,
             "winner_score": scores[winner_id],
             "all_scores": scores,
+            "score_breakdown": score_breakdown,
             "reason": reason,
             "differences": differences,
             "swrl_inference": swrl_relations,
             "compatibility": self._check_compatibility(product_ids)
         }
     
+    def rank_product(self, product_id: str, top_k: int = 5) -> Dict[str, Any]:
+        """
+        Ubica un producto frente a todos los productos de su categoría.
+        
+        Args:
+            product_id: ID del producto a evaluar
+            top_k: Cantidad de alternativas mejores y peores a retornar
+            
+        Returns:
+            Score, percentil, desglose por factor y alternativas
+            (ver ScoringEngine.rank)
+        """
+        return self.scoring_engine.rank(product_id, top_k)
+    
     def _get_numeric_value(self, value: Any) -> float:
         """
         Extrae valor numérico seguro, manejando listas y tipos.
         """
-        if isinstance(value, list):
-            if not value:
-                return 0.0
-            value = value[0]
-            
-        if isinstance(value, (int, float)):
-            return float(value)
-            
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
+        return numeric_value(value)
 
     def _calculate_score(
         self, 
@@ -113,10 +126,14 @@ class ComparisonService:
         all_product_ids: List[str]
     ) -> float:
         """
-        Calcula un score para el producto basado en pesos configurables.
+        Calcula un score para un producto suelto basado en pesos configurables.
         Score final normalizado a 0-100.
         
-        Pesos corregidos (suman 1.0):
+        compare_products puntúa todo el conjunto de una vez con el motor de
+        scoring (services/scoring_engine.py); este método aplica la misma
+        fórmula a un único producto.
+        
+        Pesos (data/comparison_weights.json, suman 1.0):
         - bateria: 20% (mayor es mejor) - MUY IMPORTANTE
         - calificacion: 18% (mayor es mejor) - MUY IMPORTANTE
         - precio: 14% (menor es mejor) - importante pero no dominante
@@ -131,127 +148,12 @@ class ComparisonService:
         - Mayor = mejor: score = valor_producto / valor_referencia_max
         - Menor = mejor: score = valor_referencia_min / valor_producto
         """
-        import json
-        
-        # Cargar configuración de pesos
-        try:
-            weights_path = Path(__file__).parent.parent / "data" / "comparison_weights.json"
-            with open(weights_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-        except Exception:
-            config = {
-                "weights": {
-                    "bateria": 0.20, "calificacion": 0.18, "precio": 0.14,
-                    "resolucion": 0.10, "ram": 0.10, "almacenamiento": 0.10,
-                    "garantia": 0.07, "pantalla": 0.06, "peso_fisico": 0.05
-                }
-            }
-        
-        props = product.get('properties', {})
-        weights = config.get("weights", {})
-        
-        # Mapeo de factores a propiedades de la ontología
-        prop_map = {
-            "pantalla": "tienePulgadas",
-            "bateria": "bateriaCapacidad_mAh",
-            "ram": "tieneRAM_GB",
-            "almacenamiento": "tieneAlmacenamiento_GB",
-            "precio": "tienePrecio",
-            "garantia": "garantiaMeses",
-            "calificacion": "tieneCalificacion",
-            "peso_fisico": "pesoGramos"
-        }
-        
-        # Valores de referencia para normalización (realistas para smartphones/electronics)
-        # Mayor es mejor: usamos valor_max como referencia (100% = alcanzar el max)
-        # Menor es mejor: usamos valor_min como referencia (100% = alcanzar el min)
-        reference_max = {
-            "pantalla": 7.0,        # 7 pulgadas es excelente para smartphone
-            "bateria": 5500,        # 5500 mAh es excelente
-            "ram": 16,              # 16 GB es excelente para móvil
-            "almacenamiento": 512,  # 512 GB es excelente
-            "garantia": 24,         # 24 meses es excelente
-            "calificacion": 5.0,    # 5.0 es perfecta
-        }
-        
-        reference_min = {
-            "precio": 600,          # $600 es un buen precio base
-            "peso_fisico": 170,     # 170g es muy ligero
-        }
-        
-        # Factores donde menor es mejor
-        lower_better = {"precio", "peso_fisico"}
-        
-        total_score = 0.0
-        total_weight = 0.0
-        score_breakdown = {}
-        
-        for factor, weight in weights.items():
-            if factor == "resolucion":
-                continue  # Se calcula aparte
-                
-            prop_name = prop_map.get(factor)
-            if not prop_name:
-                continue
-                
-            value = self._get_numeric_value(props.get(prop_name, 0))
-            
-            if value <= 0:
-                # Propiedad faltante = 0 puntos para este factor
-                factor_score = 0
-            elif factor in lower_better:
-                # MENOR ES MEJOR: score = referencia_min / valor_actual
-                # Si valor = referencia_min -> score = 1.0 (100%)
-                # Si valor > referencia_min -> score < 1.0 (penalizado)
-                ref_min = reference_min.get(factor, value)
-                factor_score = min(1.0, ref_min / value)
-            else:
-                # MAYOR ES MEJOR: score = valor_actual / referencia_max
-                # Si valor = referencia_max -> score = 1.0 (100%)
-                # Si valor < referencia_max -> score < 1.0 (penalizado)
-                ref_max = reference_max.get(factor, 100)
-                factor_score = min(1.0, value / ref_max)
-            
-            # Agregar al total (factor_score está en rango 0-1)
-            total_score += factor_score * weight
-            total_weight += weight
-            score_breakdown[factor] = round(factor_score * 100, 1)
-        
-        # Calcular resolución (especial porque es string "3200x1440")
-        resolution_weight = weights.get("resolucion", 0.10)
-        resolution_str = props.get("resolucionPantalla", "")
-        if resolution_str and "x" in str(resolution_str):
-            try:
-                parts = str(resolution_str).lower().split("x")
-                res_pixels = int(parts[0]) * int(parts[1])
-                # Referencia: QHD+ (3200x1440 = 4.6M pixels) = 100%
-                ref_resolution = 4608000  # 3200 * 1440
-                res_score = min(1.0, res_pixels / ref_resolution)
-                total_score += res_score * resolution_weight
-                total_weight += resolution_weight
-                score_breakdown["resolucion"] = round(res_score * 100, 1)
-            except Exception:
-                pass
-        
-        # Bonus SWRL: esMejorOpcionQue (pequeño bonus por inferencias semánticas)
-        swrl_bonus = 0
-        try:
-            for other_id in all_product_ids:
-                if other_id != product_id:
-                    is_better = self.inference_engine.is_better_option(product_id, other_id)
-                    if is_better:
-                        swrl_bonus += 2  # +2 puntos por cada producto que supera
-        except Exception:
-            pass
-        
-        # Score final: normalizar a 0-100 y agregar bonus SWRL
-        if total_weight > 0:
-            # El score base está en rango 0-1, multiplicamos por 100
-            final_score = (total_score / total_weight) * 100 + swrl_bonus
-        else:
-            final_score = swrl_bonus
-        
-        return round(min(100, max(0, final_score)), 1)
+        # El bonus SWRL (esMejorOpcionQue) se cuenta contra el resto del
+        # conjunto con el índice de adyacencia, igual que en compare_products
+        others = [other_id for other_id in all_product_ids if other_id != product_id]
+        products = [product] + [{"id": other_id, "properties": {}} for other_id in others]
+        scores, _ = self.scoring_engine.score_products(products, [product_id] + others)
+        return scores[0]
     
     def _generate_comparison_table(self, products: List[Dict]) -> Dict[str, List]:
         """
@@ -303,9 +205,24 @@ class ComparisonService:
         
         return table
 
+    def _relation_rows(self, product_ids: List[str]):
+        """
+        Matriz de relaciones del snapshot publicado y filas densas de los
+        productos (-1 si no es un producto; sin snapshot, todas -1).
+        """
+        loader = get_active_loader()
+        snapshot = loader.snapshot if loader is not None else None
+        if snapshot is None:
+            return None, np.full(len(product_ids), -1, dtype=np.int64)
+        relations = get_relation_matrix(snapshot)
+        return relations, relations.rows_of(product_ids)
+    
     def _check_swrl_relations(self, product_ids: List[str]) -> Dict[str, Any]:
         """
         Verifica relaciones SWRL entre los productos.
+        
+        Todas las relaciones del conjunto se obtienen de una vez desde los
+        bitsets de la matriz de relaciones (ontology/relation_matrix.py).
         """
         relations = {
             "esMejorOpcionQue": [],
@@ -325,30 +242,30 @@ class ComparisonService:
             ("esEquivalenteTecnico", "DetectarEquivalentesTecnicos")
         ]
         
-        for i, p1_id in enumerate(product_ids):
-            for p2_id in product_ids[i+1:]:
-                # Verificar cada propiedad SWRL
-                for prop, rule_name in swrl_props:
-                    # Verificar p1 -> p2
-                    if self.inference_engine.check_object_property(p1_id, prop, p2_id):
-                        relations[prop].append({
-                            "source": p1_id,
-                            "target": p2_id,
-                            "rule": rule_name
-                        })
-                        if rule_name not in relations["rules_applied"]:
-                            relations["rules_applied"].append(rule_name)
-                            
-                    # Verificar p2 -> p1 (si aplica, algunas son simétricas)
-                    if self.inference_engine.check_object_property(p2_id, prop, p1_id):
-                        relations[prop].append({
-                            "source": p2_id,
-                            "target": p1_id,
-                            "rule": rule_name
-                        })
-                        if rule_name not in relations["rules_applied"]:
-                            relations["rules_applied"].append(rule_name)
-        
+        relation_matrix, rows = self._relation_rows(product_ids)
+        if relation_matrix is None:
+            return relations
+        
+        # Pares (i, j) con i < j, en el mismo orden que un doble recorrido
+        first, second = np.triu_indices(len(product_ids), k=1)
+        first_hit = []
+        for order, (prop, rule_name) in enumerate(swrl_props):
+            matrix = relation_matrix.gather(prop, rows)
+            forward = matrix[first, second]
+            backward = matrix[second, first]
+            hits = np.flatnonzero(forward | backward)
+            for k in hits.tolist():
+                p1_id, p2_id = product_ids[first[k]], product_ids[second[k]]
+                # p1 -> p2 y luego p2 -> p1 (algunas son simétricas)
+                if forward[k]:
+                    relations[prop].append({"source": p1_id, "target": p2_id, "rule": rule_name})
+                if backward[k]:
+                    relations[prop].append({"source": p2_id, "target": p1_id, "rule": rule_name})
+            if len(hits):
+                first_hit.append((int(hits[0]), order, rule_name))
+        
+        # Reglas en el orden en que aparecen al recorrer los pares
+        relations["rules_applied"] = [rule_name for _, _, rule_name in sorted(first_hit)]
         return relations
     
     def _generate_differences(self, products: List[Dict]) -> Dict[str, str]:
@@ -393,19 +310,33 @@ class ComparisonService:
     
     def _check_compatibility(self, product_ids: List[str]) -> Dict[str, Any]:
         """
-        Verifica compatibilidad entre productos.
+        Verifica compatibilidad entre productos (desde la matriz de relaciones).
         """
+        relation_matrix, rows = self._relation_rows(product_ids)
+        if relation_matrix is not None:
+            compatible = relation_matrix.gather("esCompatibleCon", rows)
+            incompatible = relation_matrix.gather("incompatibleCon", rows)
+        
         compatibility_matrix = {}
         
-        for product1_id in product_ids:
-            for product2_id in product_ids:
+        for i, product1_id in enumerate(product_ids):
+            for j, product2_id in enumerate(product_ids):
                 if product1_id != product2_id:
-                    result = self.inference_engine.check_compatibility(
-                        product1_id, 
-                        product2_id
-                    )
                     key = f"{product1_id}_vs_{product2_id}"
-                    compatibility_matrix[key] = result
+                    if rows[i] < 0 or rows[j] < 0:
+                        compatibility_matrix[key] = {
+                            "compatible": False,
+                            "incompatible": False,
+                            "error": "Uno o ambos productos no encontrados"
+                        }
+                        continue
+                    is_compatible = bool(compatible[i, j])
+                    is_incompatible = bool(incompatible[i, j])
+                    compatibility_matrix[key] = {
+                        "compatible": is_compatible,
+                        "incompatible": is_incompatible,
+                        "relationship": "compatible" if is_compatible else ("incompatible" if is_incompatible else "unknown")
+                    }
         
         return compatibility_matrix
     
@@ -8,9 +8,9 @@ Fecha: Diciembre 2024
 
 from typing import List, Dict, Optional, Set
 import logging
-from ontology.loader import get_ontology
+from ontology.loader import get_ontology, get_snapshot, get_adjacency
+from ontology.equivalence_graph import EQUIVALENCE_THRESHOLD, get_equivalence_graph
 from reasoning.inference_engine import InferenceEngine
-from utils.owl_helpers import individual_to_dict
 
 logger = logging.getLogger(__name__)
 
@@ -28,10 +28,10 @@ class EquivalenceService:
     def __init__(self):
         """Inicializa el servicio de equivalencias."""
         self.onto = get_ontology()
-        self.inference_engine = InferenceEngine(self.onto)
+        self.inference_engine = InferenceEngine()
         logger.info("EquivalenceService inicializado correctamente")
     
-    def find_equivalent_products(self, product_id: str) -> Dict:
+    def find_equivalent_products(self, product_id: str, include_reasons: bool = True) -> Dict:
         """
         Encuentra todos los productos equivalentes al producto dado.
         
@@ -42,6 +42,8 @@ class EquivalenceService:
         
         Args:
             product_id: ID del producto
+            include_reasons: Si es False, los auto-detectados no incluyen
+                match_reason (el resumen solo necesita IDs y scores)
             
         Returns:
             Diccionario con equivalencias encontradas y criterios
@@ -63,7 +65,7 @@ class EquivalenceService:
             similar_products = self.inference_engine.get_similar_products(product_id)
             
             # 3. Detección automática basada en especificaciones
-            auto_detected = self._auto_detect_equivalents(product)
+            auto_detected = self._auto_detect_equivalents(product, include_reasons)
             
             # Combinar y eliminar duplicados
             all_equivalents = self._merge_equivalents(
@@ -73,9 +75,8 @@ class EquivalenceService:
             )
             
             # Obtener detalles del producto original
-            product_dict = individual_to_dict(product)
-            product_props = product_dict.get("properties", {})
-            product_name = product_props.get("tieneNombre", product_id)
+            record = get_snapshot().get(product.name)
+            product_name = record.properties.get("tieneNombre") if record else None
             if not isinstance(product_name, str):
                 product_name = product_id
             
@@ -115,64 +116,30 @@ class EquivalenceService:
         equivalents = []
         
         try:
-            # Buscar propiedad esEquivalenteTecnico
-            if hasattr(product, 'esEquivalenteTecnico'):
-                for equiv in product.esEquivalenteTecnico:
-                    equiv_dict = individual_to_dict(equiv)
-                    props = equiv_dict.get("properties", {})
-                    
-                    # Determinar categoría desde types
-                    category = "Desconocida"
-                    for t in equiv_dict.get("types", []):
-                        if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                            category = t
-                            break
-                    
-                    equivalents.append({
-                        "id": equiv.name,
-                        "name": props.get("tieneNombre", equiv.name) if isinstance(props.get("tieneNombre"), str) else equiv.name,
-                        "category": category,
-                        "price": props.get("tienePrecio", 0),
-                        "match_type": "explicit",
-                        "match_reason": "Equivalencia técnica definida en ontología",
-                        "confidence": 100
-                    })
+            snapshot = get_snapshot()
             
-            # Como es simétrica, buscar también productos que tengan este como equivalente
-            all_products = list(self.onto.Producto.instances())
-            for other_product in all_products:
-                if other_product.name == product.name:
+            # esEquivalenteTecnico es simétrica: vecinos en ambos sentidos
+            for equiv_id in get_adjacency().neighbors("esEquivalenteTecnico", product.name):
+                equiv_record = snapshot.get(equiv_id)
+                if equiv_record is None:
                     continue
                 
-                if hasattr(other_product, 'esEquivalenteTecnico'):
-                    if product in other_product.esEquivalenteTecnico:
-                        # Evitar duplicados
-                        if not any(e["id"] == other_product.name for e in equivalents):
-                            other_dict = individual_to_dict(other_product)
-                            props = other_dict.get("properties", {})
-                            
-                            category = "Desconocida"
-                            for t in other_dict.get("types", []):
-                                if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                                    category = t
-                                    break
-                            
-                            equivalents.append({
-                                "id": other_product.name,
-                                "name": props.get("tieneNombre", other_product.name) if isinstance(props.get("tieneNombre"), str) else other_product.name,
-                                "category": category,
-                                "price": props.get("tienePrecio", 0),
-                                "match_type": "explicit",
-                                "match_reason": "Equivalencia técnica definida en ontología",
-                                "confidence": 100
-                            })
+                equivalents.append({
+                    "id": equiv_id,
+                    "name": equiv_record.name,
+                    "category": equiv_record.category or "Desconocida",
+                    "price": equiv_record.properties.get("tienePrecio", 0),
+                    "match_type": "explicit",
+                    "match_reason": "Equivalencia técnica definida en ontología",
+                    "confidence": 100
+                })
         
         except Exception as e:
             logger.error(f"Error al obtener equivalentes explícitos: {e}")
         
         return equivalents
     
-    def _auto_detect_equivalents(self, product) -> List[Dict]:
+    def _auto_detect_equivalents(self, product, include_reasons: bool = True) -> List[Dict]:
         """
         Detecta automáticamente productos equivalentes basándose en especificaciones.
         
@@ -183,8 +150,12 @@ class EquivalenceService:
         - Precio similar (±20%)
         - Pantalla similar (para electrónicos)
         
+        Los candidatos salen del grafo de equivalencias precalculado para la
+        versión vigente; aquí solo se arman las razones de cada par.
+        
         Args:
             product: Individuo del producto
+            include_reasons: Armar match_reason para cada equivalente
             
         Returns:
             Lista de productos equivalentes detectados
@@ -192,85 +163,50 @@ class EquivalenceService:
         equivalents = []
         
         try:
-            # Obtener especificaciones del producto
-            product_dict = individual_to_dict(product)
-            product_props = product_dict.get("properties", {})
-            product_types = product_dict.get("types", [])
-            
-            # Determinar categoría principal
-            product_category = None
-            for t in product_types:
-                if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                    product_category = t
-                    break
-            
-            product_ram = product_props.get("tieneRAM_GB", 0)
-            product_storage = product_props.get("tieneAlmacenamiento_GB", 0)
-            product_price = product_props.get("tienePrecio", 0)
-            product_screen = product_props.get("tienePulgadas", 0)
-            
-            # Si no tiene especificaciones básicas, no puede detectar equivalentes
-            if not product_category or product_price == 0:
+            snapshot = get_snapshot()
+            record = snapshot.get(product.name)
+            if record is None:
                 return []
             
-            # Buscar en todos los productos de la misma categoría
-            all_products = list(self.onto.Producto.instances())
+            product_data = self._equivalence_data(record)
             
-            for candidate in all_products:
-                # Saltar el mismo producto
-                if candidate.name == product.name:
-                    continue
-                
-                candidate_dict = individual_to_dict(candidate)
-                candidate_props = candidate_dict.get("properties", {})
-                candidate_types = candidate_dict.get("types", [])
+            for candidate_id, match_score in get_equivalence_graph(snapshot).neighbors(record.id):
+                candidate = snapshot.get(candidate_id)
+                candidate_data = self._equivalence_data(candidate)
                 
-                # Determinar categoría del candidato
-                candidate_category = None
-                for t in candidate_types:
-                    if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                        candidate_category = t
-                        break
-                
-                # Crear diccionarios compatibles con el método de cálculo
-                product_data = {
-                    "category": product_category,
-                    "ram_gb": product_ram,
-                    "storage_gb": product_storage,
-                    "price": product_price,
-                    "screen_inches": product_screen
-                }
+                match_reasons = []
+                if include_reasons:
+                    match_score, match_reasons = self._calculate_equivalence_match(
+                        product_data, candidate_data
+                    )
                 
-                candidate_data = {
-                    "category": candidate_category,
-                    "ram_gb": candidate_props.get("tieneRAM_GB", 0),
-                    "storage_gb": candidate_props.get("tieneAlmacenamiento_GB", 0),
-                    "price": candidate_props.get("tienePrecio", 0),
-                    "screen_inches": candidate_props.get("tienePulgadas", 0)
-                }
-                
-                # Verificar criterios de equivalencia
-                match_score, match_reasons = self._calculate_equivalence_match(
-                    product_data, candidate_data
-                )
-                
-                # Considerar equivalente si match_score >= 70%
-                if match_score >= 70:
-                    equivalents.append({
-                        "id": candidate.name,
-                        "name": candidate_props.get("tieneNombre", candidate.name) if isinstance(candidate_props.get("tieneNombre"), str) else candidate.name,
-                        "category": candidate_category or "Desconocida",
-                        "price": candidate_data["price"],
-                        "match_type": "auto_detected",
-                        "match_reason": ", ".join(match_reasons),
-                        "confidence": match_score
-                    })
+                equivalents.append({
+                    "id": candidate.id,
+                    "name": candidate.name,
+                    "category": candidate.category or "Desconocida",
+                    "price": candidate_data["price"],
+                    "match_type": "auto_detected",
+                    "match_reason": ", ".join(match_reasons),
+                    "confidence": match_score
+                })
         
         except Exception as e:
             logger.error(f"Error en detección automática de equivalentes: {e}")
         
         return equivalents
     
+    @staticmethod
+    def _equivalence_data(record) -> Dict:
+        """Datos de un registro en el formato de _calculate_equivalence_match."""
+        props = record.properties
+        return {
+            "category": record.category,
+            "ram_gb": props.get("tieneRAM_GB", 0),
+            "storage_gb": props.get("tieneAlmacenamiento_GB", 0),
+            "price": props.get("tienePrecio", 0),
+            "screen_inches": props.get("tienePulgadas", 0)
+        }
+    
     def _calculate_equivalence_match(
         self, 
         product1: Dict, 
@@ -387,6 +323,96 @@ class EquivalenceService:
         
         return result
     
+    def get_equivalence_summary(self) -> Dict:
+        """
+        Resumen de grupos de productos equivalentes del mercado.
+        
+        Se calcula una vez por versión de la ontología (estructura derivada
+        del snapshot); las llamadas siguientes son una consulta.
+        
+        Returns:
+            Diccionario con totales, top 10 de grupos y componentes conexas
+        """
+        return dict(get_snapshot().derived("equivalence_summary", self._build_equivalence_summary))
+    
+    def _build_equivalence_summary(self, snapshot) -> Dict:
+        """
+        Calcula el resumen de equivalencias de todos los productos del snapshot.
+        
+        Los equivalentes de cada producto se leen del grafo de equivalencias
+        (CSR) y del índice de adyacencia, con la misma combinación y orden
+        que find_equivalent_products, sin resolver individuos de owlready2.
+        """
+        equivalence_groups = {}
+        product_ids = snapshot.product_ids
+        products = set(product_ids)
+        graph = get_equivalence_graph(snapshot)
+        adjacency = get_adjacency()
+        
+        for product_id in product_ids:
+            # Auto-detectados < similares < explícitos (ver _merge_equivalents)
+            merged = {equiv_id: score for equiv_id, score in graph.neighbors(product_id)}
+            similar = dict.fromkeys(adjacency.forward("esSimilarA", product_id))
+            similar.update(dict.fromkeys(
+                subject_id for subject_id in adjacency.inverse("esSimilarA", product_id)
+                if subject_id != product_id and subject_id in products
+            ))
+            for equiv_id in similar:
+                if equiv_id in snapshot and equiv_id not in merged:
+                    merged[equiv_id] = 80
+            for equiv_id in adjacency.neighbors("esEquivalenteTecnico", product_id):
+                if equiv_id in snapshot:
+                    merged[equiv_id] = 100
+            if not merged:
+                continue
+            
+            equivalents = sorted(merged, key=merged.get, reverse=True)
+            equivalence_groups[product_id] = {
+                "product_id": product_id,
+                "product_name": snapshot.get(product_id).name,
+                "total_equivalents": len(equivalents),
+                "equivalents": equivalents
+            }
+        
+        products_with_equivalents = len(equivalence_groups)
+        
+        # Ordenar grupos por número de equivalentes
+        sorted_groups = sorted(
+            equivalence_groups.values(),
+            key=lambda x: x["total_equivalents"],
+            reverse=True
+        )
+        
+        # Componentes conexas sobre todas las equivalencias (explícitas,
+        # similares y detectadas)
+        components = get_equivalence_graph(snapshot).components(
+            (group["product_id"], equiv_id)
+            for group in equivalence_groups.values()
+            for equiv_id in group["equivalents"]
+        )
+        
+        return {
+            "total_products": len(product_ids),
+            "products_with_equivalents": products_with_equivalents,
+            "products_without_equivalents": len(product_ids) - products_with_equivalents,
+            "equivalence_percentage": round(products_with_equivalents / len(product_ids) * 100, 2) if product_ids else 0,
+            "top_equivalence_groups": sorted_groups[:10],  # Top 10
+            "components": {
+                "total": len(components),
+                "largest": [
+                    {"size": len(component), "product_ids": component}
+                    for component in components[:10]
+                ]
+            },
+            "summary": {
+                "message": f"{products_with_equivalents} de {len(product_ids)} productos tienen equivalentes",
+                "avg_equivalents_per_product": round(
+                    sum(g["total_equivalents"] for g in equivalence_groups.values()) / len(equivalence_groups),
+                    2
+                ) if equivalence_groups else 0
+            }
+        }
+    
     def get_equivalence_comparison(self, product1_id: str, product2_id: str) -> Dict:
         """
         Compara dos productos para determinar si son equivalentes.
@@ -408,25 +434,14 @@ class EquivalenceService:
                     "equivalent": False
                 }
             
-            product1_dict = individual_to_dict(product1)
-            product2_dict = individual_to_dict(product2)
-            
-            product1_props = product1_dict.get("properties", {})
-            product2_props = product2_dict.get("properties", {})
-            product1_types = product1_dict.get("types", [])
-            product2_types = product2_dict.get("types", [])
+            snapshot = get_snapshot()
+            record1 = snapshot.get(product1.name)
+            record2 = snapshot.get(product2.name)
             
-            # Determinar categorías
-            product1_category = None
-            product2_category = None
-            for t in product1_types:
-                if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                    product1_category = t
-                    break
-            for t in product2_types:
-                if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                    product2_category = t
-                    break
+            product1_props = record1.properties
+            product2_props = record2.properties
+            product1_category = record1.category
+            product2_category = record2.category
             
             # Crear diccionarios para cálculo
             product1_data = {
@@ -472,9 +487,9 @@ class EquivalenceService:
                     "id": product2_id,
                     "name": product2_name
                 },
-                "equivalent": match_score >= 70 or is_explicit,
+                "equivalent": match_score >= EQUIVALENCE_THRESHOLD or is_explicit,
                 "match_score": match_score,
-                "match_type": "explicit" if is_explicit else ("auto" if match_score >= 70 else "none"),
+                "match_type": "explicit" if is_explicit else ("auto" if match_score >= EQUIVALENCE_THRESHOLD else "none"),
                 "reasons": match_reasons,
                 "recommendation": self._get_equivalence_recommendation(
                     match_score, is_explicit, product1_data, product2_data
@@ -1,10 +1,14 @@
+import bisect
+import json
 import sys
 from pathlib import Path
 
 # Agregar el directorio padre al path para importar módulos
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-from ontology.loader import get_ontology
-from utils.owl_helpers import individual_to_dict, search_individuals_by_class
+import numpy as np
+
+from ontology.loader import get_ontology, get_snapshot
+from ontology.range_index import get_range_indexes
 
 class ProductService:
     """Servicio para gestionar productos de la ontología"""
@@ -41,53 +45,125 @@ class ProductService:
         return product_dict
     
     def get_all_products(self):
-        """Obtiene todos los productos"""
-        # Buscar la clase Producto de forma más robusta
-        producto_class = None
-        for cls in self.onto.classes():
-            if cls.name == "Producto":
-                producto_class = cls
-                break
+        """Obtiene todos los productos (desde el snapshot materializado)"""
+        return [
+            self._inject_image(record.to_dict())
+            for record in get_snapshot().products()
+        ]
+    
+    def get_product_by_id(self, product_id):
+        """Obtiene un producto por su ID (nombre, sin distinguir mayúsculas)"""
+        record = get_snapshot().get(product_id)
+        if record is None:
+            return None
+        
+        return self._inject_image(record.to_dict())
+    
+    def get_products_by_ids(self, product_ids):
+        """Obtiene varios productos conservando el orden de los IDs (omite inexistentes)"""
+        return [
+            self._inject_image(record.to_dict())
+            for record in get_snapshot().get_many(product_ids)
+        ]
+    
+    def query_product_ids(self, category=None, predicates=(), sort_by=None, ascending=True):
+        """
+        IDs de productos que cumplen la categoría y los predicados de rango.
         
-        if not producto_class:
-            return []
+        Usa los índices de rango (búsqueda binaria + bitsets). Con sort_by,
+        el orden sale del orden precalculado; si no, se conserva el orden
+        del catálogo (o de la categoría).
+        """
+        indexes = get_range_indexes()
+        mask = indexes.select(predicates)
         
-        products = []
-        for product in list(producto_class.instances()):
-            p_dict = individual_to_dict(product)
-            products.append(self._inject_image(p_dict))
+        if category:
+            category_ids = [record.id for record in get_snapshot().instances_of(category)]
+            if not sort_by:
+                # Mismo orden que get_products_by_category
+                rows = indexes.rows_of(category_ids)
+                return indexes.ids_of(rows[mask[rows]])
+            mask &= indexes.mask_of(category_ids)
         
-        return products
+        if sort_by:
+            return indexes.ids_of(indexes.ordered(mask, sort_by, ascending))
+        return indexes.ids_of(np.flatnonzero(mask))
     
-    def get_product_by_id(self, product_id):
-        """Obtiene un producto por su ID (nombre)"""
-        # Buscar individuo por nombre (case insensitive)
-        product_id_lower = product_id.lower()
-        for ind in list(self.onto.individuals()):
-            if ind.name and ind.name.lower() == product_id_lower:
-                p_dict = individual_to_dict(ind)
-                return self._inject_image(p_dict)
+    def query_page_ids(self, category=None, predicates=(), sort_by=None, ascending=True, after=None, limit=None):
+        """
+        Página de query_product_ids por keyset.
         
-        return None
-    
-    def get_products_by_category(self, category):
-        """Obtiene productos por categoría (Electrónica, Hogar, Moda)"""
-        # Buscar la clase de forma más robusta
-        category_class = None
-        for cls in self.onto.classes():
-            if cls.name == category:
-                category_class = cls
-                break
+        `after` es el ID del último producto de la página anterior; la
+        página siguiente empieza justo después de su clave de orden
+        ((valor de sort_by, fila) u orden de catálogo/categoría), sin
+        depender de offsets.
         
-        if not category_class:
-            return []
+        Returns:
+            (IDs de la página, total que cumple los filtros, ID para `after`
+            de la siguiente página o None si no hay más)
         
-        products = []
-        for product in list(category_class.instances()):
-            p_dict = individual_to_dict(product)
-            products.append(self._inject_image(p_dict))
+        Raises:
+            ValueError: Si `after` no es un producto
+        """
+        indexes = get_range_indexes()
+        product_ids = self.query_product_ids(category, predicates, sort_by, ascending)
         
-        return products
+        start = 0
+        if after is not None:
+            after_row = indexes.row(after)
+            if after_row is None:
+                raise ValueError(f"Producto '{after}' no encontrado (after)")
+            if category and not sort_by:
+                # Orden de la categoría (instances_of sigue el orden de los
+                # registros): la clave es la posición del registro, así que
+                # funciona aunque `after` ya no sea de la categoría
+                positions = get_snapshot().derived("record_positions", self._record_positions)
+                start = bisect.bisect_right([positions[pid] for pid in product_ids], positions[after])
+            else:
+                start = indexes.position_after(indexes.rows_of(product_ids), after_row, sort_by, ascending)
+        
+        end = len(product_ids) if limit is None else start + limit
+        page = product_ids[start:end]
+        next_after = page[-1] if page and end < len(product_ids) else None
+        return page, len(product_ids), next_after
+    
+    @staticmethod
+    def _record_positions(snapshot):
+        """Posición de cada registro en el orden de la ontología."""
+        return {record_id: i for i, record_id in enumerate(snapshot.record_ids())}
+    
+    def query_products(self, category=None, predicates=(), sort_by=None, ascending=True):
+        """Productos que cumplen la categoría y los predicados de rango (ver query_product_ids)"""
+        return self.get_products_by_ids(
+            self.query_product_ids(category, predicates, sort_by, ascending)
+        )
+    
+    def _encode_products(self, snapshot):
+        """JSON (bytes) de cada producto del snapshot, con imagenUrl."""
+        return {
+            record.id: json.dumps(self._inject_image(record.to_dict()), ensure_ascii=False).encode("utf-8")
+            for record in snapshot.products()
+        }
+    
+    def iter_encoded_products(self, product_ids):
+        """
+        JSON ya serializado de cada producto, en el orden de los IDs.
+        
+        La serialización se hace una vez por versión de la ontología, de
+        modo que una exportación solo concatena bytes.
+        """
+        encoded = get_snapshot().derived("product_json", self._encode_products)
+        for product_id in product_ids:
+            data = encoded.get(product_id)
+            if data is not None:
+                yield data
+    
+    def get_products_by_category(self, category):
+        """Obtiene productos por categoría (Electrónica, Hogar, Moda)"""
+        return [
+            self._inject_image(record.to_dict())
+            for record in get_snapshot().instances_of(category)
+        ]
     
     def get_smartphones(self):
         """Obtiene todos los smartphones"""
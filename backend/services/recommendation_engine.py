@@ -0,0 +1,533 @@
+"""
+Motor de recomendaciones - SmartCompareMarket
+
+Estructuras de larga vida para RecommendationService:
+
+- CandidatePools: por versión de la ontología materializa las columnas que
+  usa el scoring (precio, calificación, RAM, almacenamiento, descuento y
+  garantía), el bonus esMejorOpcionQue de cada producto y, por categoría,
+  un pool de candidatos ordenado por precio. El presupuesto se resuelve
+  con dos búsquedas binarias sobre el pool; RAM, almacenamiento y
+  calificación con los índices de rango.
+- RecommendationEngine: puntúa los sobrevivientes de forma vectorizada y
+  guarda el resultado en una caché LRU por (preferencias, versión), así
+  los mismos filtros no se vuelven a evaluar mientras no cambie la
+  ontología. recommend_batch evalúa muchos perfiles a la vez, agrupados
+  por categoría y presupuesto.
+
+Los scores y razones son los mismos que el cálculo producto a producto
+original.
+"""
+
+from collections import OrderedDict
+import math
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import weakref
+import logging
+
+import numpy as np
+
+import config
+from models.recommendation import UserPreferences
+from ontology.loader import get_snapshot
+from ontology.range_index import RangePredicate, get_range_indexes
+from ontology.relation_matrix import RelationMatrix, get_relation_matrix
+from ontology.snapshot import OntologySnapshot
+from services.scoring_engine import numeric_value
+from utils.topk import top_k_rows
+
+logger = logging.getLogger(__name__)
+
+# Columna -> data property usada en el scoring
+RECOMMENDATION_SPECS = {
+    "price": "tienePrecio",
+    "rating": "tieneCalificacion",
+    "ram": "tieneRAM_GB",
+    "storage": "tieneAlmacenamiento_GB",
+    "discount": "tieneDescuento",
+    "warranty": "garantiaMeses",
+}
+
+# Filtros duros resueltos con índices de rango (el faltante cuenta como 0)
+RANGE_FILTERS = (
+    ("min_ram", "tieneRAM_GB"),
+    ("min_storage", "tieneAlmacenamiento_GB"),
+    ("min_rating", "tieneCalificacion"),
+)
+
+# Primeros productos del catálogo contra los que se cuenta esMejorOpcionQue
+BETTER_OPTION_ANCHORS = 5
+
+# Lotes: los grupos de presupuesto duplican su ancho desde esta base
+BUDGET_BUCKET_BASE = 100
+
+# Celdas (perfiles x productos) puntuadas por bloque vectorizado
+BATCH_BLOCK_CELLS = 2_000_000
+
+# Margen para seleccionar el top antes de redondear (redondeo de 0.005)
+ROUNDING_MARGIN = 0.011
+
+
+class CandidatePool(NamedTuple):
+    """
+    Candidatos de una categoría.
+
+    Attributes:
+        priced_rows: Filas con precio, ordenadas por precio (estable)
+        prices: Precios de priced_rows (ascendentes)
+        unpriced_rows: Filas sin precio (pasan cualquier filtro de presupuesto)
+    """
+    priced_rows: np.ndarray
+    prices: np.ndarray
+    unpriced_rows: np.ndarray
+
+    def rows_in_budget(self, min_budget: Optional[float], budget: Optional[float]) -> np.ndarray:
+        """Filas dentro de [min_budget, budget], en orden de catálogo."""
+        lo = int(np.searchsorted(self.prices, min_budget, side="left")) if min_budget else 0
+        hi = int(np.searchsorted(self.prices, budget, side="right")) if budget else len(self.prices)
+        return np.sort(np.concatenate((self.priced_rows[lo:max(lo, hi)], self.unpriced_rows)))
+
+
+class CandidatePools:
+    """
+    Columnas de scoring y pools por categoría de los productos del snapshot.
+
+    Las filas siguen el orden de snapshot.products() (el mismo de los
+    índices de rango).
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        types: Sequence[Sequence[str]],
+        properties: Sequence[Dict[str, Any]],
+        better_counts: np.ndarray,
+        version: int = 0,
+        relations: Optional[RelationMatrix] = None
+    ):
+        self.ids = tuple(ids)
+        self.size = len(self.ids)
+        self.version = version
+        self.types = [frozenset(product_types) for product_types in types]
+        self.columns: Dict[str, np.ndarray] = {
+            column: np.fromiter(
+                (numeric_value(props.get(prop, 0)) for props in properties),
+                dtype=float, count=self.size
+            )
+            for column, prop in RECOMMENDATION_SPECS.items()
+        }
+        self.laptop_gamer = np.fromiter(
+            ("LaptopGamer" in product_types for product_types in self.types), dtype=bool, count=self.size
+        )
+        self.better_counts = better_counts
+        # Matriz de relaciones de la que salen better_counts
+        self.relations = relations
+        self._pools: Dict[Optional[str], CandidatePool] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "CandidatePools":
+        records = snapshot.products()
+        ids = [record.id for record in records]
+        relations = get_relation_matrix(snapshot)
+        pools = cls(
+            ids, [record.types for record in records], [record.properties for record in records],
+            cls.count_better(ids, relations), snapshot.version, relations
+        )
+        logger.debug(f"Pools de recomendación v{snapshot.version}: {pools.size} productos")
+        return pools
+
+    @staticmethod
+    def count_better(ids: Sequence[str], relations: RelationMatrix) -> np.ndarray:
+        """esMejorOpcionQue de cada producto contra los primeros del catálogo."""
+        better_counts = np.zeros(len(ids), dtype=np.int64)
+        for anchor in relations.rows_of(ids[:BETTER_OPTION_ANCHORS]).tolist():
+            better = relations.subjects_of("esMejorOpcionQue", anchor)
+            better[anchor] = False
+            better_counts += better
+        return better_counts
+
+    def with_relations(self, relations: RelationMatrix) -> "CandidatePools":
+        """
+        Recalcula better_counts si la matriz de relaciones cambió
+        (add_relation modifica la adyacencia sin publicar un snapshot).
+        """
+        if self.relations is not relations:
+            with self._lock:
+                if self.relations is not relations:
+                    self.better_counts = self.count_better(self.ids, relations)
+                    self.relations = relations
+        return self
+
+    def pool(self, category: Optional[str] = None) -> CandidatePool:
+        """Pool de una categoría (cualquier clase del producto); None: todo el catálogo."""
+        pool = self._pools.get(category)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(category)
+                if pool is None:
+                    pool = self._build_pool(category)
+                    self._pools[category] = pool
+        return pool
+
+    def _build_pool(self, category: Optional[str]) -> CandidatePool:
+        if category is None:
+            rows = np.arange(self.size)
+        else:
+            rows = np.array([row for row, product_types in enumerate(self.types) if category in product_types], dtype=np.int64)
+        prices = self.columns["price"][rows]
+        # Precio 0 (o no numérico) no se filtra por presupuesto
+        priced = (prices != 0) & ~np.isnan(prices)
+        order = np.argsort(prices[priced], kind="stable")
+        return CandidatePool(rows[priced][order], prices[priced][order], rows[~priced])
+
+
+def get_candidate_pools(snapshot: Optional[OntologySnapshot] = None) -> CandidatePools:
+    """
+    Pools de recomendación de la versión vigente (construidos una vez por
+    snapshot; better_counts sigue al índice de adyacencia).
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+    pools = snapshot.derived("recommendation_pools", CandidatePools.from_snapshot)
+    return pools.with_relations(get_relation_matrix(snapshot))
+
+
+class ScoredCandidates(NamedTuple):
+    """
+    Productos que cumplen los filtros, en orden de catálogo.
+
+    Attributes:
+        ids: IDs de los candidatos
+        rows: Filas en CandidatePools
+        scores: Score de recomendación (redondeado a 2 decimales)
+        matches: Criterios cumplidos por candidato
+        total_criteria: Criterios pedidos en las preferencias
+    """
+    ids: List[str]
+    rows: np.ndarray
+    scores: np.ndarray
+    matches: np.ndarray
+    total_criteria: int
+
+
+class RankedCandidates(NamedTuple):
+    """
+    Top de un perfil en recommend_batch.
+
+    Attributes:
+        ids: IDs recomendados (orden del ranking)
+        rows: Filas en CandidatePools
+        scores: Score de recomendación (redondeado a 2 decimales)
+        matches: Criterios cumplidos por recomendado
+        total_matches: Productos que cumplen los filtros
+        total_criteria: Criterios pedidos en las preferencias
+    """
+    ids: List[str]
+    rows: List[int]
+    scores: List[float]
+    matches: List[int]
+    total_matches: int
+    total_criteria: int
+
+
+def budget_bucket(budget: Optional[float]) -> Optional[int]:
+    """
+    Grupo de presupuesto para recommend_batch: potencias de 2 sobre
+    BUDGET_BUCKET_BASE (hasta 100, 100-200, 200-400, ...); None sin presupuesto.
+    """
+    if not budget:
+        return None
+    if budget <= BUDGET_BUCKET_BASE:
+        return 0
+    return math.ceil(math.log2(budget / BUDGET_BUCKET_BASE))
+
+
+class RecommendationEngine:
+    """
+    Filtrado y scoring de recomendaciones con caché por preferencias.
+
+    Uso:
+        engine = get_recommendation_engine()
+        candidates = engine.recommend(UserPreferences(budget=1500))
+    """
+
+    def __init__(self, cache_entries: int = 512):
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[Tuple, ScoredCandidates]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._snapshot_ref = None
+        self._relations_ref = None
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def cache_key(preferences: UserPreferences, version: int) -> Tuple:
+        return (
+            preferences.preferred_category, preferences.budget, preferences.min_budget,
+            preferences.min_ram, preferences.min_storage, preferences.min_rating, version
+        )
+
+    def recommend(self, preferences: UserPreferences, snapshot: Optional[OntologySnapshot] = None) -> ScoredCandidates:
+        """Candidatos puntuados para las preferencias (desde la caché si ya se calcularon)."""
+        if snapshot is None:
+            snapshot = get_snapshot()
+        pools = get_candidate_pools(snapshot)
+        relations = pools.relations
+        key = self.cache_key(preferences, snapshot.version)
+
+        with self._lock:
+            current = self._snapshot_ref() if self._snapshot_ref is not None else None
+            cached_relations = self._relations_ref() if self._relations_ref is not None else None
+            if current is not snapshot or cached_relations is not relations:
+                # Otra versión publicada o relaciones nuevas (bonus de
+                # esMejorOpcionQue): los resultados anteriores no sirven
+                self._cache.clear()
+                self._snapshot_ref = weakref.ref(snapshot)
+                self._relations_ref = weakref.ref(relations)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        candidates = self._evaluate(preferences, snapshot, pools)
+        with self._lock:
+            if self._snapshot_ref() is snapshot and self._relations_ref() is relations:
+                self._cache[key] = candidates
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return candidates
+
+    def _evaluate(self, prefs: UserPreferences, snapshot: OntologySnapshot, pools: CandidatePools) -> ScoredCandidates:
+        # Filtros duros: presupuesto sobre el pool ordenado por precio y
+        # especificaciones mínimas con los índices de rango
+        rows = pools.pool(prefs.preferred_category).rows_in_budget(prefs.min_budget, prefs.budget)
+        if len(rows):
+            rows = rows[self._range_mask(prefs, snapshot)[rows]]
+
+        raw, matches, total_criteria = self._score(pools, rows, [prefs])
+        scores = np.array([round(value, 2) for value in raw[0].tolist()])
+        return ScoredCandidates([pools.ids[row] for row in rows.tolist()], rows, scores, matches[0], int(total_criteria[0]))
+
+    @staticmethod
+    def _range_mask(prefs: UserPreferences, snapshot: OntologySnapshot) -> np.ndarray:
+        """Bitset de productos que cumplen RAM, almacenamiento y calificación mínimos."""
+        indexes = get_range_indexes(snapshot)
+        predicates = [
+            RangePredicate(prop, low=getattr(prefs, field), default=0.0)
+            for field, prop in RANGE_FILTERS if getattr(prefs, field)
+        ]
+        return indexes.select(predicates)
+
+    @staticmethod
+    def _score(
+        pools: CandidatePools,
+        rows: np.ndarray,
+        profiles: Sequence[UserPreferences]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score sin redondear (perfiles x filas); mismos factores y orden de
+        suma que el cálculo escalar.
+
+        Returns:
+            (scores, criterios cumplidos, criterios pedidos por perfil)
+        """
+        def column(name):
+            return pools.columns[name][rows][None, :]
+
+        def preference(field):
+            # Perfil x 1; NaN si el criterio no se pidió
+            values = [getattr(prefs, field) for prefs in profiles]
+            return np.array([value if value else np.nan for value in values], dtype=float)[:, None]
+
+        price, rating, ram, storage = column("price"), column("rating"), column("ram"), column("storage")
+        budget, min_rating, min_ram, min_storage = (
+            preference(field) for field in ("budget", "min_rating", "min_ram", "min_storage")
+        )
+        has_budget = ~np.isnan(budget)
+        score = np.zeros((len(profiles), len(rows)))
+        matches = np.zeros((len(profiles), len(rows)), dtype=np.int64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Factor 1: Presupuesto (30 puntos máx)
+            budget_usage = price / budget
+            in_budget = has_budget & (price > 0) & (budget_usage <= 1.0)
+            score = np.where(in_budget, score + (1 - budget_usage * 0.5) * 30, score)
+            matches += in_budget
+
+            # Factor 2: Calificación (25 puntos máx)
+            matches += (rating > 0) & (rating >= min_rating)
+            score = np.where(rating > 0, score + rating * 5, score)
+
+            # Factor 3: RAM (15 puntos máx)
+            meets = (ram > 0) & (ram >= min_ram)
+            score = np.where(meets, score + 15, score)
+            matches += meets
+
+            # Factor 4: Almacenamiento (10 puntos máx)
+            meets = (storage > 0) & (storage >= min_storage)
+            score = np.where(meets, score + 10, score)
+            matches += meets
+
+            # Factor 5: Bonus SWRL, descuento y garantía
+            score = np.where(pools.laptop_gamer[rows], score + 10, score)
+            discount = column("discount")
+            score = np.where(discount > 0, score + discount * 0.5, score)
+            score = np.where(column("warranty") >= 24, score + 5, score)
+            better = pools.better_counts[rows][None, :]
+            score = np.where(better > 0, score + better * 2, score)
+
+            # Regla RecomendarPorPresupuesto (simulada)
+            score = np.where(has_budget & (price <= budget), score + 10, score)
+
+        total_criteria = sum((~np.isnan(values[:, 0])).astype(np.int64) for values in (budget, min_rating, min_ram, min_storage))
+        return score, matches, total_criteria
+
+    def recommend_batch(
+        self,
+        profiles: Sequence[UserPreferences],
+        limit: int = 5,
+        snapshot: Optional[OntologySnapshot] = None
+    ) -> List[RankedCandidates]:
+        """
+        Top `limit` de muchos perfiles a la vez (mismo resultado que la
+        primera página de recommend para cada uno).
+
+        Los perfiles se agrupan por (categoría, grupo de presupuesto): cada
+        grupo toma su pool una sola vez, con el rango de precios que cubre
+        a todos sus perfiles, y lo puntúa por bloques de perfiles x filas.
+        Los perfiles repetidos se evalúan una vez. No usa la caché de
+        recommend, para no desalojar las consultas interactivas.
+        """
+        if snapshot is None:
+            snapshot = get_snapshot()
+        pools = get_candidate_pools(snapshot)
+
+        unique: Dict[Tuple, int] = {}
+        groups: Dict[Tuple, List[UserPreferences]] = {}
+        for prefs in profiles:
+            key = self.cache_key(prefs, snapshot.version)
+            if key not in unique:
+                unique[key] = len(unique)
+                groups.setdefault((prefs.preferred_category, budget_bucket(prefs.budget)), []).append(prefs)
+
+        results: List[Optional[RankedCandidates]] = [None] * len(unique)
+        range_masks: Dict[Tuple, np.ndarray] = {}
+        for (category, _), members in groups.items():
+            # Rango de precios que cubre a todo el grupo
+            min_budgets = [prefs.min_budget for prefs in members]
+            budgets = [prefs.budget for prefs in members]
+            rows = pools.pool(category).rows_in_budget(
+                min(min_budgets) if all(min_budgets) else None,
+                max(budgets) if all(budgets) else None
+            )
+            price = pools.columns["price"][rows]
+            priced = (price != 0) & ~np.isnan(price)
+
+            block = max(1, BATCH_BLOCK_CELLS // max(len(rows), 1))
+            for start in range(0, len(members), block):
+                chunk = members[start:start + block]
+                raw, matches, total_criteria = self._score(pools, rows, chunk)
+                for i, prefs in enumerate(chunk):
+                    keep = np.ones(len(rows), dtype=bool)
+                    if prefs.budget:
+                        keep &= ~priced | (price <= prefs.budget)
+                    if prefs.min_budget:
+                        keep &= ~priced | (price >= prefs.min_budget)
+                    range_key = tuple(getattr(prefs, field) for field, _ in RANGE_FILTERS)
+                    if any(range_key):
+                        if range_key not in range_masks:
+                            range_masks[range_key] = self._range_mask(prefs, snapshot)
+                        keep &= range_masks[range_key][rows]
+
+                    positions = np.flatnonzero(keep)
+                    top_positions, top_scores = self._top(raw[i, positions], limit)
+                    selected = positions[top_positions]
+                    results[unique[self.cache_key(prefs, snapshot.version)]] = RankedCandidates(
+                        [pools.ids[row] for row in rows[selected].tolist()],
+                        rows[selected].tolist(),
+                        top_scores,
+                        matches[i, selected].tolist(),
+                        len(positions),
+                        int(total_criteria[i])
+                    )
+
+        return [results[unique[self.cache_key(prefs, snapshot.version)]] for prefs in profiles]
+
+    @staticmethod
+    def _top(raw: np.ndarray, limit: int) -> Tuple[np.ndarray, List[float]]:
+        """
+        Posiciones y scores (redondeados) del top `limit`, igual que
+        top_k_rows sobre los scores redondeados.
+
+        Solo se redondean los candidatos que pueden quedar en el top: el
+        redondeo a 2 decimales mueve cada score como mucho 0.005.
+        """
+        positions = np.arange(len(raw))
+        if limit < len(raw):
+            threshold = np.partition(raw, len(raw) - limit)[len(raw) - limit]
+            positions = np.flatnonzero(raw >= threshold - ROUNDING_MARGIN)
+        rounded = np.array([round(value, 2) for value in raw[positions].tolist()])
+        order = top_k_rows(rounded, limit)
+        return positions[order], rounded[order].tolist()
+
+    @staticmethod
+    def reason(pools: CandidatePools, row: int, prefs: UserPreferences) -> str:
+        """Razones de la recomendación de un producto (solo para los que se devuelven)."""
+        price, rating, ram, discount, warranty = (
+            float(pools.columns[column][row]) for column in ("price", "rating", "ram", "discount", "warranty")
+        )
+        reasons = []
+
+        if prefs.budget and price > 0:
+            budget_usage = price / prefs.budget
+            if budget_usage <= 1.0:
+                if budget_usage < 0.7:
+                    reasons.append(f"Excelente precio (${price}, dentro de tu presupuesto)")
+                else:
+                    reasons.append(f"Precio ajustado (${price})")
+        if rating >= 4.5:
+            reasons.append(f"Excelente calificación ({rating}/5)")
+        if prefs.min_ram and ram > 0 and ram >= prefs.min_ram and ram >= 16:
+            reasons.append(f"Alta RAM ({ram}GB)")
+        if pools.laptop_gamer[row]:
+            reasons.append("Laptop Gamer detectado (SWRL)")
+        if discount > 0:
+            reasons.append(f"Tiene descuento del {discount}%")
+        if warranty >= 24:
+            reasons.append(f"Garantía extendida ({warranty} meses)")
+        better_than_count = int(pools.better_counts[row])
+        if better_than_count > 0:
+            reasons.append(f"Mejor opción que {better_than_count} productos similares")
+        if prefs.budget and price <= prefs.budget:
+            reasons.append("Recomendado por presupuesto (SWRL)")
+
+        return " | ".join(reasons) if reasons else "Cumple criterios básicos"
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de la caché de recomendaciones."""
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.cache_entries,
+                "hits": self._hits,
+                "misses": self._misses
+            }
+
+
+# Singleton global
+_recommendation_engine = None
+_recommendation_engine_lock = threading.Lock()
+
+
+def get_recommendation_engine() -> RecommendationEngine:
+    """Obtiene la instancia singleton del motor (configurada con RECOMMENDATION_CONFIG)"""
+    global _recommendation_engine
+    if _recommendation_engine is None:
+        with _recommendation_engine_lock:
+            if _recommendation_engine is None:
+                _recommendation_engine = RecommendationEngine(**config.RECOMMENDATION_CONFIG)
+    return _recommendation_engine
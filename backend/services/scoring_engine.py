@@ -0,0 +1,516 @@
+"""
+Motor de scoring vectorizado - SmartCompareMarket
+
+Calcula el score de comparación (0-100) de un conjunto de productos de una
+sola vez:
+
+- Los pesos se leen de data/comparison_weights.json una sola vez y se
+  recargan solo cuando cambia la fecha de modificación del archivo.
+- Los valores de cada factor (y los píxeles de resolucionPantalla ya
+  parseados) se materializan por versión de la ontología en una matriz
+  columnar (ScoringMatrix).
+- La normalización ponderada se evalúa por columnas sobre todas las filas;
+  los factores se acumulan en el mismo orden que el cálculo escalar
+  original, así que los scores no cambian.
+- El bonus SWRL (esMejorOpcionQue) se cuenta recorriendo las aristas del
+  índice de adyacencia, no comparando todos los pares.
+- rank() ubica un producto frente a toda su categoría (percentil y
+  alternativas mejores/peores) con la misma fórmula.
+"""
+
+from collections import defaultdict
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ontology.loader import get_active_loader, get_adjacency, get_snapshot
+from ontology.snapshot import OntologySnapshot
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_PATH = Path(__file__).resolve().parent.parent / "data" / "comparison_weights.json"
+
+# Pesos usados si el archivo no se puede leer
+DEFAULT_WEIGHTS = {
+    "bateria": 0.20, "calificacion": 0.18, "precio": 0.14,
+    "resolucion": 0.10, "ram": 0.10, "almacenamiento": 0.10,
+    "garantia": 0.07, "pantalla": 0.06, "peso_fisico": 0.05
+}
+
+# Mapeo de factores a propiedades de la ontología
+FACTOR_PROPERTIES = {
+    "pantalla": "tienePulgadas",
+    "bateria": "bateriaCapacidad_mAh",
+    "ram": "tieneRAM_GB",
+    "almacenamiento": "tieneAlmacenamiento_GB",
+    "precio": "tienePrecio",
+    "garantia": "garantiaMeses",
+    "calificacion": "tieneCalificacion",
+    "peso_fisico": "pesoGramos"
+}
+
+# Valores de referencia para normalización (realistas para smartphones/electronics)
+# Mayor es mejor: usamos valor_max como referencia (100% = alcanzar el max)
+# Menor es mejor: usamos valor_min como referencia (100% = alcanzar el min)
+REFERENCE_MAX = {
+    "pantalla": 7.0,        # 7 pulgadas es excelente para smartphone
+    "bateria": 5500,        # 5500 mAh es excelente
+    "ram": 16,              # 16 GB es excelente para móvil
+    "almacenamiento": 512,  # 512 GB es excelente
+    "garantia": 24,         # 24 meses es excelente
+    "calificacion": 5.0,    # 5.0 es perfecta
+}
+
+REFERENCE_MIN = {
+    "precio": 600,          # $600 es un buen precio base
+    "peso_fisico": 170,     # 170g es muy ligero
+}
+
+# Factores donde menor es mejor
+LOWER_BETTER = {"precio", "peso_fisico"}
+
+# Referencia de resolución: QHD+ (3200x1440 = 4.6M pixels) = 100%
+REFERENCE_RESOLUTION = 4608000
+
+# Puntos por cada producto comparado que el producto supera (esMejorOpcionQue)
+SWRL_BONUS = 2
+
+
+def numeric_value(value: Any) -> float:
+    """
+    Extrae valor numérico seguro, manejando listas y tipos.
+    """
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 0.0
+        value = value[0]
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def resolution_pixels(value: Any) -> float:
+    """Píxeles de resolucionPantalla ("3200x1440"); NaN si no se puede parsear."""
+    if isinstance(value, tuple):
+        value = list(value)
+    if value and "x" in str(value):
+        try:
+            parts = str(value).lower().split("x")
+            return float(int(parts[0]) * int(parts[1]))
+        except Exception:
+            pass
+    return float("nan")
+
+
+class ScoringMatrix:
+    """
+    Valores de los factores de scoring en formato columnar.
+
+    La fila i corresponde a ids[i]. Los faltantes valen 0 (igual que
+    properties.get(prop, 0)); la resolución no parseable vale NaN.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        properties: Sequence[Mapping[str, Any]],
+        version: int = 0,
+        categories: Optional[Sequence[Optional[str]]] = None
+    ):
+        self.ids = tuple(ids)
+        self.size = len(self.ids)
+        self.version = version
+        self.categories = tuple(categories) if categories is not None else (None,) * self.size
+        self.columns: Dict[str, np.ndarray] = {
+            factor: np.fromiter(
+                (numeric_value(props.get(prop, 0)) for props in properties),
+                dtype=float, count=self.size
+            )
+            for factor, prop in FACTOR_PROPERTIES.items()
+        }
+        self.resolution = np.fromiter(
+            (resolution_pixels(props.get("resolucionPantalla", "")) for props in properties),
+            dtype=float, count=self.size
+        )
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+        category_rows: Dict[Optional[str], List[int]] = defaultdict(list)
+        for row, category in enumerate(self.categories):
+            category_rows[category].append(row)
+        self._category_rows = {
+            category: np.array(rows, dtype=np.int64) for category, rows in category_rows.items()
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: OntologySnapshot) -> "ScoringMatrix":
+        records = snapshot.products()
+        matrix = cls(
+            [record.id for record in records], [record.properties for record in records],
+            snapshot.version, [record.category for record in records]
+        )
+        logger.debug(f"Matriz de scoring v{snapshot.version}: {matrix.size} productos")
+        return matrix
+
+    @classmethod
+    def from_products(cls, products: Sequence[Dict]) -> "ScoringMatrix":
+        """Matriz ad hoc a partir de productos en formato individual_to_dict."""
+        return cls([product.get("id") for product in products], [product.get("properties", {}) for product in products])
+
+    def rows_of(self, product_ids: Sequence[str]) -> Optional[np.ndarray]:
+        """Filas de los IDs (None si alguno no es un producto de la matriz)."""
+        rows = [self._rows.get(pid) for pid in product_ids]
+        if any(row is None for row in rows):
+            return None
+        return np.array(rows, dtype=np.int64)
+
+    def row_of(self, product_id: str) -> Optional[int]:
+        """Fila de un ID (None si no es un producto de la matriz)."""
+        return self._rows.get(product_id)
+
+    def category_rows(self, category: Optional[str]) -> np.ndarray:
+        """Filas (ordenadas) de los productos de una categoría."""
+        return self._category_rows.get(category, np.empty(0, dtype=np.int64))
+
+
+def get_scoring_matrix(snapshot: Optional[OntologySnapshot] = None) -> ScoringMatrix:
+    """Matriz de scoring de la versión vigente (construida una vez por snapshot)."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    return snapshot.derived("scoring_matrix", ScoringMatrix.from_snapshot)
+
+
+class ScoringEngine:
+    """
+    Scoring por lotes de productos con pesos configurables.
+
+    Uso:
+        engine = get_scoring_engine()
+        scores, breakdown = engine.score(["iPhone15_Barato", "iPhone15_Caro"], breakdown=True)
+    """
+
+    def __init__(self, weights_path: Path = WEIGHTS_PATH):
+        self.weights_path = Path(weights_path)
+        self._lock = threading.Lock()
+        self._weights: Dict[str, float] = dict(DEFAULT_WEIGHTS)
+        self._mtime: Optional[float] = None
+        # Scores por categoría: categoría -> (matriz, pesos, adyacencia, versión, resultado)
+        self._category_cache: Dict[Optional[str], Tuple[Any, ...]] = {}
+
+    def weights(self) -> Dict[str, float]:
+        """Pesos vigentes (se recargan si cambió la fecha del archivo)."""
+        try:
+            mtime = os.stat(self.weights_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._weights = self._load_weights()
+                    self._mtime = mtime
+        return self._weights
+
+    def _load_weights(self) -> Dict[str, float]:
+        try:
+            with open(self.weights_path, "r", encoding="utf-8") as f:
+                weights = json.load(f).get("weights", {})
+            logger.info(f"Pesos de comparación cargados desde {self.weights_path}")
+            return weights
+        except Exception as e:
+            logger.warning(f"No se pudieron leer los pesos ({e}); se usan los valores por defecto")
+            return dict(DEFAULT_WEIGHTS)
+
+    def score(
+        self,
+        product_ids: Sequence[str],
+        breakdown: bool = False,
+        snapshot: Optional[OntologySnapshot] = None
+    ) -> Tuple[List[float], Optional[List[Dict[str, float]]]]:
+        """
+        Scores (0-100) de los productos del snapshot, en el orden recibido.
+
+        Raises:
+            ValueError: Si algún ID no existe en el snapshot
+
+        Returns:
+            (scores, breakdown); ver score_products
+        """
+        if snapshot is None:
+            snapshot = get_snapshot()
+        products = []
+        for product_id in product_ids:
+            record = snapshot.get(product_id)
+            if record is None:
+                raise ValueError(f"Producto '{product_id}' no encontrado")
+            products.append({"id": record.id, "properties": record.properties})
+        return self.score_products(products, product_ids, breakdown, snapshot)
+
+    def score_products(
+        self,
+        products: Sequence[Dict],
+        product_ids: Optional[Sequence[str]] = None,
+        breakdown: bool = False,
+        snapshot: Optional[OntologySnapshot] = None
+    ) -> Tuple[List[float], Optional[List[Dict[str, float]]]]:
+        """
+        Scores (0-100) de productos en formato individual_to_dict.
+
+        Si todos son productos del snapshot (por defecto, el publicado) se
+        usan sus filas de la matriz precalculada; si no, se arma una matriz
+        para el conjunto. El bonus SWRL se calcula dentro del conjunto: +2
+        por cada otro producto del que es mejor opción.
+
+        Args:
+            products: Productos a puntuar
+            product_ids: IDs tal como se pidieron (para no contar el bonus
+                contra el mismo ID); por defecto los de los productos
+            breakdown: Incluir el porcentaje obtenido en cada factor
+
+        Returns:
+            (scores, breakdown) donde breakdown es, por producto, el
+            porcentaje (0-100) de cada factor (None si no se pidió)
+        """
+        if snapshot is None:
+            loader = get_active_loader()
+            snapshot = loader.snapshot if loader is not None else None
+        canonical = [product.get("id") for product in products]
+        if product_ids is None:
+            product_ids = canonical
+
+        rows = None
+        if snapshot is not None:
+            matrix = get_scoring_matrix(snapshot)
+            rows = matrix.rows_of(canonical)
+        if rows is None:
+            matrix = ScoringMatrix.from_products(products)
+            rows = np.arange(len(products))
+
+        bonus = self.swrl_bonus(product_ids, canonical, snapshot) if snapshot is not None else None
+        return self.score_rows(matrix, rows, bonus, breakdown)
+
+    def score_rows(
+        self,
+        matrix: ScoringMatrix,
+        rows: np.ndarray,
+        bonus: Optional[np.ndarray] = None,
+        breakdown: bool = False
+    ) -> Tuple[List[float], Optional[List[Dict[str, float]]]]:
+        """Scores de filas de la matriz (ver score); bonus: puntos SWRL por fila."""
+        weights = self.weights()
+        total_score = np.zeros(len(rows))
+        total_weight = 0.0
+        factor_scores: Dict[str, np.ndarray] = {}
+
+        for factor, weight in weights.items():
+            if factor == "resolucion":
+                continue  # Se calcula aparte
+
+            if factor not in FACTOR_PROPERTIES:
+                continue
+
+            values = matrix.columns[factor][rows]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if factor in LOWER_BETTER:
+                    # MENOR ES MEJOR: score = referencia_min / valor_actual
+                    normalized = np.minimum(1.0, REFERENCE_MIN.get(factor, values) / values)
+                else:
+                    # MAYOR ES MEJOR: score = valor_actual / referencia_max
+                    normalized = np.minimum(1.0, values / REFERENCE_MAX.get(factor, 100))
+            # Propiedad faltante = 0 puntos para este factor
+            normalized = np.where(values <= 0, 0.0, normalized)
+
+            total_score += normalized * weight
+            total_weight += weight
+            factor_scores[factor] = normalized
+
+        # Resolución: solo suma (y pondera) si se pudo parsear
+        resolution_weight = weights.get("resolucion", 0.10)
+        pixels = matrix.resolution[rows]
+        has_resolution = ~np.isnan(pixels)
+        resolution_score = np.minimum(1.0, np.where(has_resolution, pixels, 0.0) / REFERENCE_RESOLUTION)
+        total_score = np.where(has_resolution, total_score + resolution_score * resolution_weight, total_score)
+        total_weights = np.where(has_resolution, total_weight + resolution_weight, total_weight)
+
+        if bonus is None:
+            bonus = np.zeros(len(rows), dtype=np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            base = (total_score / total_weights) * 100
+
+        # Score final: normalizar a 0-100 y agregar bonus SWRL
+        scores = [
+            round(min(100, max(0, value + points if weight > 0 else points)), 1)
+            for value, points, weight in zip(base.tolist(), bonus.tolist(), total_weights.tolist())
+        ]
+
+        factors = None
+        if breakdown:
+            factors = []
+            columns = {factor: values.tolist() for factor, values in factor_scores.items()}
+            resolution_values = resolution_score.tolist()
+            for i, present in enumerate(has_resolution.tolist()):
+                entry = {factor: round(values[i] * 100, 1) for factor, values in columns.items()}
+                if present:
+                    entry["resolucion"] = round(resolution_values[i] * 100, 1)
+                factors.append(entry)
+        return scores, factors
+
+    def rank(self, product_id: str, top_k: int = 5, snapshot: Optional[OntologySnapshot] = None) -> Dict[str, Any]:
+        """
+        Posición de un producto frente a todos los de su categoría.
+
+        Puntúa la categoría completa sobre la matriz de scoring (el bonus
+        SWRL se cuenta dentro de la categoría) y retorna el percentil, los
+        top_k mejores productos de la categoría que lo superan y los top_k
+        que quedan inmediatamente por debajo.
+
+        Raises:
+            ValueError: Si el ID no es un producto del snapshot
+
+        Returns:
+            Diccionario con score, rank (1 = mejor), percentile (porcentaje
+            de productos de la categoría que supera; los empates cuentan
+            la mitad), breakdown y las listas better / worse
+        """
+        if snapshot is None:
+            snapshot = get_snapshot()
+        matrix = get_scoring_matrix(snapshot)
+        row = matrix.row_of(product_id)
+        if row is None:
+            raise ValueError(f"Producto '{product_id}' no encontrado")
+
+        category = matrix.categories[row]
+        rows, bonus, scores = self.category_scores(matrix, category)
+        position = int(np.searchsorted(rows, row))
+        target = scores[position]
+
+        above = np.flatnonzero(scores > target)
+        below = np.flatnonzero(scores < target)
+        others = len(rows) - 1
+        ties = others - len(above) - len(below)
+        percentile = round(100 * (len(below) + 0.5 * ties) / others, 1) if others else 100.0
+
+        # Mayor score primero; a igual score, orden del catálogo
+        better = above[np.lexsort((rows[above], -scores[above]))][:top_k]
+        worse = below[np.lexsort((rows[below], -scores[below]))][:top_k]
+
+        selected = np.concatenate(([position], better, worse)).astype(np.int64)
+        _, factors = self.score_rows(matrix, rows[selected], bonus[selected], breakdown=True)
+        entries = []
+        for i, factor in zip(selected.tolist(), factors):
+            record = snapshot.get(matrix.ids[rows[i]])
+            entries.append({
+                "id": record.id,
+                "name": record.name,
+                "price": record.spec("tienePrecio") or None,
+                "score": float(scores[i]),
+                "breakdown": factor
+            })
+
+        return {
+            "product_id": product_id,
+            "category": category,
+            "score": float(target),
+            "rank": len(above) + 1,
+            "total": len(rows),
+            "percentile": percentile,
+            "breakdown": entries[0]["breakdown"],
+            "better": entries[1:1 + len(better)],
+            "worse": entries[1 + len(better):]
+        }
+
+    def category_scores(self, matrix: ScoringMatrix, category: Optional[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (filas, bonus, scores) de toda una categoría.
+
+        Se calculan una vez por matriz, pesos y versión del índice de
+        adyacencia: todos los rank() de la misma categoría reutilizan el
+        resultado hasta que cambie alguno (ej: add_relation sobre
+        esMejorOpcionQue, que no publica un snapshot nuevo).
+        """
+        weights = self.weights()
+        adjacency = get_adjacency()
+        version = adjacency.version
+        cached = self._category_cache.get(category)
+        if (cached is not None and cached[0] is matrix and cached[1] is weights
+                and cached[2] is adjacency and cached[3] == version):
+            return cached[4]
+        rows = matrix.category_rows(category)
+        bonus = self.category_bonus(matrix, rows, adjacency)
+        scores = np.asarray(self.score_rows(matrix, rows, bonus)[0], dtype=float)
+        result = (rows, bonus, scores)
+        with self._lock:
+            self._category_cache[category] = (matrix, weights, adjacency, version, result)
+        return result
+
+    @staticmethod
+    def category_bonus(matrix: ScoringMatrix, rows: np.ndarray, adjacency=None) -> np.ndarray:
+        """
+        Bonus SWRL de cada fila frente al resto de `rows` (sin IDs
+        repetidos): +2 por cada producto del conjunto del que es mejor opción.
+        """
+        if adjacency is None:
+            adjacency = get_adjacency()
+        in_set = np.zeros(matrix.size, dtype=bool)
+        in_set[rows] = True
+
+        pairs = set()
+        for subject_id, object_id in adjacency.edges("esMejorOpcionQue"):
+            src, dst = matrix.row_of(subject_id), matrix.row_of(object_id)
+            if src is None or dst is None or src == dst or not (in_set[src] and in_set[dst]):
+                continue
+            pairs.add((src, dst))
+            if "esMejorOpcionQue" in adjacency.symmetric:
+                pairs.add((dst, src))
+
+        if not pairs:
+            return np.zeros(len(rows), dtype=np.int64)
+        sources = np.fromiter((src for src, _ in pairs), dtype=np.int64, count=len(pairs))
+        return np.bincount(sources, minlength=matrix.size)[rows] * SWRL_BONUS
+
+    @staticmethod
+    def swrl_bonus(product_ids: Sequence[str], canonical: Sequence[str], snapshot: OntologySnapshot) -> np.ndarray:
+        """
+        +2 por cada otro producto del conjunto del que es mejor opción
+        (esMejorOpcionQue, solo entre instancias de Producto).
+        """
+        products = set(snapshot.product_ids)
+        adjacency = get_adjacency()
+        symmetric = "esMejorOpcionQue" in adjacency.symmetric
+
+        positions = defaultdict(list)
+        for position, individual_id in enumerate(canonical):
+            if individual_id in products:
+                positions[individual_id].append(position)
+
+        bonus = np.zeros(len(canonical), dtype=np.int64)
+        for i, individual_id in enumerate(canonical):
+            if individual_id not in products:
+                continue
+            targets = set(adjacency.forward("esMejorOpcionQue", individual_id))
+            if symmetric:
+                targets.update(adjacency.inverse("esMejorOpcionQue", individual_id))
+            for target in targets:
+                for j in positions.get(target, ()):
+                    if product_ids[j] != product_ids[i]:
+                        bonus[i] += SWRL_BONUS
+        return bonus
+
+
+# Singleton global
+_scoring_engine = None
+
+
+def get_scoring_engine() -> ScoringEngine:
+    """Obtiene la instancia singleton del motor de scoring"""
+    global _scoring_engine
+    if _scoring_engine is None:
+        _scoring_engine = ScoringEngine()
+    return _scoring_engine
@@ -8,6 +8,9 @@ from typing import List, Dict, Any, Optional
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from ontology.range_index import RangePredicate, SORT_FIELDS, get_range_indexes
+from utils.topk import top_k
+
 
 class SPARQLFilters:
     """
@@ -38,22 +41,17 @@ class SPARQLFilters:
         Returns:
             Lista filtrada de productos
         """
-        result = products.copy()
-        
-        # Filtro de precio
+        # Filtros numéricos con los índices de rango (un solo recorrido)
+        predicates = []
         if price_range:
             min_price, max_price = price_range
-            result = [
-                p for p in result
-                if self._check_price_range(p, min_price, max_price)
-            ]
-        
-        # Filtro de RAM
+            predicates.append(RangePredicate("tienePrecio", min_price, max_price))
         if ram_min is not None:
-            result = [
-                p for p in result
-                if p.get('properties', {}).get('tieneRAM_GB', 0) >= ram_min
-            ]
+            predicates.append(RangePredicate("tieneRAM_GB", low=ram_min, default=0))
+        if storage_min is not None:
+            predicates.append(RangePredicate("tieneAlmacenamiento_GB", low=storage_min, default=0))
+        
+        result = self._filter_by_ranges(products, predicates)
         
         # Filtro de categoría
         if category:
@@ -62,15 +60,46 @@ class SPARQLFilters:
                 if category.lower() in p.get('type', '').lower()
             ]
         
-        # Filtro de almacenamiento
-        if storage_min is not None:
-            result = [
-                p for p in result
-                if p.get('properties', {}).get('tieneAlmacenamiento_GB', 0) >= storage_min
-            ]
+        return result
+    
+    def _filter_by_ranges(
+        self,
+        products: List[Dict],
+        predicates: List[RangePredicate]
+    ) -> List[Dict]:
+        """
+        Conserva los productos que cumplen todos los predicados de rango.
         
+        Los productos del snapshot se resuelven con el bitset de los índices;
+        los que no están indexados se evalúan sobre sus propiedades.
+        """
+        if not predicates:
+            return products.copy()
+        
+        indexes = get_range_indexes()
+        mask = indexes.select(predicates)
+        allowed = set(indexes.ids_of(mask.nonzero()[0]))
+        
+        result = []
+        for product in products:
+            product_id = product.get('id')
+            if product_id in indexes:
+                if product_id in allowed:
+                    result.append(product)
+            elif all(
+                predicate.accepts(self._number(product.get('properties', {}).get(predicate.prop)))
+                for predicate in predicates
+            ):
+                result.append(product)
         return result
     
+    @staticmethod
+    def _number(value) -> Optional[float]:
+        """Valor numérico de una propiedad (primer elemento si es lista)."""
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else None
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    
     def sort_by_price(
         self,
         products: List[Dict],
@@ -182,37 +211,32 @@ class SPARQLFilters:
         Returns:
             Lista filtrada
         """
-        result = products.copy()
+        predicates = []
+        category = None
         
         for key, value in filters.items():
             if value is None:
                 continue
             
             if key == "min_price":
-                result = [
-                    p for p in result
-                    if p.get('properties', {}).get('tienePrecio', 0) >= value
-                ]
+                predicates.append(RangePredicate("tienePrecio", low=value, default=0))
             elif key == "max_price":
-                result = [
-                    p for p in result
-                    if p.get('properties', {}).get('tienePrecio', float('inf')) <= value
-                ]
+                predicates.append(RangePredicate("tienePrecio", high=value, default=float('inf')))
             elif key == "min_ram":
-                result = [
-                    p for p in result
-                    if p.get('properties', {}).get('tieneRAM_GB', 0) >= value
-                ]
+                predicates.append(RangePredicate("tieneRAM_GB", low=value, default=0))
             elif key == "category":
-                result = [
-                    p for p in result
-                    if value.lower() in p.get('type', '').lower()
-                ]
+                category = value
             elif key == "min_rating":
-                result = [
-                    p for p in result
-                    if p.get('properties', {}).get('tieneCalificacion', 0) >= value
-                ]
+                predicates.append(RangePredicate("tieneCalificacion", low=value, default=0))
+        
+        # Intersección de todos los rangos sobre los índices
+        result = self._filter_by_ranges(products, predicates)
+        
+        if category:
+            result = [
+                p for p in result
+                if category.lower() in p.get('type', '').lower()
+            ]
         
         # Aplicar ordenamiento si está especificado
         if "sort_by" in filters:
@@ -249,21 +273,32 @@ class SPARQLFilters:
         self,
         products: List[Dict],
         n: int = 10,
-        sort_by: str = "price"
+        sort_by: str = "price",
+        ascending: bool = True
     ) -> List[Dict]:
         """
         Obtiene los top N productos según un criterio.
         
+        Usa un heap de tamaño n en lugar de ordenar toda la lista; el
+        resultado es el mismo que sort_results(...)[:n].
+        
         Args:
             products: Lista de productos
             n: Número de productos a retornar
             sort_by: Criterio de ordenamiento
+            ascending: Orden ascendente o descendente
             
         Returns:
             Top N productos
         """
-        sorted_products = self.sort_results(products, sort_by=sort_by)
-        return sorted_products[:n]
+        prop, missing = SORT_FIELDS.get(sort_by, SORT_FIELDS["price"])
+        top = top_k(
+            products,
+            n,
+            key=lambda p: p.get('properties', {}).get(prop, missing),
+            reverse=not ascending
+        )
+        return [product for _, _, product in top]
     
     def filter_by_keyword(
         self,
@@ -273,6 +308,9 @@ class SPARQLFilters:
         """
         Filtra productos que contengan una palabra clave.
         
+        Usa el índice invertido (nombre, marca, procesador, categoría y
+        descripción), sin distinguir acentos y por prefijo.
+        
         Args:
             products: Lista de productos
             keyword: Palabra clave a buscar
@@ -280,24 +318,7 @@ class SPARQLFilters:
         Returns:
             Productos que contienen la palabra clave
         """
-        keyword_lower = keyword.lower()
+        from ontology.text_index import get_text_index
         
-        result = []
-        for product in products:
-            # Buscar en nombre
-            name = product.get('properties', {}).get('tieneNombre', '')
-            if keyword_lower in name.lower():
-                result.append(product)
-                continue
-            
-            # Buscar en tipo
-            if keyword_lower in product.get('type', '').lower():
-                result.append(product)
-                continue
-            
-            # Buscar en descripción si existe
-            desc = product.get('properties', {}).get('tieneDescripcion', '')
-            if keyword_lower in desc.lower():
-                result.append(product)
-        
-        return result
+        matches = get_text_index().matching_ids(keyword)
+        return [product for product in products if product.get('id') in matches]
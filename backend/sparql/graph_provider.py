@@ -0,0 +1,76 @@
+"""
+Proveedor del grafo RDF compartido - SmartCompareMarket
+
+Expone el quadstore de owlready2 (incluidas las inferencias de Pellet)
+como un grafo RDFlib mediante world.as_rdflib_graph(). El grafo es una
+vista sobre el mismo almacenamiento: no se vuelve a parsear el archivo OWL
+ni se duplican los triples en memoria. Todos los consumidores SPARQL
+comparten la misma instancia mientras no cambie la versión de la ontología.
+"""
+
+import threading
+from typing import Optional
+import logging
+
+from rdflib import Graph
+
+from ontology.loader import get_loader
+
+logger = logging.getLogger(__name__)
+
+
+class RDFGraphProvider:
+    """
+    Mantiene un único grafo RDFlib por World y versión de la ontología.
+
+    Cuando el loader activo cambia (razonamiento de fondo, recarga) o la
+    versión aumenta, el grafo se reemplaza en el siguiente acceso.
+    """
+
+    def __init__(self):
+        self._graph: Optional[Graph] = None
+        self._world = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        """Versión de la ontología del grafo vigente."""
+        return self._version
+
+    def get_graph(self) -> Graph:
+        """Obtiene el grafo de la ontología vigente (lo crea si cambió la versión)."""
+        loader = get_loader()
+        graph = self._graph
+        if graph is not None and self._world is loader.world and self._version == loader.version:
+            return graph
+
+        with self._lock:
+            if self._graph is None or self._world is not loader.world or self._version != loader.version:
+                try:
+                    self._graph = loader.world.as_rdflib_graph()
+                except Exception as e:
+                    logger.error(f"Error creando grafo RDF: {e}")
+                    # Fallback: grafo vacío para que las consultas no fallen
+                    self._graph = Graph()
+                self._world = loader.world
+                self._version = loader.version
+                logger.info(f"Grafo RDF compartido listo (v{loader.version})")
+            return self._graph
+
+
+# Singleton global
+_graph_provider = None
+
+
+def get_graph_provider() -> RDFGraphProvider:
+    """Obtiene la instancia singleton del proveedor de grafo"""
+    global _graph_provider
+    if _graph_provider is None:
+        _graph_provider = RDFGraphProvider()
+    return _graph_provider
+
+
+def get_rdf_graph() -> Graph:
+    """Grafo RDFlib compartido de la ontología vigente"""
+    return get_graph_provider().get_graph()
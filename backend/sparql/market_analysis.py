@@ -10,14 +10,19 @@ from typing import List, Dict, Optional, Any
 import logging
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.plugins.sparql import prepareQuery
-from collections import defaultdict
-import statistics
+import numpy as np
 
+from ontology.columns import MARKET_CATEGORIES, get_spec_matrix, value_counts
 from ontology.loader import get_ontology
-from utils.owl_helpers import individual_to_dict
+from sparql.graph_provider import get_rdf_graph
+from utils.topk import cursor_position, decode_cursor, encode_cursor, top_k_rows
 
 logger = logging.getLogger(__name__)
 
+# Rangos de precio y sus límites inferiores (excepto el primero)
+PRICE_RANGES = ("0-500", "500-1000", "1000-1500", "1500-2000", "2000+")
+PRICE_RANGE_BOUNDS = (500, 1000, 1500, 2000)
+
 
 class MarketAnalysis:
     """
@@ -32,29 +37,18 @@ class MarketAnalysis:
     
     def __init__(self):
         """Inicializa el servicio de análisis de mercado."""
-        self.onto = get_ontology()
-        self.graph = None
         self.ns = Namespace("http://smartcompare.com/ontologia#")
-        self._init_graph()
         logger.info("MarketAnalysis inicializado correctamente")
     
-    def _init_graph(self):
-        """Convierte la ontología a un grafo RDFlib para consultas SPARQL."""
-        try:
-            from rdflib import RDF, RDFS, OWL
-            
-            self.graph = Graph()
-            
-            # Cargar ontología en RDFlib
-            owl_file = self.onto.world.filename
-            if owl_file:
-                self.graph.parse(owl_file, format="xml")
-                logger.info(f"Grafo RDF cargado: {len(self.graph)} triples")
-            else:
-                logger.warning("No se pudo cargar archivo OWL en RDFlib")
-        except Exception as e:
-            logger.error(f"Error al inicializar grafo RDF: {e}")
-            self.graph = None
+    @property
+    def onto(self):
+        """Ontología del loader activo."""
+        return get_ontology()
+    
+    @property
+    def graph(self) -> Graph:
+        """Grafo RDF compartido con SPARQLQueries (incluye inferencias de Pellet)."""
+        return get_rdf_graph()
     
     def get_price_statistics(self) -> Dict:
         """
@@ -70,39 +64,27 @@ class MarketAnalysis:
             - price_ranges: Distribución por rangos
         """
         try:
-            # Obtener todos los productos con precios
-            products = list(self.onto.Producto.instances())
-            prices = []
-            
-            for product in products:
-                product_dict = individual_to_dict(product)
-                props = product_dict.get("properties", {})
-                price = props.get("tienePrecio", 0)
-                if price > 0:
-                    prices.append(float(price))
-            
-            if not prices:
+            # Columna de precios de la versión vigente
+            prices = get_spec_matrix().positive("price")
+            
+            if prices.size == 0:
                 return {
                     "error": "No hay productos con precios en el sistema",
                     "count": 0
                 }
             
-            # Calcular estadísticas
-            avg_price = statistics.mean(prices)
-            median_price = statistics.median(prices)
-            min_price = min(prices)
-            max_price = max(prices)
-            std_dev = statistics.stdev(prices) if len(prices) > 1 else 0
+            # Calcular estadísticas (desviación estándar muestral)
+            std_dev = float(prices.std(ddof=1)) if prices.size > 1 else 0
             
             # Distribución por rangos
             price_ranges = self._calculate_price_distribution(prices)
             
             return {
-                "total_products": len(prices),
-                "average": round(avg_price, 2),
-                "median": round(median_price, 2),
-                "min": round(min_price, 2),
-                "max": round(max_price, 2),
+                "total_products": int(prices.size),
+                "average": round(float(prices.mean()), 2),
+                "median": round(float(np.median(prices)), 2),
+                "min": round(float(prices.min()), 2),
+                "max": round(float(prices.max()), 2),
                 "std_deviation": round(std_dev, 2),
                 "price_ranges": price_ranges,
                 "currency": "USD"
@@ -112,36 +94,18 @@ class MarketAnalysis:
             logger.error(f"Error al calcular estadísticas de precios: {e}")
             return {"error": str(e)}
     
-    def _calculate_price_distribution(self, prices: List[float]) -> Dict:
+    def _calculate_price_distribution(self, prices: np.ndarray) -> Dict:
         """Calcula la distribución de precios en rangos."""
-        ranges = {
-            "0-500": 0,
-            "500-1000": 0,
-            "1000-1500": 0,
-            "1500-2000": 0,
-            "2000+": 0
-        }
-        
-        for price in prices:
-            if price < 500:
-                ranges["0-500"] += 1
-            elif price < 1000:
-                ranges["500-1000"] += 1
-            elif price < 1500:
-                ranges["1000-1500"] += 1
-            elif price < 2000:
-                ranges["1500-2000"] += 1
-            else:
-                ranges["2000+"] += 1
+        counts = np.bincount(np.digitize(prices, PRICE_RANGE_BOUNDS), minlength=len(PRICE_RANGES))
         
         # Convertir a porcentajes
         total = len(prices)
         return {
             range_name: {
-                "count": count,
-                "percentage": round(count / total * 100, 2)
+                "count": int(count),
+                "percentage": round(int(count) / total * 100, 2)
             }
-            for range_name, count in ranges.items()
+            for range_name, count in zip(PRICE_RANGES, counts)
         }
     
     def get_category_distribution(self) -> Dict:
@@ -152,46 +116,45 @@ class MarketAnalysis:
             Diccionario con conteo y porcentaje por categoría
         """
         try:
-            products = list(self.onto.Producto.instances())
-            category_counts = defaultdict(int)
-            category_prices = defaultdict(list)
-            
-            for product in products:
-                product_dict = individual_to_dict(product)
-                types = product_dict.get("types", [])
-                props = product_dict.get("properties", {})
-                price = props.get("tienePrecio", 0)
-                
-                # Determinar categoría principal
-                category = None
-                for t in types:
-                    if t in ["Laptop", "Smartphone", "Tablet", "Desktop", "Muebles", "Ropa", "Calzado"]:
-                        category = t
-                        break
-                
-                if category:
-                    category_counts[category] += 1
-                    if price > 0:
-                        category_prices[category].append(float(price))
-            
-            total = sum(category_counts.values())
+            matrix = get_spec_matrix()
+            codes = matrix.category_codes
+            prices = matrix.column("price")
+            size = len(MARKET_CATEGORIES)
+            
+            # Group-by por código de categoría
+            categorized = codes >= 0
+            priced = categorized & (prices > 0)
+            counts = np.bincount(codes[categorized], minlength=size)
+            price_counts = np.bincount(codes[priced], minlength=size)
+            price_sums = np.bincount(codes[priced], weights=prices[priced], minlength=size)
+            price_min = np.full(size, np.inf)
+            price_max = np.full(size, -np.inf)
+            np.minimum.at(price_min, codes[priced], prices[priced])
+            np.maximum.at(price_max, codes[priced], prices[priced])
+            
+            total = int(counts.sum())
+            
+            # Categorías en orden de primera aparición
+            seen, first_index = np.unique(codes[categorized], return_index=True)
+            order = seen[np.argsort(first_index)]
             
             # Construir respuesta con estadísticas por categoría
             categories = {}
-            for cat, count in category_counts.items():
-                cat_prices = category_prices[cat]
-                categories[cat] = {
+            for code in order:
+                count = int(counts[code])
+                has_prices = price_counts[code] > 0
+                categories[MARKET_CATEGORIES[code]] = {
                     "count": count,
                     "percentage": round(count / total * 100, 2) if total > 0 else 0,
-                    "avg_price": round(statistics.mean(cat_prices), 2) if cat_prices else 0,
-                    "min_price": round(min(cat_prices), 2) if cat_prices else 0,
-                    "max_price": round(max(cat_prices), 2) if cat_prices else 0
+                    "avg_price": round(float(price_sums[code] / price_counts[code]), 2) if has_prices else 0,
+                    "min_price": round(float(price_min[code]), 2) if has_prices else 0,
+                    "max_price": round(float(price_max[code]), 2) if has_prices else 0
                 }
             
             return {
                 "total_products": total,
                 "categories": categories,
-                "unique_categories": len(category_counts)
+                "unique_categories": len(categories)
             }
             
         except Exception as e:
@@ -209,84 +172,45 @@ class MarketAnalysis:
             Estadísticas de especificaciones técnicas
         """
         try:
-            products = list(self.onto.Producto.instances())
-            
-            ram_values = []
-            storage_values = []
-            screen_sizes = []
-            battery_capacities = []
-            
-            for product in products:
-                product_dict = individual_to_dict(product)
-                types = product_dict.get("types", [])
-                props = product_dict.get("properties", {})
-                
-                # Filtrar por categoría si se especifica
-                if category:
-                    if category not in types:
-                        continue
-                
-                # Recopilar especificaciones
-                ram = props.get("tieneRAM_GB", 0)
-                if ram > 0:
-                    ram_values.append(int(ram))
-                
-                storage = props.get("tieneAlmacenamiento_GB", 0)
-                if storage > 0:
-                    storage_values.append(int(storage))
-                
-                screen = props.get("tienePulgadas", 0)
-                if screen > 0:
-                    screen_sizes.append(float(screen))
-                
-                battery = props.get("bateriaCapacidad_mAh", 0)
-                if battery > 0:
-                    battery_capacities.append(int(battery))
+            matrix = get_spec_matrix()
+            
+            # Filtrar por categoría si se especifica
+            mask = matrix.class_mask(category) if category else None
+            
+            # Recopilar especificaciones
+            ram_values = matrix.positive("ram", mask).astype(np.int64)
+            storage_values = matrix.positive("storage", mask).astype(np.int64)
+            screen_sizes = matrix.positive("screen", mask)
+            battery_capacities = matrix.positive("battery", mask).astype(np.int64)
             
             result = {
                 "category": category or "all",
-                "total_analyzed": len(products) if not category else len(ram_values)
+                "total_analyzed": matrix.size if not category else int(ram_values.size)
             }
             
             # Estadísticas de RAM
-            if ram_values:
+            if ram_values.size:
                 result["ram_gb"] = {
-                    "average": round(statistics.mean(ram_values), 2),
-                    "median": statistics.median(ram_values),
-                    "min": min(ram_values),
-                    "max": max(ram_values),
-                    "most_common": max(set(ram_values), key=ram_values.count),
+                    **self._summarize(ram_values),
+                    "most_common": self._mode(ram_values),
                     "distribution": self._get_value_distribution(ram_values)
                 }
             
             # Estadísticas de almacenamiento
-            if storage_values:
+            if storage_values.size:
                 result["storage_gb"] = {
-                    "average": round(statistics.mean(storage_values), 2),
-                    "median": statistics.median(storage_values),
-                    "min": min(storage_values),
-                    "max": max(storage_values),
-                    "most_common": max(set(storage_values), key=storage_values.count),
+                    **self._summarize(storage_values),
+                    "most_common": self._mode(storage_values),
                     "distribution": self._get_value_distribution(storage_values)
                 }
             
             # Estadísticas de pantalla
-            if screen_sizes:
-                result["screen_inches"] = {
-                    "average": round(statistics.mean(screen_sizes), 2),
-                    "median": round(statistics.median(screen_sizes), 2),
-                    "min": round(min(screen_sizes), 2),
-                    "max": round(max(screen_sizes), 2)
-                }
+            if screen_sizes.size:
+                result["screen_inches"] = self._summarize(screen_sizes, precision=2)
             
             # Estadísticas de batería
-            if battery_capacities:
-                result["battery_mAh"] = {
-                    "average": round(statistics.mean(battery_capacities), 2),
-                    "median": statistics.median(battery_capacities),
-                    "min": min(battery_capacities),
-                    "max": max(battery_capacities)
-                }
+            if battery_capacities.size:
+                result["battery_mAh"] = self._summarize(battery_capacities)
             
             return result
             
@@ -294,21 +218,55 @@ class MarketAnalysis:
             logger.error(f"Error en análisis de especificaciones: {e}")
             return {"error": str(e)}
     
-    def _get_value_distribution(self, values: List[int]) -> Dict:
+    @staticmethod
+    def _summarize(values: np.ndarray, precision: Optional[int] = None) -> Dict:
+        """
+        Promedio, mediana, mínimo y máximo de una columna.
+        
+        Para columnas enteras conserva los tipos de statistics: el promedio es
+        entero si es exacto y la mediana es entera con cantidad impar de valores.
+        """
+        integer = np.issubdtype(values.dtype, np.integer)
+        average = float(values.mean())
+        median = float(np.median(values))
+        if integer:
+            total = int(values.sum())
+            average = total // values.size if total % values.size == 0 else average
+            median = int(median) if values.size % 2 else median
+            low, high = int(values.min()), int(values.max())
+        else:
+            low, high = float(values.min()), float(values.max())
+        if precision is not None:
+            median, low, high = round(median, precision), round(low, precision), round(high, precision)
+        return {
+            "average": round(average, 2),
+            "median": median,
+            "min": low,
+            "max": high
+        }
+    
+    @staticmethod
+    def _mode(values: np.ndarray) -> int:
+        """Valor más frecuente (conteos vectorizados en lugar de list.count)."""
+        uniques, counts = np.unique(values, return_counts=True)
+        frequency = dict(zip(uniques.tolist(), counts.tolist()))
+        # Mismo desempate que max(set(valores), key=valores.count)
+        return max(set(values.tolist()), key=frequency.__getitem__)
+    
+    def _get_value_distribution(self, values: np.ndarray) -> Dict:
         """Obtiene la distribución de valores únicos."""
-        from collections import Counter
-        counter = Counter(values)
+        uniques, counts = value_counts(values)
         total = len(values)
         
         return {
             str(value): {
-                "count": count,
-                "percentage": round(count / total * 100, 2)
+                "count": int(count),
+                "percentage": round(int(count) / total * 100, 2)
             }
-            for value, count in counter.most_common(10)  # Top 10
+            for value, count in zip(uniques[:10].tolist(), counts[:10])  # Top 10
         }
     
-    def get_best_value_products(self, limit: int = 10) -> Dict:
+    def get_best_value_products(self, limit: int = 10, cursor: Optional[str] = None) -> Dict:
         """
         Identifica productos con mejor relación calidad-precio.
         
@@ -316,67 +274,67 @@ class MarketAnalysis:
         - Score = (RAM + Storage/10 + Screen*10 + Rating*10) / Price
         - Mayor score = mejor valor
         
+        Solo se ordenan los `limit` mejores (argpartition), no toda la lista.
+        
         Args:
             limit: Número máximo de productos a retornar
+            cursor: Cursor de la página anterior (next_cursor) para continuar
             
         Returns:
-            Lista de productos con mejor valor
+            Lista de productos con mejor valor y next_cursor si hay más
+            
+        Raises:
+            ValueError: Si el cursor no es válido
         """
+        if cursor:
+            decode_cursor(cursor)
+        
         try:
-            products = list(self.onto.Producto.instances())
-            best_values = []
+            matrix = get_spec_matrix()
+            price = matrix.column("price")
+            rows = np.flatnonzero(price > 0)
+            
+            def spec(name):
+                return np.nan_to_num(matrix.column(name)[rows], nan=0.0)
+            
+            # Fórmula de valor sobre todas las filas a la vez
+            value_scores = (
+                spec("ram") + spec("storage") / 10 + spec("screen") * 10 + spec("rating") * 10
+            ) / price[rows]
+            rounded = np.round(value_scores, 4)
             
-            for product in products:
-                product_dict = individual_to_dict(product)
-                props = product_dict.get("properties", {})
-                
-                price = props.get("tienePrecio", 0)
-                if price <= 0:
-                    continue
-                
-                # Calcular score de valor
-                ram = props.get("tieneRAM_GB", 0)
-                storage = props.get("tieneAlmacenamiento_GB", 0)
-                screen = props.get("tienePulgadas", 0)
-                rating = props.get("tieneCalificacion", 0)
-                
-                # Fórmula de valor
-                value_score = (ram + storage/10 + screen*10 + rating*10) / price
-                
-                # Obtener nombre y categoría
-                name = props.get("tieneNombre", product.name)
-                if not isinstance(name, str):
-                    name = product.name
-                
-                types = product_dict.get("types", [])
-                category = None
-                for t in types:
-                    if t in ["Laptop", "Smartphone", "Tablet", "Desktop"]:
-                        category = t
-                        break
-                
+            # Top-K por value_score descendente (estable ante empates)
+            after = cursor_position(cursor, [matrix.ids[row] for row in rows])
+            order = top_k_rows(rounded, limit + 1, after)
+            has_more = len(order) > limit
+            order = order[:limit]
+            
+            best_values = []
+            for position in order:
+                product = matrix.records[rows[position]]
+                props = product.properties
                 best_values.append({
-                    "id": product.name,
-                    "name": name,
-                    "category": category or "Desconocida",
-                    "price": float(price),
-                    "value_score": round(value_score, 4),
+                    "id": product.id,
+                    "name": product.name,
+                    "category": product.category or "Desconocida",
+                    "price": float(price[rows[position]]),
+                    "value_score": round(float(value_scores[position]), 4),
                     "specs": {
-                        "ram_gb": ram,
-                        "storage_gb": storage,
-                        "screen_inches": screen,
-                        "rating": rating
+                        "ram_gb": props.get("tieneRAM_GB", 0),
+                        "storage_gb": props.get("tieneAlmacenamiento_GB", 0),
+                        "screen_inches": props.get("tienePulgadas", 0),
+                        "rating": props.get("tieneCalificacion", 0)
                     }
                 })
             
-            # Ordenar por value_score descendente
-            best_values.sort(key=lambda x: x["value_score"], reverse=True)
-            
-            return {
-                "total_analyzed": len(best_values),
-                "best_value_products": best_values[:limit],
+            result = {
+                "total_analyzed": int(rows.size),
+                "best_value_products": best_values,
                 "algorithm": "value_score = (RAM + Storage/10 + Screen*10 + Rating*10) / Price"
             }
+            if has_more and best_values:
+                result["next_cursor"] = encode_cursor(float(rounded[order[-1]]), best_values[-1]["id"])
+            return result
             
         except Exception as e:
             logger.error(f"Error al calcular mejor valor: {e}")
@@ -393,67 +351,44 @@ class MarketAnalysis:
             - Gaps en el mercado
         """
         try:
-            products = list(self.onto.Producto.instances())
+            matrix = get_spec_matrix()
+            price = matrix.column("price")
             
             # Clasificar productos por precio
-            premium = []  # > $1500
-            mid_range = []  # $800-$1500
-            budget = []  # < $800
-            
-            for product in products:
-                product_dict = individual_to_dict(product)
-                props = product_dict.get("properties", {})
-                price = props.get("tienePrecio", 0)
-                
-                if price > 1500:
-                    premium.append(product_dict)
-                elif price >= 800:
-                    mid_range.append(product_dict)
-                elif price > 0:
-                    budget.append(product_dict)
-            
-            total = len(premium) + len(mid_range) + len(budget)
-            
-            # Especificaciones más comunes
-            ram_common = defaultdict(int)
-            storage_common = defaultdict(int)
-            
-            for product in products:
-                product_dict = individual_to_dict(product)
-                props = product_dict.get("properties", {})
-                
-                ram = props.get("tieneRAM_GB", 0)
-                if ram > 0:
-                    ram_common[ram] += 1
-                
-                storage = props.get("tieneAlmacenamiento_GB", 0)
-                if storage > 0:
-                    storage_common[storage] += 1
+            premium = int(np.count_nonzero(price > 1500))  # > $1500
+            mid_range = int(np.count_nonzero((price >= 800) & (price <= 1500)))  # $800-$1500
+            budget = int(np.count_nonzero((price > 0) & (price < 800)))  # < $800
+            
+            total = premium + mid_range + budget
+            
+            # Especificaciones más comunes (ya ordenadas por frecuencia)
+            ram_common = self._value_count_dict(matrix.positive("ram"))
+            storage_common = self._value_count_dict(matrix.positive("storage"))
             
             return {
                 "price_segments": {
                     "premium": {
-                        "count": len(premium),
-                        "percentage": round(len(premium) / total * 100, 2) if total > 0 else 0,
+                        "count": premium,
+                        "percentage": round(premium / total * 100, 2) if total > 0 else 0,
                         "price_range": "> $1500"
                     },
                     "mid_range": {
-                        "count": len(mid_range),
-                        "percentage": round(len(mid_range) / total * 100, 2) if total > 0 else 0,
+                        "count": mid_range,
+                        "percentage": round(mid_range / total * 100, 2) if total > 0 else 0,
                         "price_range": "$800-$1500"
                     },
                     "budget": {
-                        "count": len(budget),
-                        "percentage": round(len(budget) / total * 100, 2) if total > 0 else 0,
+                        "count": budget,
+                        "percentage": round(budget / total * 100, 2) if total > 0 else 0,
                         "price_range": "< $800"
                     }
                 },
                 "most_common_specs": {
-                    "ram_gb": sorted(ram_common.items(), key=lambda x: x[1], reverse=True)[:5],
-                    "storage_gb": sorted(storage_common.items(), key=lambda x: x[1], reverse=True)[:5]
+                    "ram_gb": list(ram_common.items())[:5],
+                    "storage_gb": list(storage_common.items())[:5]
                 },
                 "market_insights": self._generate_market_insights(
-                    len(premium), len(mid_range), len(budget), 
+                    premium, mid_range, budget, 
                     ram_common, storage_common
                 )
             }
@@ -462,6 +397,15 @@ class MarketAnalysis:
             logger.error(f"Error en análisis de tendencias: {e}")
             return {"error": str(e)}
     
+    @staticmethod
+    def _value_count_dict(values: np.ndarray) -> Dict:
+        """Valor -> conteo, ordenado por frecuencia descendente."""
+        uniques, counts = value_counts(values)
+        return {
+            int(value) if value.is_integer() else value: int(count)
+            for value, count in zip(uniques.tolist(), counts)
+        }
+    
     def _generate_market_insights(
         self, 
         premium_count: int, 
@@ -0,0 +1,238 @@
+"""
+Planificador de búsquedas combinadas - SmartCompareMarket
+
+Convierte los filtros de /search (categoría, texto y rangos numéricos) en
+etapas, estima la selectividad de cada una con los índices (cardinalidad
+de la clase, conteo por búsqueda binaria en el índice de rango y
+frecuencia de documento de los términos) y las ejecuta de la más a la
+menos selectiva. La primera etapa usa su índice; las siguientes solo
+evalúan los candidatos que quedan. Si el conjunto queda vacío, se corta.
+
+Con explain=True devuelve el plan elegido y el tiempo de cada etapa.
+"""
+
+from abc import ABC, abstractmethod
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from ontology.loader import get_snapshot
+from ontology.range_index import RangeIndexes, RangePredicate, get_range_indexes
+from ontology.text_index import TextIndex, get_text_index
+
+logger = logging.getLogger(__name__)
+
+
+class PlanStage(ABC):
+    """Etapa del plan: estima su cardinalidad y filtra filas candidatas."""
+
+    kind = "stage"
+
+    def __init__(self, indexes: RangeIndexes):
+        self.indexes = indexes
+        self.estimate = 0
+
+    @property
+    def label(self) -> str:
+        return self.kind
+
+    @abstractmethod
+    def apply(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Filas que cumplen la etapa (rows=None: todo el catálogo)."""
+
+
+class CategoryStage(PlanStage):
+    kind = "category"
+
+    def __init__(self, indexes: RangeIndexes, category: str, snapshot):
+        super().__init__(indexes)
+        self.category = category
+        self.snapshot = snapshot
+        self.estimate = snapshot.count_of(category)
+
+    @property
+    def label(self) -> str:
+        return f"category:{self.category}"
+
+    def category_rows(self) -> np.ndarray:
+        """Filas de la categoría en el orden de instances_of."""
+        return self.indexes.rows_of(record.id for record in self.snapshot.instances_of(self.category))
+
+    def apply(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        category_rows = self.category_rows()
+        if rows is None:
+            return np.sort(category_rows)
+        mask = np.zeros(self.indexes.size, dtype=bool)
+        mask[category_rows] = True
+        return rows[mask[rows]]
+
+
+class RangeStage(PlanStage):
+    kind = "range"
+
+    def __init__(self, indexes: RangeIndexes, predicate: RangePredicate):
+        super().__init__(indexes)
+        self.predicate = predicate
+        self.estimate = indexes.count(predicate)
+
+    @property
+    def label(self) -> str:
+        low = "-inf" if self.predicate.low is None else self.predicate.low
+        high = "inf" if self.predicate.high is None else self.predicate.high
+        return f"range:{self.predicate.prop}[{low}, {high}]"
+
+    def apply(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        if rows is None:
+            return self.indexes.rows_in(self.predicate)
+        return self.indexes.filter_rows(rows, self.predicate)
+
+
+class TextStage(PlanStage):
+    kind = "text"
+
+    def __init__(self, indexes: RangeIndexes, query: str, text_index: TextIndex):
+        super().__init__(indexes)
+        self.query = query
+        self.text_index = text_index
+        self.estimate = text_index.estimate(query)
+        # Puntajes BM25 de los documentos que quedaron (para ordenar)
+        self.scores: Dict[str, float] = {}
+
+    @property
+    def label(self) -> str:
+        return f"text:{self.query!r}"
+
+    def apply(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        candidates = None if rows is None else self.indexes.ids_of(rows)
+        ranked = self.text_index.search(self.query, candidates=candidates)
+        self.scores = dict(ranked)
+        return np.sort(self.indexes.rows_of(doc_id for doc_id, _ in ranked))
+
+
+class SearchPlanner:
+    """
+    Planificador basado en costos para búsquedas con varios filtros.
+
+    Uso:
+        ids, plan = SearchPlanner().execute(text_query="dell", min_price=500, explain=True)
+    """
+
+    def plan(
+        self,
+        text_query: Optional[str] = None,
+        category: Optional[str] = None,
+        predicates: Tuple[RangePredicate, ...] = ()
+    ) -> List[PlanStage]:
+        """Etapas ordenadas de la más selectiva a la menos selectiva."""
+        snapshot = get_snapshot()
+        indexes = get_range_indexes(snapshot)
+
+        stages: List[PlanStage] = []
+        if category:
+            stages.append(CategoryStage(indexes, category, snapshot))
+        if text_query:
+            stages.append(TextStage(indexes, text_query, get_text_index(snapshot)))
+        stages.extend(RangeStage(indexes, predicate) for predicate in predicates)
+
+        # A igual estimación: rangos (más baratos) antes que texto y categoría
+        cost_rank = {"range": 0, "category": 1, "text": 2}
+        return sorted(stages, key=lambda stage: (stage.estimate, cost_rank[stage.kind]))
+
+    def execute(
+        self,
+        text_query: Optional[str] = None,
+        category: Optional[str] = None,
+        predicates: Tuple[RangePredicate, ...] = (),
+        sort_by: Optional[str] = None,
+        ascending: bool = True,
+        explain: bool = False
+    ) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        """
+        Ejecuta la búsqueda.
+
+        El orden del resultado es el mismo que sin planificador: sort_by si
+        se indica (estable sobre la relevancia), si no relevancia BM25 con
+        texto, orden de la categoría o, por último, orden del catálogo.
+
+        Returns:
+            (IDs de productos ordenados, plan con tiempos si explain=True)
+        """
+        started = time.perf_counter()
+        stages = self.plan(text_query, category, tuple(predicates))
+        indexes = stages[0].indexes if stages else get_range_indexes()
+
+        executed = []
+        rows: Optional[np.ndarray] = None
+        for stage in stages:
+            stage_started = time.perf_counter()
+            input_size = indexes.size if rows is None else len(rows)
+            rows = stage.apply(rows)
+            executed.append({
+                "stage": stage.label,
+                "estimate": int(stage.estimate),
+                "input": int(input_size),
+                "output": int(len(rows)),
+                "ms": round((time.perf_counter() - stage_started) * 1000, 3)
+            })
+            if len(rows) == 0:
+                break
+
+        skipped = [stage.label for stage in stages[len(executed):]]
+        order_started = time.perf_counter()
+        rows = self._order(rows, stages, indexes, sort_by, ascending)
+        product_ids = indexes.ids_of(rows)
+
+        plan = None
+        if explain:
+            plan = {
+                "stages": executed,
+                "short_circuited": skipped,
+                "order": sort_by or self._default_order(stages),
+                "order_ms": round((time.perf_counter() - order_started) * 1000, 3),
+                "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                "ontology_version": indexes.version
+            }
+        return product_ids, plan
+
+    @staticmethod
+    def _default_order(stages: List[PlanStage]) -> str:
+        kinds = {stage.kind for stage in stages}
+        if "text" in kinds:
+            return "relevance"
+        if "category" in kinds:
+            return "category"
+        return "catalog"
+
+    def _order(
+        self,
+        rows: Optional[np.ndarray],
+        stages: List[PlanStage],
+        indexes: RangeIndexes,
+        sort_by: Optional[str],
+        ascending: bool
+    ) -> np.ndarray:
+        if rows is None:
+            rows = np.arange(indexes.size)
+        if len(rows) == 0:
+            return rows
+
+        text = next((stage for stage in stages if isinstance(stage, TextStage)), None)
+        category = next((stage for stage in stages if isinstance(stage, CategoryStage)), None)
+
+        if text is not None:
+            # Relevancia descendente (empates por ID, igual que TextIndex.search)
+            ids = indexes.ids_of(rows)
+            order = sorted(range(len(rows)), key=lambda i: (-text.scores.get(ids[i], 0.0), ids[i]))
+            rows = rows[order]
+            return indexes.sort_rows(rows, sort_by, ascending) if sort_by else rows
+
+        mask = np.zeros(indexes.size, dtype=bool)
+        mask[rows] = True
+        if sort_by:
+            return indexes.ordered(mask, sort_by, ascending)
+        if category is not None:
+            category_rows = category.category_rows()
+            return category_rows[mask[category_rows]]
+        return rows
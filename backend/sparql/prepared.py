@@ -0,0 +1,141 @@
+"""
+Registro de consultas SPARQL preparadas - SmartCompareMarket
+
+Cada consulta con nombre se parsea y se convierte a álgebra una sola vez
+con prepareQuery. Los parámetros se pasan con initBindings como literales
+tipados, nunca interpolados en el texto. El registro acumula, por consulta,
+la cantidad de ejecuciones, errores y la latencia.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+import logging
+
+from rdflib import Graph, Literal, Namespace, Variable
+from rdflib.namespace import RDF, RDFS, OWL, XSD
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.term import Node
+
+logger = logging.getLogger(__name__)
+
+NS = Namespace("http://smartcompare.com/ontologia#")
+
+# Prefijos disponibles en todas las consultas registradas
+DEFAULT_NAMESPACES = {"ns": NS, "rdf": RDF, "rdfs": RDFS, "owl": OWL, "xsd": XSD}
+
+
+class QueryStats:
+    """Métricas acumuladas de una consulta preparada."""
+
+    def __init__(self):
+        self.executions = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms: Optional[float] = None
+
+    def record(self, elapsed_ms: float, failed: bool = False):
+        self.executions += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.executions, 3) if self.executions else None,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3) if self.last_ms is not None else None
+        }
+
+
+class PreparedQueryRegistry:
+    """
+    Consultas SPARQL con nombre, preparadas una vez y ejecutadas con parámetros.
+
+    Uso:
+        registry.register("by_ram", "SELECT ?product WHERE { ... FILTER (?ram >= ?min_ram) }")
+        registry.execute("by_ram", graph, min_ram=16)
+    """
+
+    def __init__(self):
+        self._queries: Dict[str, Any] = {}
+        self._texts: Dict[str, str] = {}
+        self._stats: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, text: str, namespaces: Optional[Dict] = None):
+        """
+        Parsea y registra una consulta.
+
+        Raises:
+            ValueError: Si ya existe otra consulta con el mismo nombre
+        """
+        with self._lock:
+            if name in self._texts:
+                if self._texts[name] != text:
+                    raise ValueError(f"Consulta SPARQL '{name}' ya registrada con otro texto")
+                return
+            self._queries[name] = prepareQuery(text, initNs=namespaces or DEFAULT_NAMESPACES)
+            self._texts[name] = text
+            self._stats[name] = QueryStats()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._queries
+
+    def execute(self, name: str, graph: Graph, **params):
+        """
+        Ejecuta una consulta registrada sobre el grafo.
+
+        Args:
+            name: Nombre de la consulta
+            graph: Grafo RDFlib
+            **params: Variables SPARQL a enlazar; los valores None se omiten
+                (la variable queda sin enlazar)
+
+        Returns:
+            Filas del resultado (lista)
+
+        Raises:
+            KeyError: Si la consulta no está registrada
+        """
+        query = self._queries.get(name)
+        if query is None:
+            raise KeyError(f"Consulta SPARQL no registrada: {name}")
+
+        bindings = {
+            Variable(key): value if isinstance(value, Node) else Literal(value)
+            for key, value in params.items() if value is not None
+        }
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            rows = list(graph.query(query, initBindings=bindings))
+            failed = False
+            return rows
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats[name].record(elapsed_ms, failed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por consulta (ejecuciones, errores y latencia en ms)."""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+
+# Singleton global
+_query_registry = None
+
+
+def get_query_registry() -> PreparedQueryRegistry:
+    """Obtiene la instancia singleton del registro de consultas"""
+    global _query_registry
+    if _query_registry is None:
+        _query_registry = PreparedQueryRegistry()
+    return _query_registry
@@ -4,14 +4,36 @@ Consultas semánticas básicas usando RDFlib
 """
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.plugins.sparql import prepareQuery
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from ontology.loader import get_ontology
-from utils.owl_helpers import individual_to_dict
+from ontology.loader import get_ontology, get_snapshot
+from ontology.range_index import RangePredicate
+from sparql.graph_provider import get_rdf_graph
+from sparql.prepared import get_query_registry
+
+
+# Consultas preparadas: los límites no enlazados (None) no filtran
+PRODUCTS_BY_PRICE = """
+SELECT ?product ?price WHERE {
+    ?product ns:tienePrecio ?price .
+    FILTER ((!BOUND(?min_price) || ?price >= ?min_price) &&
+            (!BOUND(?max_price) || ?price <= ?max_price))
+}
+"""
+
+PRODUCTS_BY_RAM = """
+SELECT ?product ?ram WHERE {
+    ?product ns:tieneRAM_GB ?ram .
+    FILTER (?ram >= ?min_ram)
+}
+"""
+
+get_query_registry().register("products_by_price", PRODUCTS_BY_PRICE)
+get_query_registry().register("products_by_ram", PRODUCTS_BY_RAM)
 
 
 class SPARQLQueries:
@@ -20,21 +42,17 @@ class SPARQLQueries:
     """
     
     def __init__(self):
-        self.onto = get_ontology()
-        self.graph = None
         self.ns = Namespace("http://smartcompare.com/ontologia#")
-        self._init_graph()
     
-    def _init_graph(self):
-        """Convierte la ontología OWL a un grafo RDF lib."""
-        try:
-            # Convertir ontología a RDFlib Graph
-            self.graph = self.onto.world.as_rdflib_graph()
-            print(f"[OK] Ontologia cargada en RDFlib: {len(self.graph)} triples")
-        except Exception as e:
-            print(f"[WARNING] Error cargando grafo RDF: {e}")
-            # Fallback: crear grafo vacío
-            self.graph = Graph()
+    @property
+    def onto(self):
+        """Ontología del loader activo."""
+        return get_ontology()
+    
+    @property
+    def graph(self) -> Graph:
+        """Grafo RDF compartido (quadstore razonado, sin copia de triples)."""
+        return get_rdf_graph()
     
     def query_products_by_price(
         self,
@@ -55,27 +73,12 @@ class SPARQLQueries:
         if min_price is None and max_price is None:
             return self._get_all_products_from_onto()
         
-        # Construir query SPARQL
-        query_parts = [
-            "PREFIX ns: <http://smartcompare.com/ontologia#>",
-            "PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>",
-            "SELECT ?product ?price WHERE {",
-            "  ?product ns:tienePrecio ?price .",
-        ]
-        
-        # Agregar filtros
-        if min_price is not None:
-            query_parts.append(f"  FILTER (?price >= {min_price})")
-        if max_price is not None:
-            query_parts.append(f"  FILTER (?price <= {max_price})")
-        
-        query_parts.append("}")
-        
-        sparql_query = "\n".join(query_parts)
-        
-        # Ejecutar query
+        # Ejecutar query preparada con los límites como literales enlazados
         try:
-            results = self.graph.query(sparql_query)
+            results = get_query_registry().execute(
+                "products_by_price", self.graph,
+                min_price=self._number(min_price), max_price=self._number(max_price)
+            )
             return self._process_sparql_results(results)
         except Exception as e:
             print(f"Error en consulta SPARQL: {e}")
@@ -92,17 +95,10 @@ class SPARQLQueries:
         Returns:
             Lista de productos con RAM >= min_ram
         """
-        sparql_query = f"""
-        PREFIX ns: <http://smartcompare.com/ontologia#>
-        
-        SELECT ?product ?ram WHERE {{
-            ?product ns:tieneRAM_GB ?ram .
-            FILTER (?ram >= {min_ram})
-        }}
-        """
-        
         try:
-            results = self.graph.query(sparql_query)
+            results = get_query_registry().execute(
+                "products_by_ram", self.graph, min_ram=self._number(min_ram)
+            )
             return self._process_sparql_results(results)
         except Exception as e:
             print(f"Error en consulta SPARQL: {e}")
@@ -133,19 +129,11 @@ class SPARQLQueries:
         """
         from reasoning.inference_engine import InferenceEngine
         
-        engine = InferenceEngine(self.onto)
+        engine = InferenceEngine()
         compatible = engine.get_compatible_products(product_id)
         
-        # Convertir a formato completo
-        results = []
-        for comp in compatible:
-            product_data = individual_to_dict(
-                self.onto.search_one(iri=f"*{comp['id']}")
-            )
-            if product_data:
-                results.append(product_data)
-        
-        return results
+        # Convertir a formato completo en un solo paso
+        return self._hydrate(dict.fromkeys(comp['id'] for comp in compatible))
     
     def search_products(
         self,
@@ -153,79 +141,98 @@ class SPARQLQueries:
         category: Optional[str] = None,
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
-        min_ram: Optional[int] = None
+        min_ram: Optional[int] = None,
+        sort_by: Optional[str] = None,
+        ascending: bool = True
     ) -> List[Dict]:
         """
         Búsqueda combinada con múltiples filtros.
         
+        Los filtros se ejecutan con el planificador (sparql/planner.py):
+        primero el más selectivo según los índices, y el resto solo sobre
+        los candidatos que quedan.
+        
         Args:
-            text_query: Texto a buscar en nombres
+            text_query: Texto a buscar (nombre, marca, procesador, categoría,
+                descripción; sin acentos y por prefijo)
             category: Categoría del producto
             min_price: Precio mínimo
             max_price: Precio máximo
             min_ram: RAM mínima
+            sort_by: Campo para ordenar (price, rating, ram, storage)
+            ascending: Orden ascendente o descendente
             
         Returns:
-            Lista de productos que cumplen todos los filtros
+            Lista de productos que cumplen todos los filtros (ordenada por
+            sort_by, o por relevancia si hay texto)
         """
-        # Empezar con todos los productos
-        from services.product_service import ProductService
-        service = ProductService()
-        
-        if category:
-            results = service.get_products_by_category(category)
-        else:
-            results = service.get_all_products()
+        results, _ = self.search_products_with_plan(
+            text_query, category, min_price, max_price, min_ram, sort_by, ascending
+        )
+        return results
+    
+    def search_products_with_plan(
+        self,
+        text_query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_ram: Optional[int] = None,
+        sort_by: Optional[str] = None,
+        ascending: bool = True,
+        explain: bool = False
+    ) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """
+        Igual que search_products, devolviendo además el plan ejecutado.
         
-        # Aplicar filtro de texto
-        if text_query:
-            text_query_lower = text_query.lower()
-            results = [
-                p for p in results
-                if text_query_lower in p.get('properties', {}).get('tieneNombre', '').lower()
-            ]
+        Returns:
+            (productos, plan con estimaciones y tiempos por etapa si explain=True)
+        """
+        from services.product_service import ProductService
+        from sparql.planner import SearchPlanner
         
-        # Aplicar filtro de precio
+        # Predicados numéricos (sin RAM se asume 0, como antes)
+        predicates = []
         if min_price is not None or max_price is not None:
-            filtered = []
-            for product in results:
-                price = product.get('properties', {}).get('tienePrecio')
-                if price is None:
-                    continue
-                if min_price is not None and price < min_price:
-                    continue
-                if max_price is not None and price > max_price:
-                    continue
-                filtered.append(product)
-            results = filtered
-        
-        # Aplicar filtro de RAM
+            predicates.append(RangePredicate("tienePrecio", min_price, max_price))
         if min_ram is not None:
-            results = [
-                p for p in results
-                if p.get('properties', {}).get('tieneRAM_GB', 0) >= min_ram
-            ]
+            predicates.append(RangePredicate("tieneRAM_GB", low=min_ram, default=0))
         
-        return results
+        product_ids, plan = SearchPlanner().execute(
+            text_query=text_query,
+            category=category,
+            predicates=tuple(predicates),
+            sort_by=sort_by,
+            ascending=ascending,
+            explain=explain
+        )
+        return ProductService().get_products_by_ids(product_ids), plan
+    
+    @staticmethod
+    def _number(value) -> Optional[Literal]:
+        """Parámetro numérico como literal xsd:double (None si no se indicó)."""
+        if value is None:
+            return None
+        return Literal(float(value))
     
     def _process_sparql_results(self, results) -> List[Dict]:
-        """Procesa resultados de SPARQL y convierte a formato estándar."""
-        product_ids = set()
-        
-        for row in results:
-            # Extraer ID del producto del URI
-            product_uri = str(row.product)
-            product_id = product_uri.split('#')[-1]
-            product_ids.add(product_id)
-        
-        # Obtener datos completos de cada producto
-        products = []
-        for product_id in product_ids:
-            product = self.onto.search_one(iri=f"*{product_id}")
-            if product:
-                products.append(individual_to_dict(product))
+        """
+        Procesa resultados de SPARQL y convierte a formato estándar.
         
-        return products
+        Los IRIs se deduplican conservando el orden de las filas y se
+        resuelven todos juntos contra el snapshot (una búsqueda por ID,
+        sin recorrer el quadstore).
+        """
+        # Extraer ID del producto del URI
+        product_ids = dict.fromkeys(
+            str(row.product).split('#')[-1] for row in results
+        )
+        return self._hydrate(product_ids)
+    
+    @staticmethod
+    def _hydrate(product_ids) -> List[Dict]:
+        """Datos completos de los productos, en el orden de los IDs dados."""
+        return [record.to_dict() for record in get_snapshot().get_many(product_ids)]
     
     def _get_all_products_from_onto(self) -> List[Dict]:
         """Obtiene todos los productos de la ontología."""
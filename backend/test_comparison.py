@@ -6,7 +6,15 @@ from unittest.mock import MagicMock, patch
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+import math
+import os
+
+import numpy as np
+
+from ontology.adjacency import AdjacencyIndex
+from ontology.relation_matrix import RelationMatrix
 from services.comparison_service import ComparisonService
+from services.scoring_engine import ScoringEngine, ScoringMatrix, resolution_pixels
 
 class TestComparisonService:
     @pytest.fixture
@@ -106,3 +114,173 @@ class TestComparisonService:
         
         with pytest.raises(ValueError):
             service.compare_products(["non_existent", "p2"])
+
+
+class TestScoringEngine:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        path = tmp_path / "weights.json"
+        path.write_text('{"weights": {"ram": 0.5, "precio": 0.5}}', encoding="utf-8")
+        return ScoringEngine(path)
+
+    def test_resolution_pixels(self):
+        assert resolution_pixels("3200x1440") == 4608000
+        # Igual que el cálculo original: solo "AnchoxAlto" en minúscula y
+        # como texto; listas, "X" y textos sin números quedan sin resolución
+        for value in ("", None, "sin dato", "1920X1080", ["1920x1080"], ("1920x1080",)):
+            assert math.isnan(resolution_pixels(value))
+
+    def test_batch_scores_and_breakdown(self, engine):
+        products = [
+            {"id": "p1", "properties": {"tieneRAM_GB": 16, "tienePrecio": 600}},
+            {"id": "p2", "properties": {"tieneRAM_GB": 8, "tienePrecio": 1200, "resolucionPantalla": "3200x1440"}},
+            {"id": "p3", "properties": {}},
+        ]
+        scores, breakdown = engine.score_products(products, breakdown=True)
+        assert scores == [100.0, 54.5, 0.0]
+        assert breakdown[0] == {"ram": 100.0, "precio": 100.0}
+        # La resolución solo pondera si se pudo parsear (peso por defecto 0.10)
+        assert breakdown[1] == {"ram": 50.0, "precio": 50.0, "resolucion": 100.0}
+
+    def test_weights_reload_on_mtime_change(self, engine):
+        assert engine.weights() == {"ram": 0.5, "precio": 0.5}
+        engine.weights_path.write_text('{"weights": {"ram": 1.0}}', encoding="utf-8")
+        stat = os.stat(engine.weights_path)
+        os.utime(engine.weights_path, (stat.st_atime, stat.st_mtime + 10))
+        assert engine.weights() == {"ram": 1.0}
+
+    def test_single_product_score(self, engine):
+        with patch('services.comparison_service.get_ontology'), \
+             patch('services.comparison_service.InferenceEngine'), \
+             patch('services.comparison_service.ProductService'):
+            service = ComparisonService()
+        service.scoring_engine = engine
+        products = [
+            {"id": f"p{i}", "properties": {
+                "tienePrecio": 300 + 150 * i, "tieneRAM_GB": [2 ** i],
+                "resolucionPantalla": f"{1000 + 200 * i}x1080" if i % 2 else ""
+            }}
+            for i in range(4)
+        ]
+        ids = [product["id"] for product in products]
+        scores = [service._calculate_score(product, pid, ids) for product, pid in zip(products, ids)]
+        # p0: (1/16 * 0.5 + 1 * 0.5) -> 53.1; p1 suma la resolución con peso 0.10
+        assert scores == [53.1, 53.7, 62.5, 62.5]
+        assert engine.score_products(products)[0] == scores
+
+
+class TestScoringEngineSnapshot:
+    def test_swrl_bonus_from_adjacency(self, loader):
+        engine = ScoringEngine()
+        first, second, third = loader.snapshot.product_ids[:3]
+        before, _ = engine.score([first, second, third])
+        loader.add_relation(loader.onto[first], "esMejorOpcionQue", loader.onto[second])
+        loader.notify_changed()
+        after, _ = engine.score([first, second, third])
+        assert after[0] == min(100, before[0] + 2)
+        assert after[1:] == before[1:]
+        # Sin el producto superado no hay bonus
+        assert engine.score([first, third])[0][0] == before[0]
+        assert ScoringMatrix.from_snapshot(loader.snapshot).size == len(loader.snapshot.product_ids)
+
+    def test_rank_matches_scoring_whole_category(self, loader):
+        engine = ScoringEngine()
+        snapshot = loader.snapshot
+        for product_id in snapshot.product_ids:
+            ranking = engine.rank(product_id, top_k=3)
+            category = snapshot.get(product_id).category
+            members = [pid for pid in snapshot.product_ids if snapshot.get(pid).category == category]
+            scores = dict(zip(members, engine.score(members)[0]))
+            target = scores[product_id]
+            others = [score for pid, score in scores.items() if pid != product_id]
+
+            assert ranking["score"] == target
+            assert ranking["total"] == len(members)
+            assert ranking["rank"] == 1 + sum(score > target for score in others)
+            if others:
+                expected = 100 * (sum(score < target for score in others) + 0.5 * others.count(target)) / len(others)
+                assert ranking["percentile"] == round(expected, 1)
+            better = [entry["score"] for entry in ranking["better"]]
+            worse = [entry["score"] for entry in ranking["worse"]]
+            assert better == sorted((s for s in others if s > target), reverse=True)[:3]
+            assert worse == sorted((s for s in others if s < target), reverse=True)[:3]
+            assert set(ranking["breakdown"]) >= {"precio", "bateria"}
+
+    def test_single_product_bonus_from_adjacency(self, loader):
+        with patch('services.comparison_service.get_ontology'), \
+             patch('services.comparison_service.InferenceEngine'), \
+             patch('services.comparison_service.ProductService'):
+            service = ComparisonService()
+        first, second = loader.snapshot.product_ids[:2]
+        product = {"id": first, "properties": loader.snapshot.get(first).properties}
+        before = service._calculate_score(product, first, [first, second])
+        loader.add_relation(loader.onto[first], "esMejorOpcionQue", loader.onto[second])
+        assert service._calculate_score(product, first, [first, second]) == min(100, before + 2)
+        assert service._calculate_score(product, first, [first]) == before
+        service.inference_engine.is_better_option.assert_not_called()
+
+    def test_rank_sees_relations_added_without_new_snapshot(self, loader):
+        engine = ScoringEngine()
+        snapshot = loader.snapshot
+        category = snapshot.get(snapshot.product_ids[0]).category
+        first, second = [pid for pid in snapshot.product_ids if snapshot.get(pid).category == category][:2]
+        before = engine.rank(first)["score"]
+        loader.add_relation(loader.onto[first], "esMejorOpcionQue", loader.onto[second])
+        assert loader.snapshot is snapshot
+        assert engine.rank(first)["score"] == min(100, before + 2)
+
+    def test_compare_sees_relations_added_without_new_snapshot(self, loader):
+        service = ComparisonService()
+        ids = loader.snapshot.product_ids
+        first, second = next(
+            (a, b) for a, b in zip(ids, ids[1:]) if not loader.adjacency.has_edge("esMejorOpcionQue", a, b)
+        )
+        before = service.compare_products([first, second])
+
+        loader.add_relation(loader.onto[first], "esMejorOpcionQue", loader.onto[second])
+        snapshot = loader.snapshot
+        after = service.compare_products([first, second])
+        assert loader.snapshot is snapshot
+        # Score y relaciones SWRL de la misma respuesta coinciden
+        assert after["all_scores"][first] == min(100, before["all_scores"][first] + 2)
+        assert {"source": first, "target": second, "rule": "EncontrarMejorPrecio"} in after["swrl_inference"]["esMejorOpcionQue"]
+
+    def test_rank_unknown_product(self, loader):
+        with pytest.raises(ValueError):
+            ScoringEngine().rank("NoExiste")
+
+
+class TestRelationMatrix:
+    @pytest.fixture
+    def adjacency(self):
+        rng = np.random.default_rng(5)
+        ids = [f"P{i}" for i in range(21)]
+        edges = {
+            prop: [(ids[a], ids[b]) for a, b in rng.integers(0, len(ids), size=(40, 2))]
+            for prop in ("tieneMejorRAMQue", "esCompatibleCon")
+        }
+        # Relaciones con individuos que no son productos no se guardan
+        edges["tieneMejorRAMQue"].append(("P0", "Marca_X"))
+        return ids, AdjacencyIndex.from_edges(edges, symmetric=["esCompatibleCon"])
+
+    def test_gather_matches_has_edge(self, adjacency):
+        ids, index = adjacency
+        relations = RelationMatrix.from_adjacency(ids, index)
+        query = ["P3", "p17", "Marca_X", "P8", "P20", "P3", "P9", "P0", "P12", "P15"]
+        rows = relations.rows_of(query)
+        assert rows[1] == 17 and rows[2] == -1
+        for prop in ("tieneMejorRAMQue", "esCompatibleCon", "esMejorOpcionQue"):
+            result = relations.gather(prop, rows)
+            expected = [
+                [row_a >= 0 and row_b >= 0 and index.has_edge(prop, ids[row_a], ids[row_b]) for row_b in rows]
+                for row_a in rows
+            ]
+            assert result.tolist() == expected
+
+    def test_bits_only_for_subjects(self, adjacency):
+        ids, index = adjacency
+        relations = RelationMatrix.from_adjacency(ids, index)
+        bits = relations.properties["tieneMejorRAMQue"]
+        subjects = {subject for subject, obj in index.edges("tieneMejorRAMQue") if obj in ids}
+        assert bits.bits.shape == (len(subjects), 3)
+        assert {ids[row] for row in np.flatnonzero(bits.slots >= 0)} == subjects
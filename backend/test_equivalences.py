@@ -9,8 +9,16 @@ from pathlib import Path
 # Agregar el directorio backend al path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from dataclasses import replace
+from types import MappingProxyType
+
+import numpy as np
+
+from ontology.equivalence_graph import EQUIVALENCE_THRESHOLD, EquivalenceGraph, get_equivalence_graph
+from ontology.snapshot import OntologySnapshot, ProductRecord
 from services.equivalence_service import EquivalenceService
 import json
+import logging
 
 
 def test_equivalences():
@@ -73,6 +81,109 @@ def test_equivalences():
     print("="*70)
 
 
+def test_summary_matches_per_product_search(loader, caplog):
+    """El resumen sale del grafo y la adyacencia, igual que buscar producto por producto."""
+    ids = loader.snapshot.product_ids
+    loader.add_relation(loader.onto[ids[0]], "esSimilarA", loader.onto[ids[2]])
+    loader.add_relation(loader.onto[ids[3]], "esEquivalenteTecnico", loader.onto[ids[0]])
+    loader.notify_changed()
+    service = EquivalenceService()
+    
+    with caplog.at_level(logging.INFO):
+        summary = service.get_equivalence_summary()
+    assert not [r for r in caplog.records if r.name == "services.equivalence_service"]
+    
+    groups = {}
+    for product_id in ids:
+        result = service.find_equivalent_products(product_id, include_reasons=False)
+        if result["total_equivalents"]:
+            groups[product_id] = [e["id"] for e in result["equivalents"]]
+    assert summary["products_with_equivalents"] == len(groups)
+    assert ids[2] in groups[ids[0]] and ids[3] in groups[ids[0]]
+    for group in summary["top_equivalence_groups"]:
+        assert group["equivalents"] == groups[group["product_id"]]
+
+
+class TestEquivalenceGraph:
+    @staticmethod
+    def _snapshot(count=120, seed=3, version=1):
+        rng = np.random.default_rng(seed)
+        records = {}
+        for i in range(count):
+            properties = {}
+            for prop, choices in (
+                ("tieneRAM_GB", [0, 4, 6, 8, 16]),
+                ("tieneAlmacenamiento_GB", [0, 128, 256, 512]),
+                ("tienePrecio", [0, 500, 550, 999.99, 1100, 1200]),
+                ("tienePulgadas", [0, 6.1, 6.7, 13.3, 14]),
+            ):
+                value = choices[rng.integers(len(choices))]
+                if value:
+                    properties[prop] = value
+            category = [None, "Laptop", "Smartphone", "Tablet"][rng.integers(4)]
+            records[f"P{i}"] = ProductRecord(
+                id=f"P{i}", types=("Producto",), direct_types=("Producto",), reasoned_types=("Producto",),
+                properties=MappingProxyType(properties), specs=MappingProxyType(properties),
+                links=MappingProxyType({}), category=category
+            )
+        return OntologySnapshot(records, list(records), ["Producto"], version)
+
+    @staticmethod
+    def _brute_force(snapshot):
+        service = EquivalenceService.__new__(EquivalenceService)
+        expected = {}
+        for record in snapshot.products():
+            data = service._equivalence_data(record)
+            if not data["category"] or data["price"] == 0:
+                expected[record.id] = []
+                continue
+            expected[record.id] = [
+                (candidate.id, score)
+                for candidate in snapshot.products() if candidate.id != record.id
+                for score, _ in [service._calculate_equivalence_match(data, service._equivalence_data(candidate))]
+                if score >= EQUIVALENCE_THRESHOLD
+            ]
+        return expected
+
+    def test_matches_pairwise_rule(self, monkeypatch):
+        import ontology.equivalence_graph as equivalence_graph
+        # Bloques pequeños para cubrir el recorrido por bloques
+        monkeypatch.setattr(equivalence_graph, "BLOCK_CELLS", 100)
+        snapshot = self._snapshot()
+        graph = get_equivalence_graph(snapshot)
+        expected = self._brute_force(snapshot)
+        assert graph.edge_count > 0
+        for product_id in snapshot.product_ids:
+            assert graph.neighbors(product_id) == expected[product_id]
+
+    def test_incremental_update_matches_rebuild(self):
+        snapshot = self._snapshot()
+        graph = EquivalenceGraph.from_snapshot(snapshot)
+        records = snapshot.record_map()
+        records["P3"] = replace(records["P3"], properties=MappingProxyType({"tienePrecio": 1000, "tieneRAM_GB": 8}), category="Laptop")
+        records["P7"] = replace(records["P7"], category=None)
+        records["P200"] = replace(records["P5"], id="P200")
+        changed = OntologySnapshot(records, list(snapshot.product_ids) + ["P200"], ["Producto"], 2)
+        updated = graph.updated(changed, ["P3", "P7", "P200"])
+        rebuilt = EquivalenceGraph.from_snapshot(changed)
+        for product_id in changed.product_ids:
+            assert updated.neighbors(product_id) == rebuilt.neighbors(product_id)
+
+    def test_components(self):
+        snapshot = self._snapshot()
+        graph = get_equivalence_graph(snapshot)
+        components = graph.components([("P0", "P1")])
+        seen = [pid for component in components for pid in component]
+        assert len(seen) == len(set(seen))
+        assert all(len(component) >= 2 for component in components)
+        assert [len(c) for c in components] == sorted((len(c) for c in components), reverse=True)
+        position = {pid: i for i, component in enumerate(components) for pid in component}
+        assert position["P0"] == position["P1"]
+        src, dst, _ = graph.edges()
+        for a, b in zip(src, dst):
+            assert position[graph.ids[a]] == position[graph.ids[b]]
+
+
 if __name__ == "__main__":
     try:
         test_equivalences()
@@ -0,0 +1,118 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import asyncio
+import threading
+
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+
+import executor
+from executor import OntologyExecutor, offload
+
+
+class TestOntologyExecutor:
+    def test_runs_off_the_event_loop(self):
+        pool = OntologyExecutor(workers=2, max_pending=2)
+
+        async def main():
+            return await pool.run("test", threading.get_ident), threading.get_ident()
+
+        worker, loop_thread = asyncio.run(main())
+        assert worker != loop_thread
+        assert pool.stats()["completed"] == 1
+        pool.shutdown()
+
+    def test_saturated_pool_returns_503_with_retry_after(self):
+        pool = OntologyExecutor(workers=1, max_pending=1, retry_after=7)
+        release = threading.Event()
+
+        async def main():
+            busy = asyncio.ensure_future(pool.run("test", release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(HTTPException) as exc:
+                await pool.run("test", int)
+            release.set()
+            await busy
+            return exc.value
+
+        error = asyncio.run(main())
+        assert error.status_code == 503
+        assert error.headers["Retry-After"] == "7"
+        assert pool.stats()["rejected"] == 1
+        pool.shutdown()
+
+    def test_run_waiting_waits_for_a_slot(self):
+        pool = OntologyExecutor(workers=1, max_pending=1)
+        release = threading.Event()
+
+        async def main():
+            busy = asyncio.ensure_future(pool.run("test", release.wait, 5))
+            await asyncio.sleep(0.05)
+            waiting = asyncio.ensure_future(pool.run_waiting("test", int, "7"))
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+            release.set()
+            await busy
+            return await waiting
+
+        assert asyncio.run(main()) == 7
+        assert pool.stats()["rejected"] == 0
+        assert pool.stats()["completed"] == 2
+        pool.shutdown()
+
+    def test_endpoint_timeout(self):
+        pool = OntologyExecutor(workers=1, max_pending=2, timeouts={"slow": 0.05})
+        release = threading.Event()
+
+        async def main():
+            with pytest.raises(HTTPException) as exc:
+                await pool.run("slow", release.wait, 5)
+            release.set()
+            return exc.value
+
+        assert asyncio.run(main()).status_code == 503
+        assert pool.stats()["timed_out"] == 1
+        assert pool.timeout_for("other") == pool.default_timeout
+        pool.shutdown()
+
+    def test_errors_propagate(self):
+        pool = OntologyExecutor(workers=1, max_pending=1)
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(pool.run("test", lambda: 1 / 0))
+        assert pool.stats()["in_flight"] == 0
+        pool.shutdown()
+
+
+class TestOffloadDecorator:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(executor, "_executor", OntologyExecutor(workers=2, max_pending=4))
+
+        def get_factor():
+            return 3
+
+        app = FastAPI()
+
+        @app.get("/times")
+        @offload("test")
+        def times(value: int = Query(...), factor: int = Depends(get_factor)):
+            if value < 0:
+                raise HTTPException(status_code=400, detail="negativo")
+            return {"result": value * factor, "thread": threading.current_thread().name}
+
+        return TestClient(app)
+
+    def test_signature_and_dependencies_preserved(self, client):
+        response = client.get("/times", params={"value": 4})
+        assert response.status_code == 200
+        assert response.json()["result"] == 12
+        assert response.json()["thread"].startswith("ontology")
+
+    def test_http_errors_pass_through(self, client):
+        assert client.get("/times", params={"value": -1}).status_code == 400
+        assert client.get("/times").status_code == 422
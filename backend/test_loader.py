@@ -0,0 +1,210 @@
+import pytest
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import config
+from ontology.loader import (
+    OntologyLoader, cache_file_for, ontology_hash,
+    get_active_loader, set_active_loader, get_snapshot
+)
+from ontology.reasoning_manager import ReasoningManager, STATE_DEGRADED, STATE_READY
+from reasoning.inference_engine import InferenceEngine
+from sparql.graph_provider import get_graph_provider, get_rdf_graph
+from sparql.market_analysis import MarketAnalysis
+from sparql.prepared import PreparedQueryRegistry, get_query_registry, prepareQuery
+from sparql.queries import SPARQLQueries, PRODUCTS_BY_PRICE, PRODUCTS_BY_RAM
+
+
+class TestOntologyCache:
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path):
+        with patch.dict(config.ONTOLOGY_CACHE_CONFIG, {"dir": tmp_path}):
+            yield tmp_path
+
+    def _reasoned_loader(self):
+        loader = OntologyLoader(use_cache=True)
+        loader.load()
+        with patch('ontology.loader.sync_reasoner_pellet') as reasoner:
+            loader.run_reasoner()
+        return loader, reasoner
+
+    def test_cache_written_after_reasoning(self, cache_dir):
+        loader, reasoner = self._reasoned_loader()
+        assert reasoner.called
+        assert not loader.from_cache
+        assert cache_file_for(ontology_hash()).exists()
+        assert list(cache_dir.glob("*.tmp")) == []
+
+    def test_cache_hit_skips_parsing_and_reasoner(self):
+        first, _ = self._reasoned_loader()
+
+        loader = OntologyLoader(use_cache=True)
+        with patch('ontology.loader.sync_reasoner_pellet') as reasoner:
+            loader.load()
+            loader.run_reasoner()
+
+        assert loader.from_cache
+        assert not reasoner.called
+        assert sorted(r.id for r in loader.snapshot.products()) == \
+            sorted(r.id for r in first.snapshot.products())
+
+    def test_cache_keyed_by_content_hash(self, tmp_path):
+        owl = tmp_path / "copia.owl"
+        owl.write_bytes(config.ONTOLOGY_FILE.read_bytes())
+        assert ontology_hash(owl) == ontology_hash()
+
+        owl.write_bytes(owl.read_bytes() + b"\n")
+        assert ontology_hash(owl) != ontology_hash()
+
+    def test_cache_disabled_by_default(self):
+        loader = OntologyLoader()
+        loader.load()
+        assert not loader.from_cache
+        assert loader.content_hash is None
+
+
+class TestReasoningManager:
+    @pytest.fixture(autouse=True)
+    def without_cache(self, restore_active_loader):
+        with patch.dict(config.ONTOLOGY_CACHE_CONFIG, {"enabled": False}):
+            yield
+
+    def test_background_reasoning_swaps_loader(self):
+        manager = ReasoningManager()
+        with patch('ontology.loader.sync_reasoner_pellet') as reasoner:
+            initial = manager.start(background=True)
+            # La ontología afirmada se sirve de inmediato
+            assert initial.snapshot is not None
+            assert manager.wait(30)
+
+        assert reasoner.called
+        active = get_active_loader()
+        assert active is not initial
+        assert active.reasoned
+        assert get_snapshot().version == initial.version + 1
+
+        status = manager.status()
+        assert status["state"] == STATE_READY
+        assert status["reasoned"] is True
+        assert status["last_error"] is None
+        assert status["last_duration_seconds"] is not None
+
+        # El motor sin ontología fija sigue al loader publicado
+        engine = InferenceEngine()
+        assert engine.ontology is active.onto
+        assert engine.index is active.index
+
+    def test_changes_during_reasoning_are_replayed(self):
+        manager = ReasoningManager()
+        release = threading.Event()
+        with patch('ontology.loader.sync_reasoner_pellet', side_effect=lambda *a, **k: release.wait(30)):
+            initial = manager.start(background=True)
+
+            # Cambios sobre la ontología afirmada mientras Pellet razona
+            laptop = initial.index.get("Laptop_Dell_XPS")
+            laptop.tienePrecio = [777.0]
+            initial.refresh_individuals([laptop.name])
+            initial.add_relation(laptop, "esSimilarA", initial.index.get("Laptop_HP_Pavilion"))
+            initial.notify_changed()
+            version = initial.version
+            release.set()
+            assert manager.wait(30)
+
+        active = get_active_loader()
+        assert active is not initial
+        assert active.version > version
+        assert active.snapshot.get("Laptop_Dell_XPS").spec("tienePrecio") == 777.0
+        assert active.adjacency.has_edge("esSimilarA", "Laptop_Dell_XPS", "Laptop_HP_Pavilion")
+
+        # Las requests que aún tenían el loader anterior se reenvían al nuevo
+        laptop.tienePrecio = [555.0]
+        initial.refresh_individuals([laptop.name])
+        assert active.snapshot.get("Laptop_Dell_XPS").spec("tienePrecio") == 555.0
+
+    def test_reasoner_failure_keeps_asserted_ontology(self):
+        manager = ReasoningManager()
+        with patch('ontology.loader.sync_reasoner_pellet', side_effect=RuntimeError("sin java")):
+            initial = manager.start(background=False)
+
+        assert get_active_loader() is initial
+        status = manager.status()
+        assert status["state"] == STATE_DEGRADED
+        assert status["reasoned"] is False
+        assert "sin java" in status["last_error"]
+
+
+class TestRDFGraphProvider:
+    def test_graph_shared_and_backed_by_world(self, loader):
+        graph = get_rdf_graph()
+        assert graph is get_rdf_graph()
+        assert SPARQLQueries().graph is MarketAnalysis().graph is graph
+
+        # Vista sobre el quadstore: un triple agregado al World aparece sin recargar
+        product = loader.snapshot.products()[0]
+        loader.index.get(product.id).tieneStock = [7]
+        rows = list(graph.query(
+            "PREFIX ns: <http://smartcompare.com/ontologia#> "
+            "SELECT ?stock WHERE { ns:%s ns:tieneStock ?stock }" % product.id
+        ))
+        assert [int(row[0]) for row in rows] == [7]
+
+    def test_graph_follows_active_loader(self, loader):
+        graph = get_rdf_graph()
+        loader.refresh_snapshot()
+        assert get_graph_provider().version == loader.version - 1
+        get_rdf_graph()
+        assert get_graph_provider().version == loader.version
+
+        # Un loader nuevo (ej: tras razonar en segundo plano) trae su propio World
+        other = OntologyLoader()
+        other.load()
+        other.refresh_snapshot()
+        set_active_loader(other)
+        assert get_rdf_graph() is not graph
+
+
+class TestPreparedQueries:
+    @pytest.fixture
+    def graph(self, loader):
+        return get_rdf_graph()
+
+    def test_query_parsed_once_and_measured(self, graph):
+        registry = PreparedQueryRegistry()
+        with patch('sparql.prepared.prepareQuery', wraps=prepareQuery) as prepare:
+            registry.register("ram", PRODUCTS_BY_RAM)
+            registry.register("ram", PRODUCTS_BY_RAM)
+            for min_ram in (8, 16, 32):
+                registry.execute("ram", graph, min_ram=min_ram)
+        assert prepare.call_count == 1
+        stats = registry.stats()["ram"]
+        assert stats["executions"] == 3
+        assert stats["errors"] == 0
+        assert stats["avg_ms"] is not None
+
+    def test_unbound_limits_do_not_filter(self, graph):
+        registry = PreparedQueryRegistry()
+        registry.register("price", PRODUCTS_BY_PRICE)
+        everything = registry.execute("price", graph)
+        capped = registry.execute("price", graph, max_price=800.0)
+        assert 0 < len(capped) < len(everything)
+        assert all(float(row.price) <= 800 for row in capped)
+
+    def test_parameters_are_bound_not_interpolated(self, graph):
+        registry = PreparedQueryRegistry()
+        registry.register("ram", PRODUCTS_BY_RAM)
+        # Un valor malicioso queda como literal de texto y no altera la consulta
+        rows = registry.execute("ram", graph, min_ram="0) || (1 = 1")
+        assert rows == []
+
+    def test_results_hydrated_in_row_order_without_duplicates(self, graph):
+        rows = get_query_registry().execute("products_by_ram", graph, min_ram=0)
+        expected = list(dict.fromkeys(str(row.product).split('#')[-1] for row in rows))
+
+        products = SPARQLQueries()._process_sparql_results(rows + rows)
+        assert [p["id"] for p in products] == expected
+        assert products[0] == get_snapshot().get(expected[0]).to_dict()
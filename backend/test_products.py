@@ -0,0 +1,72 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ontology.range_index import RangePredicate
+from services.product_service import ProductService
+
+
+@pytest.mark.usefixtures("class_loader")
+class TestProductPagination:
+    @pytest.mark.parametrize("query", [
+        dict(),
+        dict(sort_by="price"),
+        dict(sort_by="rating", ascending=False),
+        dict(category="Laptop"),
+        dict(category="Smartphone", sort_by="ram"),
+        dict(predicates=[RangePredicate("tienePrecio", low=500)], sort_by="storage", ascending=False),
+    ])
+    def test_keyset_pages_cover_listing(self, query):
+        service = ProductService()
+        expected = service.query_product_ids(**query)
+
+        pages, after = [], None
+        while True:
+            page, total, after = service.query_page_ids(**query, after=after, limit=3)
+            assert total == len(expected)
+            pages.extend(page)
+            if after is None:
+                break
+        assert pages == expected
+
+    def test_after_outside_filters_keeps_sort_position(self):
+        service = ProductService()
+        cheap = RangePredicate("tienePrecio", high=500)
+        everything = service.query_product_ids(sort_by="price")
+        pivot = next(pid for pid in reversed(everything) if pid not in service.query_product_ids(predicates=[cheap]))
+
+        page, _, _ = service.query_page_ids(predicates=[cheap], sort_by="price", after=pivot)
+        assert page == []
+        with pytest.raises(ValueError):
+            service.query_page_ids(after="NoExiste")
+
+    def test_after_outside_category_keeps_category_position(self, class_loader):
+        service = ProductService()
+        laptops = service.query_product_ids(category="Laptop")
+        order = class_loader.snapshot.record_ids()
+        # Un producto que no es (o dejó de ser) de la categoría, entre dos laptops
+        pivot = next(
+            pid for pid in class_loader.snapshot.product_ids
+            if pid not in laptops and order.index(laptops[0]) < order.index(pid) < order.index(laptops[-1])
+        )
+
+        page, total, _ = service.query_page_ids(category="Laptop", after=pivot, limit=50)
+        assert total == len(laptops)
+        assert page == [pid for pid in laptops if order.index(pid) > order.index(pivot)]
+        assert page and page != laptops
+
+    def test_export_chunks_match_products(self):
+        import json
+        from routers.products import _export_chunks
+
+        service = ProductService()
+        ids = service.query_product_ids(sort_by="price")
+        expected = service.get_products_by_ids(ids)
+
+        ndjson = b"".join(_export_chunks(service.iter_encoded_products(ids), "ndjson"))
+        assert [json.loads(line) for line in ndjson.splitlines()] == expected
+        array = b"".join(_export_chunks(service.iter_encoded_products(ids), "json"))
+        assert json.loads(array) == expected
@@ -0,0 +1,202 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import json
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.recommendation import UserPreferences
+from services.recommendation_engine import CandidatePool, RecommendationEngine, budget_bucket, get_candidate_pools
+from services.recommendation_service import RecommendationService
+from services.scoring_engine import numeric_value
+
+
+class TestCandidatePool:
+    def test_unpriced_rows_pass_budget(self):
+        pool = CandidatePool(np.array([4, 0, 2]), np.array([100.0, 250.0, 900.0]), np.array([1, 3]))
+        assert pool.rows_in_budget(None, None).tolist() == [0, 1, 2, 3, 4]
+        assert pool.rows_in_budget(None, 250).tolist() == [0, 1, 3, 4]
+        assert pool.rows_in_budget(200, 900).tolist() == [0, 1, 2, 3]
+        assert pool.rows_in_budget(1000, 500).tolist() == [1, 3]
+
+
+    def test_budget_buckets_double(self):
+        assert budget_bucket(None) is None
+        assert budget_bucket(0) is None
+        assert budget_bucket(80) == budget_bucket(100) == 0
+        assert budget_bucket(150) == budget_bucket(200) == 1
+        assert budget_bucket(1500) == budget_bucket(1600) == 4
+
+
+class TestRecommendationEngine:
+    @pytest.mark.parametrize("preferences", [
+        UserPreferences(),
+        UserPreferences(budget=1500, min_ram=8),
+        UserPreferences(min_budget=300, budget=2000, min_rating=4.0),
+        UserPreferences(preferred_category="Laptop", min_storage=256),
+    ])
+    def test_filters_match_linear_scan(self, loader, preferences):
+        candidates = RecommendationEngine().recommend(preferences, loader.snapshot)
+        expected = []
+        for record in loader.snapshot.products():
+            props = record.properties
+            price = numeric_value(props.get("tienePrecio"))
+            if preferences.budget and price and price > preferences.budget:
+                continue
+            if preferences.min_budget and price and price < preferences.min_budget:
+                continue
+            if preferences.preferred_category and preferences.preferred_category not in record.types:
+                continue
+            if any(
+                minimum and numeric_value(props.get(prop, 0)) < minimum
+                for minimum, prop in [
+                    (preferences.min_ram, "tieneRAM_GB"),
+                    (preferences.min_storage, "tieneAlmacenamiento_GB"),
+                    (preferences.min_rating, "tieneCalificacion"),
+                ]
+            ):
+                continue
+            expected.append(record.id)
+        assert candidates.ids == expected
+
+    def test_better_option_counts_first_products(self, loader):
+        ids = list(loader.snapshot.product_ids)
+        loader.add_relation(loader.onto[ids[7]], "esMejorOpcionQue", loader.onto[ids[1]])
+        loader.add_relation(loader.onto[ids[7]], "esMejorOpcionQue", loader.onto[ids[3]])
+        loader.add_relation(loader.onto[ids[7]], "esMejorOpcionQue", loader.onto[ids[8]])
+        loader.notify_changed()
+        pools = get_candidate_pools(loader.snapshot)
+        assert pools.better_counts[7] == 2
+        assert pools.better_counts.sum() == 2
+        reason = RecommendationEngine.reason(pools, 7, UserPreferences())
+        assert "Mejor opción que 2 productos similares" in reason
+
+    def test_cache_by_preferences_and_version(self, loader):
+        engine = RecommendationEngine(cache_entries=2)
+        preferences = UserPreferences(budget=1500)
+        first = engine.recommend(preferences, loader.snapshot)
+        assert engine.recommend(UserPreferences(budget=1500.0), loader.snapshot) is first
+        assert engine.stats()["hits"] == 1
+
+        loader.notify_changed()
+        assert engine.recommend(preferences, loader.snapshot) is not first
+        for budget in (100, 200, 300):
+            engine.recommend(UserPreferences(budget=budget), loader.snapshot)
+        assert engine.stats()["entries"] == 2
+
+    def test_service_pages_use_cached_scores(self, loader):
+        service = RecommendationService()
+        preferences = UserPreferences(min_rating=4.0, budget=2000)
+        full = service.get_recommendations(preferences, 50)
+        scores = [item.score for item in full["recommendations"]]
+        assert scores == sorted(scores, reverse=True)
+        assert full["total_matches"] == len(full["recommendations"])
+        assert all(0 <= item.match_percentage <= 100 for item in full["recommendations"])
+
+        hits = service.engine.stats()["hits"]
+        pages, cursor = [], None
+        while True:
+            page = service.get_recommendations(preferences, 3, cursor)
+            pages.extend(page["recommendations"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(pages) > 3
+        assert pages == full["recommendations"]
+        # Cada página reutiliza los scores ya calculados
+        assert service.engine.stats()["hits"] == hits + (len(pages) + 2) // 3
+
+    def test_relations_added_without_new_snapshot(self, loader):
+        engine = RecommendationEngine()
+        ids = list(loader.snapshot.product_ids)
+        before = engine.recommend(UserPreferences(), loader.snapshot)
+        assert get_candidate_pools(loader.snapshot).better_counts[7] == 0
+
+        loader.add_relation(loader.onto[ids[7]], "esMejorOpcionQue", loader.onto[ids[1]])
+        pools = get_candidate_pools(loader.snapshot)
+        assert pools.better_counts[7] == 1
+        after = engine.recommend(UserPreferences(), loader.snapshot)
+        assert after is not before
+        assert after.scores[7] == round(before.scores[7] + 2, 2)
+        assert "Mejor opción que 1 productos similares" in RecommendationEngine.reason(pools, 7, UserPreferences())
+
+    def test_batch_matches_single_requests(self, loader):
+        service = RecommendationService()
+        profiles = [
+            UserPreferences(),
+            UserPreferences(budget=1500, min_ram=8),
+            UserPreferences(budget=1600, min_budget=200, min_rating=4.0),
+            UserPreferences(budget=300),
+            UserPreferences(preferred_category="Laptop", min_storage=256),
+            UserPreferences(preferred_category="Smartphone", budget=1200),
+            UserPreferences(preferred_category="Inexistente"),
+            UserPreferences(budget=1500, min_ram=8),
+        ]
+        results = service.get_batch_recommendations(iter(profiles), limit=3)
+        assert [result["index"] for result in results] == list(range(len(profiles)))
+        for preferences, result in zip(profiles, results):
+            expected = service.get_recommendations(preferences, 3)
+            expected.pop("next_cursor")
+            result.pop("index")
+            assert result == expected
+
+    def test_batch_endpoint_streams_ndjson(self, loader):
+        from routers import recommendations
+
+        app = FastAPI()
+        app.include_router(recommendations.router, prefix="/api/v1")
+        client = TestClient(app)
+        profiles = [{"budget": 1500}, {"preferred_category": "Laptop", "min_ram": 8}]
+
+        body = "\n".join(json.dumps(profile) for profile in profiles) + "\n"
+        response = client.post(
+            "/api/v1/recommendations/batch", params={"limit": 2}, content=body,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        assert response.headers["x-total-count"] == "2"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["index"] for line in lines] == [0, 1]
+        assert lines[1]["preferences_used"]["preferred_category"] == "Laptop"
+        assert all(len(line["recommendations"]) <= 2 for line in lines)
+
+        listed = client.post("/api/v1/recommendations/batch", params={"limit": 2}, json=profiles)
+        assert listed.text == response.text
+
+        invalid = client.post(
+            "/api/v1/recommendations/batch", content='{"budget": 1}\n{"budget": "caro"}\n',
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert invalid.status_code == 400
+        assert "Línea 2" in invalid.json()["detail"]
+
+    def test_batch_endpoint_scores_in_executor(self, loader, monkeypatch):
+        import executor
+        from executor import OntologyExecutor
+        from routers import recommendations
+
+        pool = OntologyExecutor(workers=2, max_pending=2, retry_after=4)
+        monkeypatch.setattr(executor, "_executor", pool)
+        monkeypatch.setattr(recommendations, "BATCH_STREAM_CHUNK_SIZE", 1)
+        app = FastAPI()
+        app.include_router(recommendations.router, prefix="/api/v1")
+        client = TestClient(app)
+        profiles = [{"budget": 1500}, {"budget": 300}, {"min_ram": 8}]
+
+        response = client.post("/api/v1/recommendations/batch", json=profiles)
+        assert [json.loads(line)["index"] for line in response.text.splitlines()] == [0, 1, 2]
+        # Validación + un bloque por perfil + el bloque vacío final
+        assert pool.stats()["completed"] == 1 + len(profiles) + 1
+
+        for _ in range(pool.max_pending):
+            pool._slots.acquire()
+        saturated = client.post("/api/v1/recommendations/batch", json=profiles)
+        assert saturated.status_code == 503
+        assert saturated.headers["Retry-After"] == "4"
+        pool.shutdown()
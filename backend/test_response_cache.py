@@ -0,0 +1,146 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+
+import executor
+import response_cache
+from executor import OntologyExecutor, offload
+from response_cache import ResponseCache, cached_response
+
+
+class _Snapshot:
+    def __init__(self, version):
+        self.version = version
+
+
+class TestResponseCache:
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        snapshot = _Snapshot(1)
+        cache.put("a", snapshot, b"1")
+        cache.put("b", snapshot, b"2")
+        assert cache.get("a", snapshot).body == b"1"
+        cache.put("c", snapshot, b"3")
+        assert cache.get("b", snapshot) is None
+        assert cache.get("a", snapshot) is not None
+        assert cache.stats()["entries"] == 2
+
+    def test_ttl_expiry(self, monkeypatch):
+        cache = ResponseCache(ttl=10)
+        snapshot = _Snapshot(1)
+        clock = [100.0]
+        monkeypatch.setattr(response_cache.time, "monotonic", lambda: clock[0])
+        cache.put("a", snapshot, b"1")
+        clock[0] += 5
+        assert cache.get("a", snapshot) is not None
+        clock[0] += 6
+        assert cache.get("a", snapshot) is None
+
+    def test_new_snapshot_invalidates(self):
+        cache = ResponseCache()
+        old, new = _Snapshot(1), _Snapshot(1)
+        entry = cache.put("a", old, b"1")
+        assert entry.etag.startswith('"v1-')
+        assert cache.get("a", new) is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_relations_version_invalidates(self):
+        cache = ResponseCache()
+        snapshot = _Snapshot(1)
+        old = cache.put("a", snapshot, b"1", relations=4)
+        assert cache.get("a", snapshot, relations=4) is not None
+        assert cache.get("a", snapshot, relations=5) is None
+        assert cache.put("a", snapshot, b"1", relations=5).etag != old.etag
+
+    def test_etag_depends_on_body(self):
+        cache = ResponseCache()
+        snapshot = _Snapshot(3)
+        assert cache.put("a", snapshot, b"1").etag == cache.put("b", snapshot, b"1").etag
+        assert cache.put("a", snapshot, b"1").etag != cache.put("a", snapshot, b"2").etag
+
+
+class TestCachedResponseDecorator:
+    @pytest.fixture
+    def app(self, loader, monkeypatch):
+        monkeypatch.setattr(executor, "_executor", OntologyExecutor(workers=2, max_pending=4))
+        monkeypatch.setattr(response_cache, "_response_cache", ResponseCache())
+        calls = []
+
+        def get_factor():
+            return 3
+
+        app = FastAPI()
+
+        @app.get("/times")
+        @cached_response("test")
+        @offload("test")
+        def times(value: int = Query(...), factor: int = Depends(get_factor)):
+            calls.append(value)
+            if value < 0:
+                raise HTTPException(status_code=400, detail="negativo")
+            return {"result": value * factor}
+
+        @app.get("/plus")
+        @cached_response("test")
+        @offload("test")
+        def plus(value: int = Query(...)):
+            calls.append(value)
+            return {"result": value + 1}
+
+        return TestClient(app), calls
+
+    def test_computed_once_per_normalized_params(self, app):
+        client, calls = app
+        first = client.get("/times", params={"value": 4})
+        second = client.get("/times?value=04")
+        assert first.json() == second.json() == {"result": 12}
+        assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+        assert calls == [4]
+        # Otro endpoint con los mismos parámetros no comparte entrada
+        assert client.get("/plus", params={"value": 4}).json() == {"result": 5}
+        assert calls == [4, 4]
+
+    def test_if_none_match_returns_304(self, app):
+        client, _ = app
+        etag = client.get("/times", params={"value": 2}).headers["ETag"]
+        response = client.get("/times", params={"value": 2}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert client.get("/times", params={"value": 2}, headers={"If-None-Match": '"otro"'}).status_code == 200
+
+    def test_errors_are_not_cached(self, app):
+        client, calls = app
+        assert client.get("/times", params={"value": -1}).status_code == 400
+        assert client.get("/times", params={"value": -1}).status_code == 400
+        assert client.get("/times").status_code == 422
+        assert calls == [-1, -1]
+
+    def test_ontology_change_invalidates(self, app, loader):
+        client, calls = app
+        etag = client.get("/times", params={"value": 5}).headers["ETag"]
+        loader.notify_changed()
+        response = client.get("/times", params={"value": 5}, headers={"If-None-Match": etag})
+        # La versión forma parte del ETag: tras el cambio se recalcula
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["X-Ontology-Version"] == str(loader.version)
+        assert calls == [5, 5]
+
+    def test_relation_change_invalidates(self, app, loader):
+        client, calls = app
+        etag = client.get("/times", params={"value": 6}).headers["ETag"]
+        first, second = loader.snapshot.product_ids[:2]
+        loader.add_relation(loader.onto[first], "esMejorOpcionQue", loader.onto[second])
+        response = client.get("/times", params={"value": 6}, headers={"If-None-Match": etag})
+        # add_relation no publica snapshot, pero cambia la adyacencia
+        assert response.status_code == 200
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.headers["ETag"] != etag
+        assert calls == [6, 6]
@@ -0,0 +1,160 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ontology.loader import OntologyLoader, get_snapshot
+from ontology.snapshot import build_snapshot
+from reasoning.product_classifier import ProductClassifier
+from reasoning.rule_evaluator import SWRLRuleEvaluator, compile_rules
+
+
+class TestSWRLRuleEvaluator:
+    @pytest.fixture(scope="class")
+    def onto(self):
+        return OntologyLoader().load()
+
+    @pytest.fixture(scope="class")
+    def snapshot(self, onto):
+        return build_snapshot(onto)
+
+    @pytest.fixture(scope="class")
+    def evaluator(self, onto):
+        return SWRLRuleEvaluator.from_ontology(onto)
+
+    def test_compiles_supported_rules(self, onto):
+        names = {rule.name for rule in compile_rules(onto)}
+        assert {"DetectarGamer", "ClasificarPositivas", "ClasificarNegativas",
+                "EncontrarMejorPrecio", "CompararRAM"} <= names
+        # Reglas con propiedades de objeto en el cuerpo quedan para Pellet
+        assert "DetectarIncompatibilidadSO" not in names
+        assert "RecomendarPorHistorial" not in names
+
+    def test_detectar_gamer_matches_manual_rule(self, snapshot, evaluator):
+        inferences = evaluator.evaluate(snapshot.records())
+        expected = {
+            r.id for r in snapshot.records()
+            if "Laptop" in r.reasoned_types and r.spec("tieneRAM_GB") >= 16
+        }
+        gamers = {rid for rid, classes in inferences.types.items() if "LaptopGamer" in classes}
+        assert gamers == expected
+
+    def test_pairwise_rules_are_opt_in(self, snapshot, evaluator):
+        inferences = evaluator.evaluate(snapshot.records())
+        assert inferences.types
+        assert not inferences.relations
+        assert "CompararRAM" not in inferences.fired
+
+    def test_build_writes_rule_classes_to_world(self, onto, snapshot):
+        gamers = {r.id for r in snapshot.instances_of("LaptopGamer")}
+        assert gamers
+        assert {laptop.name for laptop in onto.LaptopGamer.instances()} == gamers
+
+    def test_pairwise_rule_compares_values(self, snapshot, evaluator):
+        inferences = evaluator.evaluate(snapshot.records(), relations=True)
+        pairs = inferences.relations["tieneMejorRAMQue"]
+        assert pairs
+        for subject, obj in pairs:
+            assert subject != obj
+            assert snapshot.get(subject).spec("tieneRAM_GB") > snapshot.get(obj).spec("tieneRAM_GB")
+
+    def test_subset_evaluation_limits_results(self, snapshot, evaluator):
+        laptop = next(r for r in snapshot.instances_of("Laptop") if r.spec("tieneRAM_GB") >= 16)
+        inferences = evaluator.evaluate(snapshot.records(), subset=[laptop.id], relations=True)
+        assert set(inferences.types) == {laptop.id}
+        for pairs in inferences.relations.values():
+            assert all(laptop.id in pair for pair in pairs)
+
+
+class TestIncrementalReclassification:
+    def test_reclassify_updates_rule_classes(self, loader):
+        gamer = next(r for r in loader.snapshot.instances_of("Laptop") if "LaptopGamer" in r.types)
+        untouched = next(r for r in loader.snapshot.products() if r.id != gamer.id)
+        version = loader.version
+
+        loader.index.get(gamer.id).tieneRAM_GB = [8]
+        result = ProductClassifier().reclassify([gamer.id.lower(), "NoExiste_XYZ"])
+
+        assert result["reclassified"] == [gamer.id]
+        assert result["not_found"] == ["NoExiste_XYZ"]
+        assert result["class_changes"][gamer.id]["removed"] == ["LaptopGamer"]
+        assert result["ontology_version"] == version + 1
+
+        snapshot = get_snapshot()
+        assert "LaptopGamer" not in snapshot.get(gamer.id).types
+        assert not isinstance(loader.index.get(gamer.id), loader.onto.LaptopGamer)
+        assert snapshot.get(gamer.id).spec("tieneRAM_GB") == 8
+        # Los registros no afectados se reutilizan tal cual
+        assert snapshot.get(untouched.id) is untouched
+
+    def test_reclassify_keeps_rule_class_instances(self, loader):
+        gamers = [r.id for r in loader.snapshot.products() if "LaptopGamer" in r.types]
+        assert [r.id for r in loader.snapshot.instances_of("LaptopGamer")] == gamers
+
+        # Sin cambios de datos, los productos siguen siendo instancias
+        ProductClassifier().reclassify(gamers[:1])
+        snapshot = get_snapshot()
+        assert sorted(r.id for r in snapshot.instances_of("LaptopGamer")) == sorted(gamers)
+        assert ProductClassifier().get_products_by_class("LaptopGamer")["total_products"] == len(gamers)
+
+    def test_rebuild_keeps_asserted_rule_classes(self, loader):
+        laptop = next(r for r in loader.snapshot.instances_of("Laptop") if "LaptopGamer" not in r.types)
+        individual = loader.index.get(laptop.id)
+        individual.is_a.append(loader.onto.LaptopGamer)
+
+        loader.notify_changed()
+        assert loader.onto.LaptopGamer in individual.is_a
+        assert "LaptopGamer" in get_snapshot().get(laptop.id).types
+
+        ProductClassifier().reclassify([laptop.id])
+        assert loader.onto.LaptopGamer in individual.is_a
+        assert laptop.id in {r.id for r in get_snapshot().instances_of("LaptopGamer")}
+
+    def test_reclassify_best_price_within_name_group(self, loader):
+        cheap, expensive = [r for r in loader.snapshot.instances_of("Laptop")][:2]
+        cheap_ind = loader.index.get(cheap.id)
+        expensive_ind = loader.index.get(expensive.id)
+        expensive_ind.tieneNombre = list(cheap_ind.tieneNombre)
+        cheap_ind.tienePrecio = [100.0]
+        expensive_ind.tienePrecio = [5000.0]
+
+        result = ProductClassifier().reclassify([cheap.id, expensive.id])
+
+        added = result["relation_changes"]["esMejorOpcionQue"]["added"]
+        assert (cheap.id, expensive.id) in added
+
+        # Al subir el precio, la relación se invierte
+        cheap_ind.tienePrecio = [9000.0]
+        changes = ProductClassifier().reclassify([cheap.id])["relation_changes"]["esMejorOpcionQue"]
+        assert changes["removed"] == [(cheap.id, expensive.id)]
+        assert changes["added"] == [(expensive.id, cheap.id)]
+
+    def test_reclassify_updates_relation_consumers(self, loader):
+        from reasoning.inference_engine import InferenceEngine
+        from services.recommendation_engine import get_candidate_pools
+
+        ids = list(loader.snapshot.product_ids)
+        # El objeto es uno de los primeros productos (cuenta en better_counts)
+        anchor, cheaper = loader.index.get(ids[4]), loader.index.get("Laptop_HP_Pavilion")
+        cheaper.tieneNombre = list(anchor.tieneNombre)
+        anchor.tienePrecio, cheaper.tienePrecio = [2000.0], [900.0]
+
+        changes = ProductClassifier().reclassify([anchor.name, cheaper.name])["relation_changes"]
+        assert (cheaper.name, anchor.name) in changes["esMejorOpcionQue"]["added"]
+        engine = InferenceEngine()
+        assert engine.is_better_option(cheaper.name, anchor.name) is True
+        assert anchor in cheaper.esMejorOpcionQue
+        assert anchor.name in loader.snapshot.get(cheaper.name).links["esMejorOpcionQue"]
+        assert get_candidate_pools(loader.snapshot).better_counts[ids.index(cheaper.name)] == 1
+
+        # El dato deja de cumplir la regla: la relación desaparece del índice y del World
+        cheaper.tienePrecio = [3000.0]
+        changes = ProductClassifier().reclassify([cheaper.name])["relation_changes"]
+        assert (cheaper.name, anchor.name) in changes["esMejorOpcionQue"]["removed"]
+        assert engine.is_better_option(anchor.name, cheaper.name) is True
+        assert not loader.adjacency.has_edge("esMejorOpcionQue", cheaper.name, anchor.name)
+        assert anchor not in cheaper.esMejorOpcionQue
+        assert anchor.name not in loader.snapshot.get(cheaper.name).links.get("esMejorOpcionQue", ())
+        assert get_candidate_pools(loader.snapshot).better_counts[ids.index(cheaper.name)] == 0
@@ -0,0 +1,153 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dataclasses import replace
+from types import MappingProxyType
+
+import numpy as np
+
+from ontology.loader import OntologyLoader, get_snapshot
+from ontology.range_index import RangePredicate, SORT_FIELDS, get_range_indexes
+from ontology.snapshot import build_snapshot, OntologySnapshot
+from ontology.text_index import TextIndex, fold, get_text_index
+from sparql.planner import SearchPlanner
+from sparql.queries import SPARQLQueries
+
+
+@pytest.mark.usefixtures("class_loader")
+class TestSearchPlanner:
+    def _scan(self, category, predicates):
+        snapshot = get_snapshot()
+        records = snapshot.instances_of(category) if category else snapshot.products()
+        return [r.id for r in records if all(p.accepts(r.specs.get(p.prop)) for p in predicates)]
+
+    def test_most_selective_stage_runs_first(self):
+        predicates = (RangePredicate("tienePrecio", low=0), RangePredicate("tieneRAM_GB", low=32, default=0))
+        ids, plan = SearchPlanner().execute(category="Laptop", predicates=predicates, explain=True)
+
+        estimates = [stage["estimate"] for stage in plan["stages"]]
+        assert estimates == sorted(estimates)
+        assert plan["stages"][0]["stage"].startswith("range:tieneRAM_GB")
+        assert plan["stages"][0]["input"] == len(get_snapshot().product_ids)
+        assert plan["stages"][1]["input"] == plan["stages"][0]["output"]
+        assert ids == self._scan("Laptop", predicates)
+
+    def test_empty_stage_short_circuits(self):
+        ids, plan = SearchPlanner().execute(
+            text_query="zzzz", predicates=(RangePredicate("tienePrecio", low=0),), explain=True
+        )
+        assert ids == []
+        assert len(plan["stages"]) == 1
+        assert plan["short_circuited"] == ["range:tienePrecio[0, inf]"]
+
+    def test_text_results_keep_relevance_then_sort(self):
+        queries = SPARQLQueries()
+        ranked = [p["id"] for p in queries.search_products(text_query="samsung")]
+        ids, plan = SearchPlanner().execute(text_query="samsung", explain=True)
+        assert ids == ranked
+        assert plan["order"] == "relevance"
+
+        by_price, _ = SearchPlanner().execute(text_query="samsung", sort_by="price")
+        prices = [get_snapshot().get(pid).specs.get("tienePrecio", float("inf")) for pid in by_price]
+        assert prices == sorted(prices)
+
+    def test_plan_only_when_requested(self):
+        _, plan = SearchPlanner().execute(category="Laptop")
+        assert plan is None
+
+
+class TestTextIndex:
+    @pytest.fixture(scope="class")
+    def snapshot(self):
+        return build_snapshot(OntologyLoader().load(), version=1)
+
+    def test_accent_folding_and_prefix(self):
+        index = TextIndex()
+        index.add("p1", {"name": ["Reseña Electrónica"]})
+        index.add("p2", {"name": ["Resena basica"]})
+        assert fold("Electrónica") == "electronica"
+        assert {pid for pid, _ in index.search("reseña")} == {"p1", "p2"}
+        assert [pid for pid, _ in index.search("ELECTRO")] == ["p1"]
+        assert index.search("electro zzz") == []
+
+    def test_name_ranks_above_description(self):
+        index = TextIndex()
+        index.add("desc", {"name": ["Monitor"], "description": ["ideal para gaming"]})
+        index.add("name", {"name": ["Gaming Monitor"]})
+        assert [pid for pid, _ in index.search("gaming")] == ["name", "desc"]
+
+    def test_snapshot_index_covers_brand_and_processor(self, snapshot):
+        index = get_text_index(snapshot)
+        assert index is get_text_index(snapshot)
+        apple = {pid for pid, _ in index.search("apple")}
+        assert apple and all("Marca_Apple" in snapshot.get(pid).links["tieneMarca"] for pid in apple)
+        assert "CPU_Intel_i9" in {pid for pid, _ in index.search("core i9")}
+
+    def test_incremental_update_is_copy_on_write(self, snapshot):
+        index = TextIndex.from_snapshot(snapshot)
+        product = snapshot.products()[1]
+        renamed = replace(product, properties=MappingProxyType({**product.properties, "tieneNombre": "Zafiro Único"}))
+        records = snapshot.record_map()
+        records[product.id] = renamed
+        newer = OntologySnapshot(records, snapshot.product_ids, snapshot.class_names, 2)
+
+        updated = index.updated(newer, [product.id])
+        assert [pid for pid, _ in updated.search("zafiro unico")] == [product.id]
+        # El índice anterior no cambia
+        assert index.search("zafiro") == []
+        assert len(updated) == len(index)
+
+
+class TestRangeIndexes:
+    @pytest.fixture(scope="class")
+    def snapshot(self):
+        return build_snapshot(OntologyLoader().load(), version=1)
+
+    @pytest.fixture(scope="class")
+    def indexes(self, snapshot):
+        return get_range_indexes(snapshot)
+
+    def _scan(self, snapshot, predicates):
+        return [
+            r.id for r in snapshot.products()
+            if all(p.accepts(r.specs.get(p.prop)) for p in predicates)
+        ]
+
+    @pytest.mark.parametrize("predicates", [
+        [RangePredicate("tienePrecio", 500, 1500)],
+        [RangePredicate("tienePrecio", high=1000), RangePredicate("tieneRAM_GB", low=8)],
+        [RangePredicate("tieneRAM_GB", low=0, default=0)],
+        [RangePredicate("tieneCalificacion", low=4), RangePredicate("tienePulgadas", 6, 16)],
+        [RangePredicate("tieneAlmacenamiento_GB", 2000, 100)],
+    ])
+    def test_select_matches_linear_scan(self, snapshot, indexes, predicates):
+        mask = indexes.select(predicates)
+        assert indexes.ids_of(np.flatnonzero(mask)) == self._scan(snapshot, predicates)
+        if len(predicates) == 1:
+            assert indexes.count(predicates[0]) == int(mask.sum())
+
+    def test_missing_values_use_default(self, snapshot, indexes):
+        without_ram = [r.id for r in snapshot.products() if "tieneRAM_GB" not in r.specs]
+        assert without_ram
+        included = indexes.ids_of(np.flatnonzero(indexes.range(RangePredicate("tieneRAM_GB", low=0, default=0))))
+        excluded = indexes.ids_of(np.flatnonzero(indexes.range(RangePredicate("tieneRAM_GB", low=0))))
+        assert set(without_ram) <= set(included)
+        assert not set(without_ram) & set(excluded)
+
+    @pytest.mark.parametrize("sort_by,missing,ascending", [
+        ("price", float("inf"), True), ("price", float("inf"), False),
+        ("rating", 0, False), ("ram", 0, True), ("storage", 0, False),
+    ])
+    def test_ordered_matches_stable_sort(self, snapshot, indexes, sort_by, missing, ascending):
+        prop = SORT_FIELDS[sort_by][0]
+        mask = indexes.range(RangePredicate("tienePrecio", low=100))
+        expected = sorted(
+            self._scan(snapshot, [RangePredicate("tienePrecio", low=100)]),
+            key=lambda pid: snapshot.get(pid).specs.get(prop, missing),
+            reverse=not ascending
+        )
+        assert indexes.ids_of(indexes.ordered(mask, sort_by, ascending)) == expected
@@ -0,0 +1,162 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from ontology.adjacency import AdjacencyIndex
+from ontology.columns import SPEC_COLUMNS, get_spec_matrix, value_counts
+from ontology.index import IndividualIndex
+from ontology.loader import OntologyLoader
+from ontology.snapshot import build_snapshot, PRODUCT_CATEGORIES
+from reasoning.inference_engine import InferenceEngine
+from utils.owl_helpers import individual_to_dict
+
+
+class TestOntologySnapshot:
+    @pytest.fixture(scope="class")
+    def onto(self):
+        return OntologyLoader().load()
+
+    @pytest.fixture(scope="class")
+    def snapshot(self, onto):
+        return build_snapshot(onto, version=1)
+
+    def test_records_match_individual_to_dict(self, onto, snapshot):
+        """Snapshot records serialize like individual_to_dict plus SWRL rule types"""
+        for individual in onto.individuals():
+            expected = individual_to_dict(individual)
+            actual = snapshot.get(individual.name).to_dict()
+            assert actual["id"] == expected["id"]
+            assert set(actual["types"]) >= set(expected["types"])
+            assert actual["properties"] == expected["properties"]
+
+    def test_rule_types_added_to_records(self, snapshot):
+        for record in snapshot.instances_of("Laptop"):
+            if record.spec("tieneRAM_GB") >= 16:
+                assert "LaptopGamer" in record.types
+        for record in snapshot.instances_of("Reseña"):
+            rating = record.spec("tieneCalificacion")
+            assert ("Reseña_Positiva" in record.types) == (rating >= 4)
+            assert ("Reseña_Negativa" in record.types) == (rating <= 2)
+
+    def test_products_follow_producto_instances(self, onto, snapshot):
+        expected = [p.name for p in onto.Producto.instances()]
+        assert [r.id for r in snapshot.products()] == expected
+        assert snapshot.version == 1
+
+    def test_get_is_case_insensitive(self, snapshot):
+        product = snapshot.products()[0]
+        assert snapshot.get(product.id.lower()) is product
+        assert snapshot.get(product.id.upper()) is product
+        assert snapshot.get("NoExiste_XYZ") is None
+        assert snapshot.get("") is None
+
+    def test_category_and_specs(self, snapshot):
+        for record in snapshot.products():
+            if record.category is not None:
+                assert record.category in PRODUCT_CATEGORIES
+                assert record.category in record.types
+            price = record.properties.get("tienePrecio")
+            if isinstance(price, (int, float)):
+                assert record.spec("tienePrecio") == float(price)
+
+    def test_instances_of(self, onto, snapshot):
+        expected = sorted(i.name for i in onto.Laptop.instances())
+        assert sorted(r.id for r in snapshot.instances_of("Laptop")) == expected
+        assert snapshot.has_class("Laptop")
+        assert not snapshot.has_class("ClaseInexistente")
+
+    def test_records_are_immutable(self, snapshot):
+        record = snapshot.products()[0]
+        with pytest.raises(Exception):
+            record.id = "otro"
+        with pytest.raises(TypeError):
+            record.properties["tienePrecio"] = 0
+
+        # to_dict entrega copias que pueden modificarse libremente
+        data = record.to_dict()
+        data["properties"]["imagenUrl"] = "x.png"
+        assert "imagenUrl" not in record.properties
+
+
+class TestIndividualIndex:
+    @pytest.fixture(scope="class")
+    def onto(self):
+        return OntologyLoader().load()
+
+    def test_lookup_is_case_insensitive(self, onto):
+        index = IndividualIndex(onto)
+        for individual in onto.individuals():
+            assert index.get(individual.name) is individual
+            assert index.get(individual.name.lower()) is individual
+        assert index.get("NoExiste_XYZ") is None
+        assert len(index) == len(set(i.name for i in onto.individuals()))
+
+    def test_add_and_discard(self, onto):
+        index = IndividualIndex(onto)
+        individual = next(iter(onto.Producto.instances()))
+        index.discard(individual.name)
+        assert index.get(individual.name) is None
+        index.add(individual)
+        assert index.get(individual.name.upper()) is individual
+
+    def test_inference_engine_uses_index(self, onto):
+        engine = InferenceEngine(onto)
+        product = next(iter(onto.Producto.instances()))
+        assert engine.get_product_by_id(product.name) is product
+        assert engine.get_product_by_id(product.name.lower()) is product
+        assert engine.get_product_by_id("NoExiste_XYZ") is None
+
+
+class TestAdjacencyIndex:
+    @pytest.fixture(scope="class")
+    def onto(self):
+        return OntologyLoader().load()
+
+    def test_forward_and_inverse_match_quadstore(self, onto):
+        adjacency = AdjacencyIndex(onto)
+        for subject, obj in onto.esCompatibleCon.get_relations():
+            assert obj.name in adjacency.forward("esCompatibleCon", subject.name)
+            assert subject.name in adjacency.inverse("esCompatibleCon", obj.name)
+            # Propiedad simétrica: la relación vale en ambos sentidos
+            assert adjacency.has_edge("esCompatibleCon", obj.name, subject.name)
+
+    def test_incremental_add_and_discard(self, onto):
+        adjacency = AdjacencyIndex(onto)
+        adjacency.add("esMejorOpcionQue", "A", "B")
+        assert adjacency.has_edge("esMejorOpcionQue", "A", "B")
+        assert not adjacency.has_edge("esMejorOpcionQue", "B", "A")
+        assert adjacency.neighbors("esMejorOpcionQue", "B") == ["A"]
+        adjacency.discard("esMejorOpcionQue", "A", "B")
+        assert adjacency.forward("esMejorOpcionQue", "A") == ()
+
+
+class TestSpecMatrix:
+    @pytest.fixture(scope="class")
+    def snapshot(self):
+        return build_snapshot(OntologyLoader().load(), version=1)
+
+    def test_columns_match_records(self, snapshot):
+        matrix = get_spec_matrix(snapshot)
+        assert matrix.ids == snapshot.product_ids
+        for row, record in enumerate(snapshot.products()):
+            for column, prop in SPEC_COLUMNS.items():
+                value = matrix.column(column)[row]
+                if prop in record.specs:
+                    assert value == record.specs[prop]
+                else:
+                    assert np.isnan(value)
+
+    def test_matrix_built_once_per_snapshot(self, snapshot):
+        assert get_spec_matrix(snapshot) is get_spec_matrix(snapshot)
+        rebuilt = build_snapshot(OntologyLoader().load(), version=2)
+        assert get_spec_matrix(rebuilt) is not get_spec_matrix(snapshot)
+
+    def test_value_counts_orders_like_counter(self):
+        values, counts = value_counts(np.array([8, 16, 16, 32, 8, 4]))
+        assert values.tolist() == [8, 16, 32, 4]
+        assert counts.tolist() == [2, 2, 1, 1]
@@ -0,0 +1,83 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from ontology.columns import SPEC_COLUMNS, get_spec_matrix
+from ontology.loader import OntologyLoader
+from ontology.range_index import RangePredicate, get_range_indexes
+
+
+class TestSnapshotExport:
+    @pytest.fixture(scope="class")
+    def loader(self):
+        loader = OntologyLoader()
+        loader.load()
+        loader.refresh_snapshot()
+        return loader
+
+    @pytest.fixture(scope="class")
+    def attached(self, loader, tmp_path_factory):
+        from ontology.snapshot_store import attach_snapshot
+        path = loader.export_snapshot(tmp_path_factory.mktemp("snapshots"))
+        return attach_snapshot(path)
+
+    def test_records_round_trip(self, loader, attached):
+        snapshot, _ = attached
+        original = loader.snapshot
+        assert snapshot.version == original.version
+        assert snapshot.product_ids == original.product_ids
+        assert snapshot.class_names == original.class_names
+        assert snapshot.records() == original.records()
+        for cls_name in ("Laptop", "Smartphone", "Producto"):
+            assert snapshot.instances_of(cls_name) == original.instances_of(cls_name)
+            assert snapshot.count_of(cls_name) == original.count_of(cls_name)
+
+    def test_records_decode_lazily(self, loader, tmp_path):
+        from ontology.snapshot_store import MappedRecords, attach_snapshot
+        snapshot, _ = attach_snapshot(loader.export_snapshot(tmp_path))
+        records = snapshot._records
+        assert isinstance(records, MappedRecords)
+        assert records.decoded == 0
+        product_id = snapshot.product_ids[0]
+        assert snapshot.get(product_id.lower()) == loader.snapshot.get(product_id)
+        assert records.decoded == 1
+
+    def test_spec_matrix_is_memory_mapped(self, loader, attached):
+        snapshot, _ = attached
+        matrix, original = get_spec_matrix(snapshot), get_spec_matrix(loader.snapshot)
+        assert matrix.ids == original.ids
+        for prop in dict.fromkeys(SPEC_COLUMNS.values()):
+            column = matrix.column(prop)
+            assert isinstance(column.base, np.memmap) or isinstance(column, np.memmap)
+            assert not column.flags.writeable
+            np.testing.assert_array_equal(column, original.column(prop))
+        np.testing.assert_array_equal(matrix.category_codes, original.category_codes)
+        # Las estructuras derivadas se construyen igual sobre el snapshot adjuntado
+        predicate = RangePredicate("tienePrecio", high=1500)
+        assert get_range_indexes(snapshot).ids_of(np.flatnonzero(get_range_indexes(snapshot).range(predicate))) == \
+            get_range_indexes(loader.snapshot).ids_of(np.flatnonzero(get_range_indexes(loader.snapshot).range(predicate)))
+
+    def test_adjacency_round_trip(self, loader, attached):
+        _, adjacency = attached
+        assert adjacency.properties() == loader.adjacency.properties()
+        for prop in adjacency.properties():
+            assert sorted(adjacency.edges(prop)) == sorted(loader.adjacency.edges(prop))
+
+    def test_reasoning_manager_attaches_export(self, loader, tmp_path, monkeypatch, restore_active_loader):
+        import config
+        from ontology.loader import get_active_loader
+        from ontology.reasoning_manager import ReasoningManager
+
+        path = loader.export_snapshot(tmp_path)
+        monkeypatch.setitem(config.SNAPSHOT_EXPORT_CONFIG, "path", str(path))
+        manager = ReasoningManager()
+        worker = manager.start(background=False)
+        assert get_active_loader() is worker
+        assert manager.status()["attached_snapshot"] == str(path)
+        assert worker.snapshot.product_ids == loader.snapshot.product_ids
+        assert worker.adjacency.ontology is worker.onto
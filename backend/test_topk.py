@@ -0,0 +1,84 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from models.recommendation import UserPreferences
+from services.recommendation_service import RecommendationService
+from sparql.market_analysis import MarketAnalysis
+from utils.topk import cursor_position, decode_cursor, encode_cursor, top_k, top_k_rows
+
+
+class TestTopK:
+    @pytest.mark.parametrize("k", [0, 1, 3, 7, 20])
+    def test_rows_match_stable_sort(self, k):
+        scores = np.array([3.0, 1.0, 3.0, 5.0, 1.0, 2.0, 5.0, 0.5])
+        expected = np.argsort(-scores, kind="stable")[:k]
+        assert top_k_rows(scores, k).tolist() == expected.tolist()
+
+    def test_rows_pages_cover_ranking(self):
+        scores = np.round(np.random.default_rng(7).random(200), 1)
+        expected = np.argsort(-scores, kind="stable").tolist()
+        pages, after = [], None
+        while True:
+            page = top_k_rows(scores, 15, after)
+            if page.size == 0:
+                break
+            pages.extend(page.tolist())
+            after = (scores[page[-1]], page[-1])
+        assert pages == expected
+
+    @pytest.mark.parametrize("reverse", [True, False])
+    def test_heap_matches_sorted(self, reverse):
+        items = [{"id": i, "score": s} for i, s in enumerate([2, 9, 4, 9, 1, 4, 4, 0])]
+        expected = sorted(items, key=lambda x: x["score"], reverse=reverse)
+        top = top_k(iter(items), 5, key=lambda x: x["score"], reverse=reverse)
+        assert [item for _, _, item in top] == expected[:5]
+
+        last_score, last_position, _ = top[-1]
+        rest = top_k(items, 10, key=lambda x: x["score"], reverse=reverse, after=(last_score, last_position))
+        assert [item for _, _, item in rest] == expected[5:]
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(0.1234, "Laptop_Dell_XPS")
+        assert decode_cursor(cursor) == (0.1234, "Laptop_Dell_XPS")
+        assert cursor_position(cursor, ["a", "Laptop_Dell_XPS"]) == (0.1234, 1)
+        assert cursor_position(cursor, ["a"]) == (0.1234, float("inf"))
+        with pytest.raises(ValueError):
+            decode_cursor("no-es-un-cursor")
+
+
+@pytest.mark.usefixtures("class_loader")
+class TestRankingPagination:
+    def test_best_value_cursor_pages(self):
+        analysis = MarketAnalysis()
+        full = analysis.get_best_value_products(50)
+        assert "next_cursor" not in full
+
+        ids, cursor = [], None
+        while True:
+            page = analysis.get_best_value_products(4, cursor)
+            ids.extend(p["id"] for p in page["best_value_products"])
+            cursor = page.get("next_cursor")
+            if cursor is None:
+                break
+        assert ids == [p["id"] for p in full["best_value_products"]]
+
+    def test_recommendation_cursor_pages(self):
+        service = RecommendationService()
+        preferences = UserPreferences(min_rating=4.0, budget=2000)
+        full = service.get_recommendations(preferences, 50)
+        assert full["next_cursor"] is None
+
+        ids, cursor = [], None
+        while True:
+            page = service.get_recommendations(preferences, 2, cursor)
+            ids.extend(item.product_id for item in page["recommendations"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert ids == [item.product_id for item in full["recommendations"]]
@@ -0,0 +1,131 @@
+"""
+Selección top-K y paginación por cursor - SmartCompareMarket
+
+Los rankings (mejor valor, recomendaciones, top N) piden casi siempre
+pocos resultados sobre todo el catálogo. En lugar de ordenar la lista
+completa y cortar [:limit]:
+
+- top_k_rows: sobre una columna de puntajes numpy usa argpartition y solo
+  ordena los k candidatos.
+- top_k: sobre un iterable mantiene un heap de tamaño k (heapq), sin
+  materializar la lista puntuada.
+
+En ambos el orden es puntaje descendente y, a igual puntaje, la posición
+original (el mismo resultado que un sort estable). La página siguiente se
+pide con un cursor opaco que guarda el último (puntaje, id) devuelto.
+"""
+
+import base64
+import heapq
+import json
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def top_k_rows(
+    scores: np.ndarray,
+    k: int,
+    after: Optional[Tuple[float, float]] = None
+) -> np.ndarray:
+    """
+    Filas de los k mayores puntajes, en orden descendente.
+
+    Args:
+        scores: Puntajes por fila (sin NaN)
+        k: Cantidad de filas a devolver
+        after: (puntaje, fila) del último elemento de la página anterior;
+            solo se consideran filas posteriores en el orden del ranking
+
+    Returns:
+        Índices de fila ordenados (empates por fila ascendente)
+    """
+    scores = np.asarray(scores, dtype=float)
+    rows = np.arange(scores.size)
+    if after is not None:
+        last_score, last_row = after
+        rows = rows[(scores < last_score) | ((scores == last_score) & (rows > last_row))]
+    if k <= 0 or rows.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    candidate_scores = scores[rows]
+    if k < rows.size:
+        # k-ésimo mayor puntaje; se conservan todos los empates con él
+        threshold = np.partition(candidate_scores, rows.size - k)[rows.size - k]
+        keep = candidate_scores >= threshold
+        rows, candidate_scores = rows[keep], candidate_scores[keep]
+
+    order = np.argsort(-candidate_scores, kind="stable")[:k]
+    return rows[order]
+
+
+def top_k(
+    items: Iterable[Any],
+    k: int,
+    key: Callable[[Any], float],
+    reverse: bool = True,
+    after: Optional[Tuple[float, float]] = None
+) -> List[Tuple[float, int, Any]]:
+    """
+    Los k mejores elementos de un iterable con un heap de tamaño k.
+
+    Args:
+        items: Elementos (se recorren una sola vez)
+        k: Cantidad de elementos a devolver
+        key: Puntaje numérico de cada elemento
+        reverse: True para puntaje descendente, False para ascendente
+        after: (puntaje, posición) del último elemento de la página anterior
+
+    Returns:
+        Lista de (puntaje, posición, elemento) en orden del ranking; a igual
+        puntaje se conserva el orden de entrada (igual que sorted())
+    """
+    if k <= 0:
+        return []
+    sign = -1 if reverse else 1
+
+    def candidates():
+        for position, item in enumerate(items):
+            score = key(item)
+            if after is not None and (sign * score, position) <= (sign * after[0], after[1]):
+                continue
+            yield score, position, item
+
+    return heapq.nsmallest(k, candidates(), key=lambda entry: (sign * entry[0], entry[1]))
+
+
+def encode_cursor(score: float, item_id: str) -> str:
+    """Cursor opaco con el puntaje y el ID del último elemento de la página."""
+    payload = json.dumps({"s": score, "id": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload["s"]), str(payload["id"])
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def cursor_position(cursor: Optional[str], ids: List[str]) -> Optional[Tuple[float, float]]:
+    """
+    Convierte un cursor en (puntaje, posición) para top_k/top_k_rows.
+
+    Si el ID ya no está en la lista (el catálogo cambió), la página sigue
+    desde el primer puntaje estrictamente menor.
+    """
+    if not cursor:
+        return None
+    score, item_id = decode_cursor(cursor)
+    try:
+        return score, ids.index(item_id)
+    except ValueError:
+        return score, float("inf")